@@ -1,39 +1,72 @@
 import dash
-from dash import html, dcc, Input, Output, State, no_update, callback_context
+from dash import html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import dash.dependencies
-import base64
+import flask
+import functools
+import json
 import os
+import threading
 import utils
+import callback_metrics
+import figure_artifacts
+import http_caching
+import json_encoding
+import shared_cache
 
 # local imports for visualizations
 from livingwage_vs_stipend import livingwage_vs_stipend
 from department_stipend_avgs import department_stipend_avgs
-from timeline_dash import timeline_negotiations
+from timeline_dash import timeline_negotiations, warm_timeline_cache
 from benefits_summary import benefits
 
-# Create HTML content and get callbacks, titles, subtitles for modal
-html_stipends_over_time, callbacks_stipends, title_stipends, subtitle_stipends = livingwage_vs_stipend()
-html_dept_avg, callbacks_dept, title_dept, subtitle_dept = department_stipend_avgs()
-html_timeline, callbacks_timeline, title_timeline, subtitle_timeline = timeline_negotiations()
-html_benefits, callbacks_benefits, title_benefits, subtitle_benefits = benefits()
+# Get layout builders, callbacks, titles, subtitles for modal.
+# This is cheap: no data is read and no figures are built until a hotspot is opened
+layout_stipends_over_time, callbacks_stipends, title_stipends, subtitle_stipends = livingwage_vs_stipend()
+layout_dept_avg, callbacks_dept, title_dept, subtitle_dept = department_stipend_avgs()
+layout_timeline, callbacks_timeline, title_timeline, subtitle_timeline = timeline_negotiations()
+layout_benefits, callbacks_benefits, title_benefits, subtitle_benefits = benefits()
 
 fallback_html = html.Div("You should not be seeing this, something went wrong")
 
 # Map hotspots to their content and callbacks
 content_mapping = {
-    "hot-0-0": {"html": html_timeline, "callbacks": callbacks_timeline, "title": title_timeline, "subtitle": subtitle_timeline},
-    "hot-2-0": {"html": html_stipends_over_time, "callbacks": callbacks_stipends, "title": title_stipends, "subtitle": subtitle_stipends},
-    "hot-3-0": {"html": html_dept_avg, "callbacks": callbacks_dept, "title": title_dept, "subtitle": subtitle_dept},
-    "hot-5-0": {"html": html_benefits, "callbacks": callbacks_benefits, "title": title_benefits, "subtitle":subtitle_benefits}
+    "hot-0-0": {"layout": layout_timeline, "callbacks": callbacks_timeline, "title": title_timeline, "subtitle": subtitle_timeline},
+    "hot-2-0": {"layout": layout_stipends_over_time, "callbacks": callbacks_stipends, "title": title_stipends, "subtitle": subtitle_stipends},
+    "hot-3-0": {"layout": layout_dept_avg, "callbacks": callbacks_dept, "title": title_dept, "subtitle": subtitle_dept},
+    "hot-5-0": {"layout": layout_benefits, "callbacks": callbacks_benefits, "title": title_benefits, "subtitle":subtitle_benefits}
 }
 
+@functools.lru_cache(maxsize=None)
+@shared_cache.shared("content_html")
+def content_html(hotspot_id):
+    """
+    Build a visualization's layout the first time its hotspot is clicked,
+    then reuse it for every later click
+    """
+    content = content_mapping.get(hotspot_id)
+    if content is None:
+        return fallback_html
+    return content["layout"]()
+
 # define dash app
 app = dash.Dash(__name__, 
                 external_stylesheets=[dbc.themes.BOOTSTRAP], #bootstrap is for modals
                 suppress_callback_exceptions=True) #dynamic callbacks like to whine
 
+# with FIGURE_ARTIFACTS, check now that the prerendered build matches the data and code
+# (a stale one is reported and figures are built live instead)
+figure_artifacts.enabled()
+
+# time server callbacks when CALLBACK_METRICS* is set, see callback_metrics.py
+callback_metrics.instrument(app)
+
+# encode callback responses and the layout with orjson, see json_encoding.py
+json_encoding.install()
+
+# compress responses and answer If-None-Match with 304, see http_caching.py
+http_caching.install(app)
+
 # ----------------------------------------------------------------
 # 1. Load PDF page images
 # ----------------------------------------------------------------
@@ -44,19 +77,50 @@ pdf_images = [
     if filename.lower().endswith((".png", ".jpg", ".jpeg"))
 ]
 
-def serve_image(path):
-    with open(path, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode()
-    return f"data:image/png;base64,{encoded}"
+# Pages are served by URL instead of being base64-inlined into the layout, so
+# /_dash-layout stays small and the browser can cache and lazily fetch each page
+PAGE_URL_PREFIX = "/pages/"
+PAGE_CACHE_SECONDS = 7 * 24 * 60 * 60  # a week; URLs are versioned by mtime
+EAGER_PAGES = 2  # pages fetched on first paint, the rest load while scrolling
+
+@app.server.route(f"{PAGE_URL_PREFIX}<path:filename>")
+def serve_page(filename):
+    """
+    Serve a contract page image with ETag/Last-Modified and Cache-Control headers
+    """
+    return flask.send_from_directory(
+        os.path.abspath(PDF_IMAGE_FOLDER), filename, max_age=PAGE_CACHE_SECONDS
+    )
+
+def page_url(path):
+    """
+    URL for a page image, versioned by modification time so cached copies
+    are dropped when the contract is re-rasterized
+    """
+    version = int(os.path.getmtime(path))
+    return f"{PAGE_URL_PREFIX}{os.path.relpath(path, PDF_IMAGE_FOLDER)}?v={version}"
+
+def load_page_variants():
+    """
+    Resolution ladder per page from the rasterizer's manifest
+    (see rasterize_pages.py), or {} if the pages were made without one
+    """
+    manifest_path = os.path.join(PDF_IMAGE_FOLDER, "pages.json")
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        pages = json.load(f).get("pages", {})
+    return {
+        name: entry["variants"]
+        for name, entry in pages.items()
+        if isinstance(entry, dict) and "variants" in entry
+    }
+
+page_variants = load_page_variants()
 
 # ----------------------------------------------------------------
 # 2. Define hotspots (clickable regions)
 # ----------------------------------------------------------------
-# print img height and width for reference
-from PIL import Image
-img = Image.open(pdf_images[0])
-print(img.size)  # Output: (width, height)
-
 IMAGE_WIDTH = 1700  # Replace with your actual width
 IMAGE_HEIGHT = 2200  # Replace with your actual height
 
@@ -106,10 +170,84 @@ try:
 except ValueError as e:
     print(f"\n❌ ERROR: {e}")
 
+# every hotspot, in page order; each gets its own title and body in the popup
+HOTSPOT_IDS = [hotspot["id"] for page in hotspot_dict.values() for hotspot in page]
+
+def popup_title(hotspot_id):
+    """
+    The popup title for a hotspot, with its subtitle underneath if it has one
+    """
+    content = content_mapping.get(hotspot_id, {
+        "title": "Default Title", #default
+        "subtitle": ""
+    })
+    if content.get("subtitle"):
+        return html.Div([
+            html.Div(content.get("title", "Main Title"), 
+                    style={"fontSize": "2rem", "marginBottom": "2px"}),
+            html.Div(content.get("subtitle", ""), 
+                    style={"fontSize": "1.5rem", "color": "#6c757d", "fontWeight": "normal"})
+        ])
+    return content.get("title", "Main Title")
+
 # ----------------------------------------------------------------
 # 3. Build app layout 
 # ----------------------------------------------------------------
-def build_page_with_overlays(img_src, page_index):
+# the page column is at most 1200px wide, so the browser never needs more than that
+PAGE_SIZES = "(max-width: 1230px) 100vw, 1200px"
+VARIANT_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+def build_page_image(img_path, page_index, variants=None):
+    """
+    The image for one page. With a resolution ladder this is a <picture> whose
+    AVIF/WebP sources and PNG fallback all use srcset, so each browser fetches
+    the smallest variant that fills its screen. Every variant has the same
+    aspect ratio, so the percentage hotspots stay aligned whichever is chosen.
+
+    Pages past the first few only get data-src/data-srcset, which
+    assets/lazy_pages.js swaps in as they scroll near the viewport.
+    """
+    eager = page_index < EAGER_PAGES
+
+    def lazy(attr, value):
+        return {attr: value} if eager else {f"data-{attr.lower()}": value}
+
+    def srcset(by_width):
+        return ", ".join(
+            f"{page_url(os.path.join(PDF_IMAGE_FOLDER, path))} {width}w"
+            for width, path in sorted(by_width.items(), key=lambda item: int(item[0]))
+        )
+
+    img_props = lazy("src", page_url(img_path))
+    if variants and "png" in variants:
+        img_props.update(lazy("srcSet", srcset(variants["png"])))
+
+    img = html.Img(
+        **img_props,
+        sizes=PAGE_SIZES,
+        className="contract-page",
+        alt=f"Contract page {page_index + 1}",
+        width=IMAGE_WIDTH,
+        height=IMAGE_HEIGHT,
+        style={
+            "width": "100%",
+            "height": "auto",
+            "display": "block",
+            # reserve the page's space before the image is fetched
+            "aspectRatio": f"{IMAGE_WIDTH} / {IMAGE_HEIGHT}",
+        },
+    )
+    if not variants:
+        return img
+
+    sources = [
+        html.Source(type=mime_type, sizes=PAGE_SIZES, **lazy("srcSet", srcset(variants[fmt])))
+        for fmt, mime_type in VARIANT_MIME_TYPES.items()
+        if fmt in variants
+    ]
+    return html.Picture(sources + [img])
+
+def build_page_with_overlays(img_path, page_index):
     """
     Create one PDF page (an image) with its overlay hotspots and title text boxes
     """
@@ -120,14 +258,7 @@ def build_page_with_overlays(img_src, page_index):
     return html.Div(
         [
             # pdf page image
-            html.Img(
-                src=img_src,
-                style={
-                    "width": "100%",
-                    "height": "auto",
-                    "display": "block",
-                },
-            ),
+            build_page_image(img_path, page_index, page_variants.get(os.path.basename(img_path))),
             *[
                 html.Div([
                     # Text box on the left
@@ -301,9 +432,10 @@ app.layout = html.Div(
         html.Div(
             
             [
-                build_page_with_overlays(serve_image(img), i)
+                build_page_with_overlays(img, i)
                 for i, img in enumerate(pdf_images)
             ],
+            id="page-container",
             style={
                 "display": "flex",
                 "flexDirection": "column",
@@ -317,13 +449,28 @@ app.layout = html.Div(
         dbc.Modal(
             [
                 dbc.ModalHeader([
-                    # custom title and subtitle come from figure functions
-                    dbc.ModalTitle("Main Title", id="popup-title"),
-                    html.P(className="text-muted small mb-0", id="popup-subtitle")
+                    # custom title and subtitle come from figure functions,
+                    # one hidden title per hotspot, shown by the open_popup callback
+                    dbc.ModalTitle(
+                        [
+                            html.Div(popup_title(hotspot_id), id=f"popup-title-{hotspot_id}",
+                                     style={"display": "none"})
+                            for hotspot_id in HOTSPOT_IDS
+                        ],
+                        id="popup-title",
+                    ),
                 ]),     
-                # holds a html div returned from the figure functions
+                # one container per visualization; each is filled by
+                # load_popup_content the first time its hotspot is opened and
+                # stays mounted afterwards, so reopening sends nothing
                 dbc.ModalBody(
-                    html.Div(id="popup-content"),
+                    html.Div(
+                        [
+                            html.Div(id=f"popup-body-{hotspot_id}", style={"display": "none"})
+                            for hotspot_id in HOTSPOT_IDS
+                        ],
+                        id="popup-content",
+                    ),
                 ),
                 dbc.ModalFooter(
                     dbc.Button("Close", id="close-popup", n_clicks=0)
@@ -333,8 +480,13 @@ app.layout = html.Div(
             is_open=False,
             size="xl",
             scrollable=True,
-            style={"width": "95%", 'maxWidth': 'none'}, #TODO: this doesnt make the modal wider, not sure how to
+            # the width belongs on the dialog: .modal itself is the full-screen backdrop
+            dialog_style={"width": "95%", "maxWidth": "none"},
         ),
+        # hotspots whose visualization has been requested from the server
+        dcc.Store(id="popup-loaded", data=[]),
+        # the hotspot to load next, set only on its first open
+        dcc.Store(id="popup-request"),
         jump_modal_layout,
         dcc.Location(id='url', refresh=False),
     ],
@@ -344,128 +496,125 @@ app.layout = html.Div(
 # ----------------------------------------------------------------
 # 4. Callback: any hotspot opens the corresponding popup
 # ----------------------------------------------------------------
-@app.callback(
+# Runs in the browser: opening and closing the modal only shows or hides the
+# hotspot's (already mounted) title and body. The first open of a hotspot also
+# sets popup-request, which is the only thing that reaches the server.
+OPEN_POPUP_JS = """
+function() {
+    var hotspotIds = %s;
+    var noUpdate = window.dash_clientside.no_update;
+    var ctx = window.dash_clientside.callback_context;
+    var loaded = arguments[arguments.length - 1] || [];
+    var unchanged = [noUpdate, noUpdate, noUpdate]
+        .concat(hotspotIds.map(function () { return noUpdate; }))
+        .concat(hotspotIds.map(function () { return noUpdate; }));
+    if (!ctx.triggered.length) {
+        return unchanged;
+    }
+
+    var triggeredId = ctx.triggered[0].prop_id.split(".")[0];
+
+    // if the trigger was the close button
+    if (triggeredId === "close-popup") {
+        unchanged[0] = false;
+        return unchanged;
+    }
+
+    if (hotspotIds.indexOf(triggeredId) === -1) {
+        return unchanged;
+    }
+    var styles = hotspotIds.map(function (id) {
+        return {display: id === triggeredId ? "block" : "none"};
+    });
+    var isNew = loaded.indexOf(triggeredId) === -1;
+    return [
+        true,
+        isNew ? loaded.concat([triggeredId]) : noUpdate,
+        isNew ? triggeredId : noUpdate
+    ].concat(styles, styles);
+}
+""" % json.dumps(HOTSPOT_IDS)
+
+app.clientside_callback(
+    OPEN_POPUP_JS,
     # defines which html id and what content to change in it
     Output("popup-modal", "is_open"),
-    Output("popup-content", "children"),
-    Output("popup-title", "children"),
-    [
-        Input(hotspot["id"], "n_clicks")
-        for page in hotspot_dict.values()
-        for hotspot in page
-    ] + [Input("close-popup", "n_clicks")],
-    State("popup-modal", "is_open")
+    Output("popup-loaded", "data"),
+    Output("popup-request", "data"),
+    [Output(f"popup-title-{hotspot_id}", "style") for hotspot_id in HOTSPOT_IDS],
+    [Output(f"popup-body-{hotspot_id}", "style") for hotspot_id in HOTSPOT_IDS],
+    [Input(hotspot_id, "n_clicks") for hotspot_id in HOTSPOT_IDS]
+    + [Input("close-popup", "n_clicks")],
+    State("popup-loaded", "data"),
+    prevent_initial_call=True
 )
 
-def open_popup(*args):
-    # Determine which input triggered the callback
-    ctx = callback_context
-    if not ctx.triggered:
-        return no_update, no_update, no_update
-    
-    triggered_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    
-    # if the trigger was the close button
-    if triggered_id == "close-popup":
-        return False, no_update, no_update
-    
-    # If a hotspot was clicked, look up the HTML content
-    if triggered_id.startswith("hot-"):
-
-        content = content_mapping.get(triggered_id, {
-            "html": fallback_html, #default
-            "title": "Default Title",
-            "subtitle": ""
-        })
-        
-        # Create the title component with subtitle if provided
-        if content.get("subtitle"):
-            title_component = html.Div([
-                html.Div(content.get("title", "Main Title"), 
-                        style={"fontSize": "2rem", "marginBottom": "2px"}),
-                html.Div(content.get("subtitle", ""), 
-                        style={"fontSize": "1.5rem", "color": "#6c757d", "fontWeight": "normal"})
-            ])
-        else:
-            title_component = content.get("title", "Main Title")
-        
-        return True, content["html"], title_component
-    
-    return no_update, no_update, no_update
+@app.callback(
+    [Output(f"popup-body-{hotspot_id}", "children") for hotspot_id in HOTSPOT_IDS],
+    Input("popup-request", "data"),
+    prevent_initial_call=True
+)
+def load_popup_content(requested_id):
+    """
+    Send a visualization's layout the first time its hotspot is opened
+    """
+    return [
+        content_html(hotspot_id) if hotspot_id == requested_id else no_update
+        for hotspot_id in HOTSPOT_IDS
+    ]
 
 # ----------------------------------------------------------------
 # 5. Register all callbacks from the visualization functions
 # ----------------------------------------------------------------
 def register_callbacks():
     """
-    Register all callbacks from the visualization modules
+    Register all callbacks from the visualization modules,
+    labelled with their hotspot in the callback metrics
     """
     
     for hotspot_id, content in content_mapping.items():
         if content["callbacks"]:
-            for callback_func in content["callbacks"]:
-                callback_func(app)
+            with callback_metrics.labels(app, hotspot_id):
+                for callback_func in content["callbacks"]:
+                    callback_func(app)
 
 # Register all callbacks after app layout is defined
 register_callbacks()
 
+# Optionally pre-build every slider range of the default timeline group in the
+# background, so the first slider moves are cache hits too
+if os.environ.get("WARM_TIMELINE_CACHE"):
+    threading.Thread(target=warm_timeline_cache, daemon=True).start()
+
 
 # ----------------------------------------------------------------
 # 6. Additional Callbacks and buttons
 # ----------------------------------------------------------------
-# Jump modal layout  
-jump_modal_layout = dbc.Modal(
-    [
-        dbc.ModalHeader(dbc.ModalTitle("Jump to Visualization")),
-        dbc.ModalBody(
-            html.Div([
-                html.Div([
-                    html.Div([
-                        html.H5(content_mapping[hotspot_id]["title"], 
-                               style={"marginBottom": "10px", "color": "#990000"}),
-                        html.P(content_mapping[hotspot_id].get("subtitle", ""),
-                              style={"fontSize": "0.9rem", "color": "#666"}),
-                        html.Button(
-                            f"Go to Page {page_idx + 1}",
-                            id={"type": "jump-to", "index": hotspot_id},
-                            n_clicks=0,
-                            **{"data-hotspot": hotspot_id},  # Store hotspot ID as data attribute
-                            style={
-                                "padding": "8px 15px",
-                                "backgroundColor": "#990000",
-                                "color": "white",
-                                "border": "none",
-                                "borderRadius": "5px",
-                                "cursor": "pointer",
-                                "fontSize": "0.9rem",
-                                "justifyContent": "center",
-                                "display": "inline-block"
-                            }
-                        )
-                    ], style={"flex": "1", "paddingRight": "20px", "justifyContent": "center"}),
-                ], style={
-                    "display": "flex", 
-                    "alignItems": "center",
-                    "padding": "15px",
-                    "borderBottom": "1px solid #ddd",
-                    "marginBottom": "10px"
-                })
-                for page_idx, hotspots in hotspot_dict.items()
-                for hotspot in hotspots
-                for hotspot_id in [hotspot["id"]]
-            ])
-        ),
-        dbc.ModalFooter(
-            dbc.Button("Close", id="close-jump-modal", n_clicks=0)
-        ),
-    ],
-    id="jump-modal",
-    is_open=False,
-    size="lg",
-    scrollable=True,
-)
+# Runs in the browser: the jump button toggles the modal, and Close or any
+# "Go to Page" link (a plain #hotspot anchor) closes it
+TOGGLE_JUMP_MODAL_JS = """
+function(jumpClicks, closeClicks, jumpToClicks, isOpen) {
+    var ctx = window.dash_clientside.callback_context;
+    if (!ctx.triggered.length) {
+        return isOpen;
+    }
 
-@app.callback(
+    var triggeredId = ctx.triggered[0].prop_id;
+
+    if (triggeredId.indexOf("jump-button") !== -1) {
+        return !isOpen;
+    } else if (triggeredId.indexOf("close-jump-modal") !== -1) {
+        return false;
+    } else if (triggeredId.indexOf("jump-to") !== -1) {
+        return false;
+    }
+
+    return isOpen;
+}
+"""
+
+app.clientside_callback(
+    TOGGLE_JUMP_MODAL_JS,
     Output("jump-modal", "is_open"),
     [Input("jump-button", "n_clicks"),
      Input("close-jump-modal", "n_clicks"),
@@ -473,21 +622,6 @@ jump_modal_layout = dbc.Modal(
     State("jump-modal", "is_open"),
     prevent_initial_call=True
 )
-def toggle_jump_modal(jump_clicks, close_clicks, jump_to_clicks, is_open):
-    ctx = callback_context
-    if not ctx.triggered:
-        return is_open
-    
-    triggered_id = ctx.triggered[0]["prop_id"]
-    
-    if "jump-button" in triggered_id:
-        return not is_open
-    elif "close-jump-modal" in triggered_id:
-        return False
-    elif "jump-to" in triggered_id:
-        return False
-    
-    return is_open
 
 
 # ----------------------------------------------------------------
@@ -0,0 +1,71 @@
+// Lazily loads contract page images as they scroll near the viewport.
+// app.py renders pages past the first few with data-src/data-srcset instead of
+// src/srcset (on the img and on any <source> in its <picture>); this swaps them
+// in once a page is within PRELOAD_MARGIN of the visible part of
+// #page-container, so only nearby pages are ever fetched.
+(function () {
+    var PRELOAD_MARGIN = "100% 0px"; // roughly one screen above and below
+
+    var observer = null;
+
+    function swap(el, attr) {
+        var value = el.getAttribute("data-" + attr);
+        if (value) {
+            el.setAttribute(attr, value);
+            el.removeAttribute("data-" + attr);
+        }
+    }
+
+    function loadPage(img) {
+        // sources first, so the browser picks its variant before src is set
+        var picture = img.parentNode;
+        if (picture && picture.tagName === "PICTURE") {
+            picture.querySelectorAll("source[data-srcset]").forEach(function (source) {
+                swap(source, "srcset");
+            });
+        }
+        swap(img, "srcset");
+        swap(img, "src");
+    }
+
+    function getObserver(container) {
+        if (observer === null) {
+            observer = new IntersectionObserver(function (entries) {
+                entries.forEach(function (entry) {
+                    if (entry.isIntersecting) {
+                        loadPage(entry.target);
+                        observer.unobserve(entry.target);
+                    }
+                });
+            }, {root: container, rootMargin: PRELOAD_MARGIN});
+        }
+        return observer;
+    }
+
+    function observePages() {
+        var container = document.getElementById("page-container");
+        if (!container) {
+            return;
+        }
+        var pending = container.querySelectorAll("img.contract-page[data-src]");
+        if (!("IntersectionObserver" in window)) {
+            // very old browsers: just load everything
+            pending.forEach(loadPage);
+            return;
+        }
+        var obs = getObserver(container);
+        pending.forEach(function (img) {
+            if (!img.dataset.lazyObserved) {
+                img.dataset.lazyObserved = "1";
+                obs.observe(img);
+            }
+        });
+    }
+
+    // Dash renders the layout after this script runs, so watch for the pages
+    new MutationObserver(observePages).observe(document.documentElement, {
+        childList: true,
+        subtree: true
+    });
+    document.addEventListener("DOMContentLoaded", observePages);
+})();
@@ -0,0 +1,117 @@
+"""
+Compares the JSON encoders in json_encoding.py against Dash's own
+(plotly.io.json.to_json_plotly): time and bytes to encode the output of
+every figure builder in run_benchmarks.py, each popup layout and the app's
+initial layout.
+
+    python benchmarks/bench_serializers.py [--scales 1 10] [--repeat 5]
+
+Engines alone must send the same values as Dash (checked on every output;
+orjson writes datetime arrays without the ".000000" Dash's fallback path
+adds, which plotly.js reads the same). The precision and typed array
+settings only round numbers or change how they are written.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import time
+
+import plotly.io.json as pio_json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.chdir(os.path.join(os.path.dirname(__file__), ".."))
+
+import benefits_summary  # noqa: E402
+import department_stipend_avgs  # noqa: E402
+import json_encoding  # noqa: E402
+import livingwage_vs_stipend  # noqa: E402
+import timeline_dash  # noqa: E402
+from run_benchmarks import BENCHMARKS, figure_bytes  # noqa: E402
+
+ENCODERS = {
+    "dash": pio_json.to_json_plotly,
+    "json": json_encoding.encoder("json"),
+    "orjson": json_encoding.encoder("orjson"),
+    "orjson p6": json_encoding.encoder("orjson", precision=6),
+    "orjson typed": json_encoding.encoder("orjson", typed_arrays=True),
+    "orjson p6 typed": json_encoding.encoder("orjson", precision=6, typed_arrays=True),
+}
+# encoders that must send the same values as Dash
+EXACT = ("json", "orjson")
+ISO_DATETIME = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d+)?$")
+
+LAYOUTS = {
+    "timeline_layout": timeline_dash.timeline_layout,
+    "livingwage_layout": livingwage_vs_stipend.livingwage_layout,
+    "dept_stipend_layout": department_stipend_avgs.dept_stipend_layout,
+    "benefits_layout": benefits_summary.benefits_layout,
+}
+
+
+def outputs(scales):
+    """(name, value) for every figure builder at every scale, then the layouts"""
+    for name, bench in BENCHMARKS.items():
+        for scale in scales:
+            func, _ = bench(scale)
+            result = func()
+            if figure_bytes(result) is not None:
+                yield f"{name}[{scale}x]", result
+    for name, build in LAYOUTS.items():
+        yield name, build()
+    import app
+    yield "app_layout", app.app.get_layout()
+
+
+def canonical(value):
+    """Decoded JSON with datetime strings parsed, so equal instants compare equal"""
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    if isinstance(value, str) and ISO_DATETIME.match(value):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def timed(encode, value, repeat):
+    """Best of `repeat` encodings, in seconds, and the encoded text"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = encode(value)
+        best = min(best, time.perf_counter() - start)
+    return best, text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=5, help="encodings per output and encoder")
+    args = parser.parse_args()
+
+    print(f"{'output':<30}" + "".join(f"{name:>22}" for name in ENCODERS))
+    totals = {name: [0.0, 0] for name in ENCODERS}
+    for name, value in outputs(args.scales):
+        cells = []
+        expected = None
+        for encoder_name, encode in ENCODERS.items():
+            seconds, text = timed(encode, value, args.repeat)
+            if encoder_name == "dash":
+                expected = canonical(json.loads(text))
+            elif encoder_name in EXACT and canonical(json.loads(text)) != expected:
+                raise AssertionError(f"{encoder_name} output differs from Dash's for {name}")
+            size = len(text.encode())
+            totals[encoder_name][0] += seconds
+            totals[encoder_name][1] += size
+            cells.append(f"{seconds * 1000:8.2f} ms {size:>9} B")
+        print(f"{name:<30}" + "".join(f"{cell:>22}" for cell in cells))
+
+    print(f"{'total':<30}" + "".join(
+        f"{seconds * 1000:8.2f} ms {size:>9} B".rjust(22) for seconds, size in totals.values()))
+    dash_seconds, dash_bytes = totals["dash"]
+    print(f"{'vs dash':<30}" + "".join(
+        f"{seconds / dash_seconds:7.2f}x {size / dash_bytes:11.2f}x".rjust(22)
+        for seconds, size in totals.values()))
@@ -0,0 +1,62 @@
+"""
+Times the vectorized timeline_data() against the original row-by-row
+implementation on synthetic copies of the negotiations data.
+
+    python benchmarks/bench_timeline_data.py [--scales 1 10 100]
+
+The original (kept in tests/test_timeline_data.py, which checks that both
+give the same frame) is quadratic, since every row rescans the frame, so it
+is only timed up to --max-legacy-scale.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.chdir(os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.test_timeline_data import legacy_timeline_data  # noqa: E402
+from timeline_dash import timeline_data  # noqa: E402
+
+
+def scaled_negotiations(raw, scale):
+    """
+    `scale` copies of the raw rows, each shifted two years later, so every
+    article ends up with `scale` times as many changes
+    """
+    copies = []
+    for k in range(scale):
+        copy = raw.copy()
+        copy["Date"] = (pd.to_datetime(copy["Date"]) + pd.DateOffset(years=2 * k)).dt.strftime("%m/%d/%Y")
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def timed(func, *args, repeat=3):
+    """Best of `repeat` runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--max-legacy-scale", type=int, default=1)
+    args = parser.parse_args()
+
+    raw = pd.read_csv("data/contract_negotiations.csv")
+    for scale in args.scales:
+        data = scaled_negotiations(raw, scale)
+        new_time, _ = timed(lambda: timeline_data(data.copy()))
+        line = f"{scale:>5}x {len(data):>8} rows  vectorized {new_time * 1000:9.1f} ms"
+        if scale <= args.max_legacy_scale:
+            old_time, _ = timed(lambda: legacy_timeline_data(data), repeat=1)
+            line += f"  row-wise {old_time * 1000:9.1f} ms  ({old_time / new_time:.0f}x)"
+        print(line)
@@ -0,0 +1,64 @@
+"""
+Throughput of the production server (gunicorn wsgi:server, see
+gunicorn.conf.py) at several worker counts, under the load test's
+simulated readers.
+
+    python benchmarks/bench_workers.py [--workers 1 2 4 8] [--users 16] [--duration 30]
+                                       [--no-shared] [--warm]
+
+Each worker count gets a freshly started server. The shared cache starts
+empty for every run unless --warm is given, so the numbers include the
+warm-up. --no-shared gives each worker only its own in-memory caches, for
+comparison. Memory is the server's total: the master plus its workers.
+"""
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+os.chdir(os.path.join(os.path.dirname(__file__), ".."))
+
+import load_test  # noqa: E402
+
+SHARED_FOLDER = "data/.cache/shared-bench/"
+
+
+def bench(workers, args):
+    """Start gunicorn with `workers` workers, run the load test, stop it; returns one summary row"""
+    if not args.warm:
+        shutil.rmtree(SHARED_FOLDER, ignore_errors=True)
+    command = (sys.executable, "-m", "gunicorn", "--workers", str(workers), "wsgi:server")
+    env = {"SHARED_CACHE": "" if args.no_shared else SHARED_FOLDER}
+    server, url = load_test.start_server(command, env)
+    try:
+        results, elapsed, rss_samples = load_test.run(url, server.pid, args.users, args.duration,
+                                                      seed=args.seed)
+    finally:
+        server.terminate()
+        server.wait()
+
+    seconds = np.array([row[1] for row in results.requests]) * 1000
+    failed = sum(1 for row in results.requests if row[2] >= 400) + len(results.errors)
+    return (f"{workers:>7} {len(results.requests) / elapsed:9.1f} {results.sessions / elapsed:10.2f}"
+            f"{np.percentile(seconds, 50):9.1f}{np.percentile(seconds, 95):9.1f}"
+            f"{max(rss_samples, default=0) / 2**20:9.0f} {failed:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--users", type=int, default=16, help="concurrent simulated readers")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per worker count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-shared", action="store_true", help="don't share caches across workers")
+    parser.add_argument("--warm", action="store_true", help="keep the shared cache between runs")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.users} users, {args.duration:.0f}s per run, "
+          f"shared cache {'off' if args.no_shared else 'on'}")
+    print(f"{'workers':>7} {'req/s':>9} {'sessions/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'peak MB':>9} {'errors':>6}")
+    for workers in args.workers:
+        print(bench(workers, args), flush=True)
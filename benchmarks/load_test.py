@@ -0,0 +1,439 @@
+"""
+Load test for app.py: simulated readers replay scripted sessions against the
+real Dash endpoints, in parallel, and the run reports throughput, latency
+percentiles and the server's memory.
+
+    python benchmarks/load_test.py [--users 8] [--duration 30] [--think 0]
+                                   [--url http://127.0.0.1:8050 --pid <server pid>]
+                                   [--identity] [--revalidate]
+
+Without --url a server is started on a free port (python app.py) and
+stopped afterwards. Any extra environment, e.g. WARM_TIMELINE_CACHE=1, is
+passed through to it. Server memory is read from /proc, so it is only
+reported on Linux, and only with --pid for a server started elsewhere.
+
+Each simulated user loads the page (/, /_dash-layout,
+/_dash-dependencies), then repeatedly picks one of SESSIONS. It sends the
+same /_dash-update-component requests a browser would. It keeps the current
+value of every component property, as the browser does, fills callback
+inputs and state from them, applies each response, and fires the initial
+callbacks of components that arrive in a popup. Callbacks that run in the
+browser (opening the popup, toggling colleges) send nothing, so only their
+server-side effects are replayed. Page images and Dash's JS bundles are
+static files and are not requested.
+
+Sizes are bytes on the wire: clients accept gzip unless --identity is
+given, which shows what the same sessions cost uncompressed. With
+--revalidate each user keeps an HTTP cache across page loads, like a
+browser, and sends If-None-Match with every request it has made before,
+callbacks included; a 304 reuses the cached body.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+REPO = os.path.join(os.path.dirname(__file__), "..")
+QUANTILES = (50, 95, 99)
+RSS_INTERVAL = 0.5  # seconds between server memory samples
+STARTUP_TIMEOUT = 120
+
+
+'''----- Browser-side state -----'''
+
+def components(tree):
+    """Every component with an id in a layout tree, as (id, props)"""
+    if isinstance(tree, list):
+        for child in tree:
+            yield from components(child)
+    elif isinstance(tree, dict):
+        props = tree.get("props")
+        if isinstance(props, dict):
+            if isinstance(props.get("id"), str):
+                yield props["id"], props
+            for value in props.values():
+                yield from components(value)
+
+
+def split_outputs(output):
+    """Dash's output string ("a.b" or "..a.b...c.d..") as a list of {"id", "property"}"""
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    outputs = []
+    for part in parts:
+        component_id, prop = part.rsplit(".", 1)
+        outputs.append({"id": component_id, "property": prop.split("@")[0]})
+    return outputs
+
+
+class DashClient:
+    """
+    One simulated browser: the properties of every component it has seen, and
+    the server callbacks to fire when one of them changes
+    """
+
+    def __init__(self, url, record, http_cache=None, compress=True):
+        self.url = url.rstrip("/")
+        self.record = record
+        self.http = requests.Session()
+        if not compress:
+            self.http.headers["Accept-Encoding"] = "identity"
+        # {(method, path, body): (etag, content)}, kept across page loads like a browser's
+        self.http_cache = http_cache
+        self.props = {}
+        self.callbacks = []
+
+    def get(self, path, label):
+        return self.timed(label, "GET", path)
+
+    def timed(self, label, method, path, body=None):
+        """
+        Send one request, recording its time and the bytes on the wire
+
+        Returns:
+            (int, bytes): status (200 when a 304 revalidated the cached body) and content
+        """
+        key = (method, path, json.dumps(body, sort_keys=True))
+        cached = self.http_cache.get(key) if self.http_cache is not None else None
+        headers = {"If-None-Match": f'"{cached[0]}"'} if cached else {}
+        start = time.perf_counter()
+        response = self.http.request(method, self.url + path, json=body, headers=headers)
+        size = int(response.headers.get("Content-Length", len(response.content)))
+        self.record(label, time.perf_counter() - start, response.status_code, size)
+        if response.status_code == 304:
+            return 200, cached[1]
+        etag = response.headers.get("ETag")
+        if self.http_cache is not None and etag:
+            self.http_cache[key] = (etag.strip('"'), response.content)
+        return response.status_code, response.content
+
+    def load_page(self):
+        """What a browser requests from the app itself on first paint"""
+        self.get("/", "GET /")
+        self.add_components(json.loads(self.get("/_dash-layout", "GET /_dash-layout")[1]))
+        dependencies = json.loads(self.get("/_dash-dependencies", "GET /_dash-dependencies")[1])
+        # pattern-matching and clientside callbacks never reach the server
+        self.callbacks = [
+            dependency for dependency in dependencies
+            if not dependency.get("clientside_function")
+            and all(not item["id"].startswith("{") for item in dependency["inputs"] + dependency["state"])
+        ]
+
+    def add_components(self, tree):
+        """Record the props of new components; returns their ids"""
+        added = set()
+        for component_id, props in components(tree):
+            for prop, value in props.items():
+                self.props[f"{component_id}.{prop}"] = value
+            added.add(component_id)
+        return added
+
+    def set(self, prop_id, value):
+        """Change a property as a user would and run the callbacks it triggers"""
+        self.props[prop_id] = value
+        for dependency in self.callbacks:
+            if any(f"{item['id']}.{item['property']}" == prop_id for item in dependency["inputs"]):
+                self.fire(dependency, [prop_id])
+
+    def fire(self, dependency, changed):
+        """POST one callback, apply its response and fire whatever it sets off"""
+        def values(items):
+            return [{**item, "value": self.props.get(f"{item['id']}.{item['property']}")} for item in items]
+
+        outputs = split_outputs(dependency["output"])
+        body = {
+            "output": dependency["output"],
+            "outputs": outputs if dependency["output"].startswith("..") else outputs[0],
+            "inputs": values(dependency["inputs"]),
+            "state": values(dependency["state"]),
+            "changedPropIds": changed,
+        }
+        status, content = self.timed(changed[0], "POST", "/_dash-update-component", body)
+        if status == 204:  # PreventUpdate
+            return
+        if status >= 400:
+            raise requests.HTTPError(f"{status} from {changed[0]}")
+
+        added = set()
+        for component_id, props in json.loads(content)["response"].items():
+            for prop, value in props.items():
+                self.props[f"{component_id}.{prop}"] = value
+                if prop == "children":
+                    added |= self.add_components(value)
+        # components that just arrived run their initial callbacks
+        for other in self.callbacks:
+            if other.get("prevent_initial_call"):
+                continue
+            inputs = [item["id"] for item in other["inputs"]]
+            if any(component_id in added for component_id in inputs) \
+                    and all(f"{item['id']}.{item['property']}" in self.props for item in other["inputs"]):
+                self.fire(other, [f"{item['id']}.{item['property']}" for item in other["inputs"]])
+
+    def open_hotspot(self, hotspot_id, loaded):
+        """The popup opens in the browser; its content is fetched once per page load"""
+        if hotspot_id not in loaded:
+            self.set("popup-request.data", hotspot_id)
+            loaded.add(hotspot_id)
+
+    def options(self, prop_id):
+        """Values of a dropdown/radio/checklist's options"""
+        return [option["value"] if isinstance(option, dict) else option for option in self.props[prop_id]]
+
+    def customdata(self, figure_id):
+        """customdata of every point in a figure, for building clickData"""
+        points = []
+        for trace in self.props[f"{figure_id}.figure"]["data"]:
+            points += [row for row in trace.get("customdata") or [] if isinstance(row, list)]
+        return points
+
+
+'''----- Sessions -----'''
+
+# A session is one reader exploring one visualization. Each takes the
+# client, the hotspots already loaded on this page, a random generator and a
+# think() function to call between actions.
+
+def timeline_session(client, loaded, rng, think):
+    client.open_hotspot("hot-0-0", loaded)
+    last = client.props["timeline-slider.max"]
+    for _ in range(rng.randint(2, 6)):
+        start = rng.randint(0, last - 1)
+        client.set("timeline-slider.value", [start, rng.randint(start + 1, last)])
+        think()
+    client.set("timeline-group.value", rng.choice(client.options("timeline-group.options")))
+    think()
+    for _ in range(rng.randint(1, 3)):
+        points = client.customdata("negotiation-timeline")
+        if points:
+            client.set("negotiation-timeline.clickData", {"points": [{"customdata": rng.choice(points)}]})
+        think()
+
+
+def benefits_session(client, loaded, rng, think):
+    client.open_hotspot("hot-5-0", loaded)
+    for _ in range(rng.randint(1, 3)):
+        client.set("benefits-network-filter.value", rng.choice(client.options("benefits-network-filter.options")))
+        think()
+        points = client.customdata("benefits-unit-chart")
+        for _ in range(rng.randint(1, 3)):
+            client.set("benefits-unit-chart.clickData", {"points": [{"customdata": rng.choice(points)}]})
+            think()
+
+
+def livingwage_session(client, loaded, rng, think):
+    client.open_hotspot("hot-2-0", loaded)
+    client.set("livingwage-mode.value", "national")
+    think()
+    peers = client.options("livingwage-peers.options")
+    for _ in range(rng.randint(1, 4)):
+        client.set("livingwage-peers.value", rng.sample(peers[:50], rng.randint(1, 6)))
+        think()
+    client.set("livingwage-mode.value", "boston")
+    think()
+
+
+def departments_session(client, loaded, rng, think):
+    # toggling colleges redraws the chart in the browser, so after the
+    # content is loaded this visualization costs the server nothing
+    client.open_hotspot("hot-3-0", loaded)
+    think()
+
+
+SESSIONS = {
+    "timeline": timeline_session,
+    "benefits": benefits_session,
+    "livingwage": livingwage_session,
+    "departments": departments_session,
+}
+
+
+'''----- Running -----'''
+
+class Results:
+    """Thread-safe request log: (label, seconds, status, bytes) per request"""
+
+    def __init__(self):
+        self.requests = []
+        self.sessions = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, status, size):
+        with self._lock:
+            self.requests.append((label, seconds, status, size))
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+    def error(self, message):
+        with self._lock:
+            self.errors.append(message)
+
+
+def user(url, results, deadline, seed, think_seconds, sessions_per_page, revalidate, compress):
+    """One simulated reader: load the page, run sessions, reload, until the deadline"""
+    rng = random.Random(seed)
+    http_cache = {} if revalidate else None
+
+    def think():
+        if think_seconds:
+            time.sleep(rng.expovariate(1 / think_seconds))
+
+    while time.monotonic() < deadline:
+        client = DashClient(url, results.record, http_cache, compress)
+        try:
+            client.load_page()
+            loaded = set()
+            for _ in range(sessions_per_page):
+                if time.monotonic() >= deadline:
+                    break
+                SESSIONS[rng.choice(list(SESSIONS))](client, loaded, rng, think)
+                results.session_done()
+        except (requests.RequestException, KeyError, ValueError) as e:
+            results.error(f"{type(e).__name__}: {e}")
+
+
+def rss_bytes(pid):
+    """Resident memory of a process and its children (e.g. gunicorn workers), from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except (OSError, StopIteration):
+        return None
+    return rss + sum(rss_bytes(child) or 0 for child in children)
+
+
+def sample_rss(pid, samples, stop):
+    while not stop.is_set():
+        rss = rss_bytes(pid)
+        if rss is not None:
+            samples.append(rss)
+        stop.wait(RSS_INTERVAL)
+
+
+def start_server(command=(sys.executable, "app.py"), env=None):
+    """
+    Run the app (app.py, or e.g. gunicorn) on a free port, given to it as PORT;
+    returns the process and its URL once it answers
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        list(command), cwd=REPO, env={**os.environ, **(env or {}), "PORT": str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"{command[-1]} exited with code {server.returncode}")
+        try:
+            requests.get(url + "/_dash-layout", timeout=1)
+            return server, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit(f"{command[-1]} did not answer within {STARTUP_TIMEOUT}s")
+
+
+def run(url, pid, users, duration, think=0, sessions_per_page=4, seed=0, revalidate=False, compress=True):
+    """
+    Run `users` simulated readers against the server at `url` for `duration` seconds
+
+    Returns:
+        (Results, float, list): the request log, seconds elapsed, and server
+        memory samples (empty without a pid)
+    """
+    results = Results()
+    rss_samples, stop = [], threading.Event()
+    if pid:
+        threading.Thread(target=sample_rss, args=(pid, rss_samples, stop), daemon=True).start()
+    try:
+        start = time.monotonic()
+        deadline = start + duration
+        threads = [
+            threading.Thread(target=user, args=(url, results, deadline, seed + i, think,
+                                                sessions_per_page, revalidate, compress))
+            for i in range(users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+    finally:
+        stop.set()
+    return results, elapsed, rss_samples
+
+
+def report(results, elapsed, rss_samples, users):
+    """Print throughput, latency percentiles per request type, and server memory"""
+    print(f"\n{users} users, {elapsed:.1f}s: {results.sessions} sessions, {len(results.requests)} requests, "
+          f"{len(results.requests) / elapsed:.1f} req/s, {results.sessions / elapsed:.2f} sessions/s")
+    wire = sum(row[3] for row in results.requests)
+    revalidated = sum(1 for row in results.requests if row[2] == 304)
+    print(f"on the wire: {wire / 2**20:.1f} MB, {wire / max(results.sessions, 1) / 1024:.1f} KB per session, "
+          f"{revalidated} responses not modified (304)")
+
+    header = "".join(f"{f'p{q}':>9}" for q in QUANTILES)
+    print(f"\n{'request':<36}{'count':>7}{header}{'mean KB':>9}{'errors':>7}   (latency in ms)")
+    by_label = {}
+    for label, seconds, status, size in results.requests:
+        by_label.setdefault(label, []).append((seconds, status, size))
+    for label, rows in sorted(by_label.items()) + [("all", [row for rows in by_label.values() for row in rows])]:
+        seconds = np.array([row[0] for row in rows]) * 1000
+        failed = sum(1 for row in rows if row[1] >= 400)
+        percentiles = "".join(f"{value:9.1f}" for value in np.percentile(seconds, QUANTILES))
+        print(f"{label:<36}{len(rows):>7}{percentiles}{np.mean([row[2] for row in rows]) / 1024:9.1f}{failed:>7}")
+
+    if rss_samples:
+        mb = np.array(rss_samples) / 2**20
+        print(f"\nserver RSS: start {mb[0]:.0f} MB, peak {mb.max():.0f} MB, end {mb[-1]:.0f} MB")
+    if results.errors:
+        print(f"\n{len(results.errors)} sessions failed, first: {results.errors[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated readers")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--think", type=float, default=0,
+                        help="mean pause between actions, in seconds (0 = as fast as possible)")
+    parser.add_argument("--sessions-per-page", type=int, default=4,
+                        help="sessions before a user reloads the page")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="pid of the server at --url, for its memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--identity", action="store_true", help="ask for uncompressed responses")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="keep an HTTP cache per user and revalidate with If-None-Match")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        server, url = start_server()
+        pid = server.pid
+
+    try:
+        results, elapsed, rss_samples = run(url, pid, args.users, args.duration, args.think,
+                                            args.sessions_per_page, args.seed,
+                                            args.revalidate, not args.identity)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report(results, elapsed, rss_samples, args.users)
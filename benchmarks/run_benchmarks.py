@@ -0,0 +1,291 @@
+"""
+Times the figure builders and data preparation behind every hotspot, on the
+real CSVs and on synthetic copies scaled up 10x, 100x (and 1000x on request),
+and records the size of each figure's JSON next to its time.
+
+    python benchmarks/run_benchmarks.py [--scales 1 10 100] [--only timeline_data]
+                                        [--compare <commit or results file>]
+
+Results are written to benchmarks/results/<commit>.json (with a -dirty
+suffix when the tree has uncommitted changes) and compared against the
+results of the previous run, or the one given with --compare. Running only
+some benchmarks or scales updates just those entries. Times more
+than --threshold slower, and any change in figure size, are flagged.
+
+Scaling by benchmark:
+- negotiations: copies shifted two years apart, so every article has more
+  changes over a longer timeline. Timestamps stop at 2262, so past 100
+  copies each shifted copy is repeated instead.
+- change tables, summaries, insurance rows and stipends: plain repeated
+  rows, so the same keys carry more data (universities in the insurance data
+  are renamed per copy, so the charts get wider instead).
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import plotly.utils
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.chdir(os.path.join(os.path.dirname(__file__), ".."))
+
+import benefits_summary  # noqa: E402
+import data_store  # noqa: E402
+import department_stipend_avgs  # noqa: E402
+import livingwage_vs_stipend  # noqa: E402
+import timeline_dash  # noqa: E402
+import utils  # noqa: E402
+from bench_timeline_data import scaled_negotiations  # noqa: E402
+
+RESULTS_FOLDER = "benchmarks/results/"
+MAX_SHIFTED_COPIES = 100
+THRESHOLD = 0.2
+
+
+'''----- Scaled data -----'''
+
+def repeated(df, scale):
+    """`scale` copies of every row"""
+    return pd.concat([df] * scale, ignore_index=True)
+
+
+def timeline_negotiations(raw, scale):
+    """Negotiations with `scale` times the changes, see the module docstring"""
+    shifted = min(scale, MAX_SHIFTED_COPIES)
+    return repeated(scaled_negotiations(raw, shifted), max(scale // shifted, 1))
+
+
+def renamed_universities(benefits, scale):
+    """Insurance rows for `scale` times as many universities"""
+    copies = []
+    for k in range(scale):
+        copy = benefits.copy()
+        if k:
+            copy["University"] = copy["University"].astype(str) + f" {k}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+'''----- Benchmarks -----'''
+
+# Each benchmark takes the scale and returns (function to time, rows of input).
+# Setup happens outside the timed function; the function returns a figure
+# (go.Figure or serialized dict) when it builds one.
+
+def bench_timeline_data(scale):
+    raw = timeline_negotiations(data_store.read_table("contract_negotiations"), scale)
+    return lambda: timeline_dash.timeline_data(raw.copy()), len(raw)
+
+
+def bench_negotiation_timeline(scale):
+    negotiations = timeline_dash.timeline_data(
+        timeline_negotiations(data_store.read_table("contract_negotiations"), scale)
+    )
+    times = sorted(negotiations["Start Date"].unique()) + [timeline_dash.FINAL_DATE]
+    rangebreaks = timeline_dash.timeline_rangebreaks(negotiations)
+    return lambda: timeline_dash.negotiation_timeline(
+        negotiations, times, [times[0], times[-1]], timeline_dash.DEFAULT_GROUP, rangebreaks
+    ), len(negotiations)
+
+
+def bench_time_changes_table(scale):
+    negotiations = timeline_dash.timeline_data(repeated(data_store.read_table("contract_negotiations"), scale))
+    index = timeline_dash.build_changes_index(negotiations)
+    # the (article, date) with the most changes
+    article, date = max(index, key=lambda key: len(index[key]["changes"]))
+    return lambda: timeline_dash.time_changes_table(index, article, date), len(negotiations)
+
+
+def bench_final_changes_table(scale):
+    summaries = repeated(data_store.read_table("contract_recent_summaries"), scale)
+    index = timeline_dash.build_summaries_index(summaries)
+    article = max(index, key=lambda key: len(index[key]["summaries"]))
+    return lambda: timeline_dash.final_changes_table(index, article), len(summaries)
+
+
+def scaled_benefits(scale):
+    benefits = benefits_summary.benefits_data()["benefits"]
+    benefits = renamed_universities(benefits, scale)
+    return benefits["University"].unique(), benefits
+
+
+def bench_benefits_fig(scale):
+    universities, benefits = scaled_benefits(scale)
+    return lambda: benefits_summary.benefits_fig(universities, benefits), len(benefits)
+
+
+def bench_benefit_details(scale):
+    universities, benefits = scaled_benefits(scale)
+    return lambda: benefits_summary.benefit_details(universities, benefits, "Deductible"), len(benefits)
+
+
+def bench_extract_numerical_values(scale):
+    details = repeated(data_store.read_table("health_insurance_comparison", columns=["Details"]), scale)["Details"]
+    return lambda: details.map(benefits_summary.extract_numerical_values), len(details)
+
+
+def bench_dept_name(scale):
+    departments = repeated(data_store.read_table("cleaned_stipends", columns=["Department"]), scale)["Department"]
+    return lambda: departments.apply(utils.dept_name), len(departments)
+
+
+def bench_normalize_departments(scale):
+    departments = repeated(data_store.read_table("cleaned_stipends", columns=["Department"]), scale)["Department"]
+    return lambda: utils.normalize_departments(departments), len(departments)
+
+
+def bench_dept_averages(scale):
+    stipends = repeated(data_store.read_table(
+        "boston_stipends", columns=["University", "Department", "Overall Pay", "Academic Year"]
+    ), scale)
+    return lambda: department_stipend_avgs.dept_averages(stipends.copy()), len(stipends)
+
+
+def bench_boston_figure(scale):
+    stipends = repeated(data_store.read_table(
+        "boston_stipends", columns=["University", "Overall Pay", "Academic Year"]
+    ), scale)
+    return lambda: livingwage_vs_stipend.stipend_line_chart(
+        livingwage_vs_stipend.boston_averages(stipends.copy()), livingwage_vs_stipend.COLORS
+    ), len(stipends)
+
+
+def bench_rollup_stipends(scale):
+    stipends = repeated(data_store.read_table(
+        "cleaned_stipends", columns=["University", "Overall Pay", "Academic Year"]
+    ), scale)
+    return lambda: livingwage_vs_stipend.rollup_stipends(stipends.copy()), len(stipends)
+
+
+BENCHMARKS = {
+    "timeline_data": bench_timeline_data,
+    "negotiation_timeline": bench_negotiation_timeline,
+    "time_changes_table": bench_time_changes_table,
+    "final_changes_table": bench_final_changes_table,
+    "benefits_fig": bench_benefits_fig,
+    "benefit_details": bench_benefit_details,
+    "extract_numerical_values": bench_extract_numerical_values,
+    "dept_name": bench_dept_name,
+    "normalize_departments": bench_normalize_departments,
+    "dept_averages": bench_dept_averages,
+    "boston_figure": bench_boston_figure,
+    "rollup_stipends": bench_rollup_stipends,
+}
+
+
+'''----- Running and storing -----'''
+
+def figure_bytes(result):
+    """Size of a figure's JSON as Dash sends it, or None if `result` is not a figure"""
+    if hasattr(result, "to_plotly_json"):
+        result = result.to_plotly_json()
+    elif not (isinstance(result, dict) and "data" in result):
+        return None
+    return len(json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder).encode())
+
+
+def run(name, scale, repeat):
+    """
+    Time one benchmark at one scale
+
+    Returns:
+        dict: rows, best and mean seconds over `repeat` runs, and figure bytes
+    """
+    func, rows = BENCHMARKS[name](scale)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return {"rows": rows, "best": min(times), "mean": sum(times) / len(times),
+            "figure_bytes": figure_bytes(result)}
+
+
+def git_revision():
+    """Short hash of HEAD, with -dirty when tracked files have changed"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                           capture_output=True, text=True).stdout.strip()
+    return commit + ("-dirty" if dirty else "")
+
+
+def load_previous(compare, exclude):
+    """Results to compare against: a file, a commit's results, or the latest other run"""
+    if compare:
+        path = compare if os.path.exists(compare) else os.path.join(RESULTS_FOLDER, f"{compare}.json")
+        if not os.path.exists(path):
+            sys.exit(f"no results at {path}")
+    else:
+        paths = [path for path in glob.glob(os.path.join(RESULTS_FOLDER, "*.json")) if path != exclude]
+        if not paths:
+            return None
+        path = max(paths, key=os.path.getmtime)
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_line(current, previous, threshold):
+    """Change in time and figure size against the previous run of the same benchmark"""
+    if previous is None:
+        return ""
+    notes = []
+    ratio = current["best"] / previous["best"] if previous["best"] else 1.0
+    notes.append(f"{ratio:5.2f}x time")
+    if ratio > 1 + threshold:
+        notes.append("SLOWER")
+    if current["figure_bytes"] != previous.get("figure_bytes"):
+        notes.append(f"figure {previous.get('figure_bytes')} -> {current['figure_bytes']} bytes")
+    return "  " + ", ".join(notes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run just these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark and scale")
+    parser.add_argument("--compare", help="commit or results file to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="flag times this much slower (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    revision = git_revision()
+    path = os.path.join(RESULTS_FOLDER, f"{revision}.json")
+    previous = load_previous(args.compare, path)
+    if previous:
+        print(f"comparing against {previous['commit']} ({previous['date']})")
+
+    # runs of only some benchmarks or scales add to this revision's results
+    results = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            results = json.load(f)["results"]
+    for name in args.only or BENCHMARKS:
+        for scale in args.scales:
+            key = f"{name}[{scale}x]"
+            results[key] = run(name, scale, args.repeat)
+            size = results[key]["figure_bytes"]
+            print(f"{key:<34} {results[key]['rows']:>10} rows {results[key]['best'] * 1000:10.1f} ms"
+                  + (f" {size:>10} bytes" if size is not None else " " * 17)
+                  + compare_line(results[key], (previous or {}).get("results", {}).get(key), args.threshold))
+
+    os.makedirs(RESULTS_FOLDER, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "commit": revision,
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "results": results,
+        }, f, indent=2)
+    print(f"wrote {path}")
@@ -1,19 +1,50 @@
+import functools
 import pandas as pd
 import plotly.graph_objects as go
 from dash import State, dcc, html, Input, Output
 import numpy as np
 import dash_bootstrap_components as dbc
+import data_store
+import figure_artifacts
 import utils
 import re
+from figure_cache import FigureCache
 
-def benefits():
+BENEFITS_TABLE = "health_insurance_comparison"
+
+# Patterns for pulling comparable numbers out of the benefit details text
+# dollar amounts with up to 30 characters of context on either side
+DOLLAR_PATTERN = re.compile(r'(?:([^$]{0,30})\$(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)([^$]{0,30}))')
+# percentages that aren't followed by a time unit
+PERCENT_PATTERN = re.compile(r'(\d+)%(?!\s*(?:days?|months?|years?))')
+# visit/session limits
+VISIT_PATTERN = re.compile(r'(\d+)\s+(?:visits?|sessions?)\s+(?:per|/)', re.IGNORECASE)
+
+def benefits_version():
+    """Fingerprint of the insurance CSV; changes whenever the file is edited"""
+    return data_store.table_version(BENEFITS_TABLE)
+
+def benefits_data():
+    """
+    Loads the insurance comparison the first time the chart or one of its
+    callbacks needs it, then reuses it until the CSV changes
+
+    Returns:
+        dict: universities, their networks and the key-benefit rows
+    """
+    return load_benefits_data(benefits_version())
+
+@functools.lru_cache(maxsize=1)
+def load_benefits_data(version):
+    """
+    Reads and prepares one version of the insurance CSV
+    (version is only the cache key, see benefits_version())
+    """
     # Read the CSV
-    benefits_df = pd.read_csv("data/health_insurance_comparison.csv")
+    benefits_df = data_store.read_table(BENEFITS_TABLE)
     
     # Get unique universities and benefits
     universities = benefits_df['University'].unique()
-    
-    print(universities)
 
     networks = {
         'MIT': 'Blue Cross Blue Shield',
@@ -42,14 +73,74 @@ def benefits():
         'Imaging (CT/MRI/PET)'
     ]
     
-    # Filter for only key benefits
-    benefits_df_filtered = benefits_df[benefits_df['Benefit'].isin(key_benefits)]
+    # Filter for only key benefits, and parse their values for the details chart
+    benefits_df_filtered = add_comparison_values(benefits_df[benefits_df['Benefit'].isin(key_benefits)])
+
+    return {"universities": universities, "networks": networks, "benefits": benefits_df_filtered}
+
+def filter_by_network(selected_network):
+    """
+    Universities and key-benefit rows for one network ('All' for every university)
+    """
+    data = benefits_data()
+    if selected_network == 'All':
+        filtered_unis = data["universities"]
+    else:
+        filtered_unis = [uni for uni, net in data["networks"].items() if net == selected_network]
+    
+    benefits_df_filtered = data["benefits"]
+    filtered_df = benefits_df_filtered[benefits_df_filtered['University'].isin(filtered_unis)]
+    return filtered_unis, filtered_df
+
+# Serialized unit charts and details charts. Keys start with the CSV version,
+# so edits to the data never serve stale figures:
+#   (version, "unit", network) and (version, "details", network, benefit)
+# 4 network options x 12 key benefits, so everything fits with room for a re-load
+benefits_figures = FigureCache("benefits", maxsize=128, shared=True)
+
+def network_unit_chart(network):
+    """Unit chart for a network option ('All' or a network name), built once per data version"""
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("benefits-unit", network)
+    return benefits_figures.get_or_build(
+        (benefits_version(), "unit", network),
+        lambda: benefits_fig(*filter_by_network(network)))
+
+def network_benefit_details(network, benefit):
+    """Details bar chart for one benefit within a network option, built once per data version"""
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("benefits-details", network, benefit)
+    return benefits_figures.get_or_build(
+        (benefits_version(), "details", network, benefit),
+        lambda: benefit_details(*filter_by_network(network), benefit))
+
+def network_legend(network):
+    """Icon legend for a network option, built once per data version"""
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("benefits-legend", network)
+    return _network_legend(benefits_version(), network)
+
+@functools.lru_cache(maxsize=16)
+def _network_legend(version, network):
+    return benefits_legend(*filter_by_network(network))
+
+def benefits_layout():
+    """
+    Builds the Dash layout for the benefits comparison.
+    Called by app.py the first time the hotspot is opened.
+
+    Returns:
+        html.Div: html code for the Dash layout
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("layouts", "benefits")
+    networks = benefits_data()["networks"]
 
     # Create the unit chart figure
-    benefits_fig_main = benefits_fig(universities, benefits_df_filtered)
+    benefits_fig_main = network_unit_chart('All')
     
     # Create initial details figure (default to Deductible)
-    benefits_details_fig = benefit_details(universities, benefits_df_filtered, 'Deductible')
+    benefits_details_fig = network_benefit_details('All', 'Deductible')
     
     # Create the Dash layout with side-by-side graphs
     div = html.Div([
@@ -94,6 +185,17 @@ def benefits():
         })
     ])
 
+    return div
+
+def benefits():
+    """
+    Creates Dash div and callbacks for the health insurance comparison
+    This is the function that gets imported into app.py
+
+    Returns:
+        callable: builds the html.Div for the Dash layout on first use
+        callbacks: functions for interactivity
+    """
     # NEW CALLBACK: Filter by network
     def network_filter_callback(app):
         @app.callback(
@@ -105,24 +207,15 @@ def benefits():
             suppress_callback_exceptions=True
         )
         def update_by_network(selected_network, clickData):
-            # Filter universities by network
-            if selected_network == 'All':
-                filtered_unis = universities
-            else:
-                filtered_unis = [uni for uni, net in networks.items() if net == selected_network]
-            
-            # Filter benefits dataframe
-            filtered_df = benefits_df_filtered[benefits_df_filtered['University'].isin(filtered_unis)]
-            
             # Get selected benefit from clickData
             benefit_name = 'Deductible'  # default
             if clickData and 'points' in clickData:
                 benefit_name = clickData['points'][0]['customdata'][0]
             
-            # Update all three components
-            new_unit_chart = benefits_fig(filtered_unis, filtered_df)
-            new_details = benefit_details(filtered_unis, filtered_df, benefit_name)
-            new_legend = benefits_legend(filtered_unis, filtered_df)
+            # Update all three components (cached per network/benefit and data version)
+            new_unit_chart = network_unit_chart(selected_network)
+            new_details = network_benefit_details(selected_network, benefit_name)
+            new_legend = network_legend(selected_network)
             
             return new_unit_chart, new_details, new_legend
 
@@ -136,39 +229,34 @@ def benefits():
             suppress_callback_exceptions=True
         )
         def update_details(clickData, selected_network):
-            # Filter universities by network
-            if selected_network == 'All':
-                filtered_unis = universities
-            else:
-                filtered_unis = [uni for uni, net in networks.items() if net == selected_network]
-            
-            filtered_df = benefits_df_filtered[benefits_df_filtered['University'].isin(filtered_unis)]
-            
             benefit_name = clickData["points"][0]['customdata'][0]
-            return benefit_details(filtered_unis, filtered_df, benefit_name)
+            return network_benefit_details(selected_network, benefit_name)
     
     title = 'Compare Northeastern with Other Universities on Health Insurance Benefits'
     subtitle = 'To see details for each benefit, hover over the icons. To see comparisons, click on an icon.'
     
-    # Return BOTH callbacks
-    return div, [network_filter_callback, benefits_details_callback], title, subtitle
+    # Return the layout builder and BOTH callbacks
+    return benefits_layout, [network_filter_callback, benefits_details_callback], title, subtitle
 
 # main figure, unit chart with the benefits
 def benefits_fig(universities, benefits_df_filtered):
     # Create the figure
     fig = go.Figure()
     
+    # Only the universities being shown, in their x-axis order
+    uni_positions = {uni: i for i, uni in enumerate(universities)}
+    rows = benefits_df_filtered[benefits_df_filtered['University'].isin(uni_positions)].copy()
+    rows['x'] = rows['University'].map(uni_positions)
+    rows = rows.sort_values('x', kind='stable')
+    rows['Has Benefit'] = rows['Coverage (Yes/No)'] == 'Yes'
+    
+    # Position of each icon in its university's stack (upwards for included
+    # benefits, downwards for excluded), in the order the rows appear
+    rows['Stack'] = rows.groupby(['University', 'Has Benefit'], sort=False).cumcount()
+    
     # Calculate max benefits on positive and negative sides separately
-    max_positive = 0
-    max_negative = 0
-
-    # Calculate spacing parameters (top and bottom might be different)
-    for uni in universities:
-        uni_data = benefits_df_filtered[benefits_df_filtered['University'] == uni]
-        positive_count = len(uni_data[uni_data['Coverage (Yes/No)'] == 'Yes'])
-        negative_count = len(uni_data[uni_data['Coverage (Yes/No)'] == 'No'])
-        max_positive = max(max_positive, positive_count) #num positive benefits
-        max_negative = max(max_negative, negative_count) #num negative benefits
+    max_positive = int(rows.loc[rows['Has Benefit'], 'Stack'].max() + 1) if rows['Has Benefit'].any() else 0 #num positive benefits
+    max_negative = int(rows.loc[~rows['Has Benefit'], 'Stack'].max() + 1) if (~rows['Has Benefit']).any() else 0 #num negative benefits
 
     # Icon size in pixels (marker size + some padding)
     icon_total_height_px = 45 
@@ -198,58 +286,45 @@ def benefits_fig(universities, benefits_df_filtered):
     color_yes = "#1c7cfa"
     color_no = "#f7af3b"
     
-    # Calculate positions for each university
-    uni_positions = {uni: i for i, uni in enumerate(universities)}
-    
-    # Add scatter points for each benefit
-    for uni in universities:
-        uni_data = benefits_df_filtered[benefits_df_filtered['University'] == uni]
-        
-        # Track y position for stacking
-        y_pos_positive = positive_spacing / 2
-        y_pos_negative = -negative_spacing / 2
-        
-        for _, row in uni_data.iterrows():
-            benefit = row['Benefit']
-            has_benefit = row['Coverage (Yes/No)'] == 'Yes'
-            details = row['Details'] if pd.notna(row['Details']) else 'No details available'
-            
-            # Get icon
-            icon = utils.benefit_icons.get(benefit, '❓')
-            
-            # Set position and color based on coverage   
-            if has_benefit:
-                y = y_pos_positive
-                y_pos_positive += positive_spacing
-                color = color_yes
-            else:
-                y = y_pos_negative
-                y_pos_negative -= negative_spacing
-                color = color_no
-            
-            # Add the point
-            fig.add_trace(go.Scatter(
-                x=[uni_positions[uni]],
-                y=[y],
-                mode='markers+text',
-                marker=dict(
-                    size=30,
-                    color=color,
-                    line=dict(color='white', width=2)
-                ),
-                text=[icon],
-                textposition="middle center",
-                textfont=dict(size=20),
-                customdata=[[benefit, utils.wrap_text(details, width=40)]],  # Wrap the details text because its going off the screen
-                hovertemplate=( # custom tooltips
-                    f"<b>{uni}</b><br>"
-                    f"<b>{benefit}</b><br>"
-                    f"Coverage: {'Yes' if has_benefit else 'No'}<br>"
-                    f"<i>%{{customdata[1]}}</i>"  # Use the wrapped text from customdata
-                    "<extra></extra>"
-                ),
-                showlegend=False
-            ))
+    # Set position based on coverage, centered in each slot of the stack
+    rows['y'] = np.where(
+        rows['Has Benefit'],
+        (rows['Stack'] + 0.5) * positive_spacing,
+        -(rows['Stack'] + 0.5) * negative_spacing
+    )
+    rows['Icon'] = rows['Benefit'].map(lambda benefit: utils.benefit_icons.get(benefit, '❓'))
+    # Wrap the details text because its going off the screen
+    rows['Details (wrapped)'] = rows['Details'].map(lambda details: utils.wrap_text(details, width=40))
+    
+    # One trace per coverage class, with per-point icons and tooltip data
+    for has_benefit, color in [(True, color_yes), (False, color_no)]:
+        points = rows[rows['Has Benefit'] == has_benefit]
+        if points.empty:
+            continue
+        coverage = 'Yes' if has_benefit else 'No'
+        fig.add_trace(go.Scatter(
+            x=points['x'],
+            y=points['y'],
+            mode='markers+text',
+            marker=dict(
+                size=30,
+                color=color,
+                line=dict(color='white', width=2)
+            ),
+            text=points['Icon'],
+            textposition="middle center",
+            textfont=dict(size=20),
+            customdata=points[['Benefit', 'Details (wrapped)', 'University']].to_numpy(),
+            hovertemplate=( # custom tooltips
+                "<b>%{customdata[2]}</b><br>"
+                "<b>%{customdata[0]}</b><br>"
+                f"Coverage: {coverage}<br>"
+                "<i>%{customdata[1]}</i>"  # Use the wrapped text from customdata
+                "<extra></extra>"
+            ),
+            name=f"Coverage: {coverage}",
+            showlegend=False
+        ))
     
     # Set y-axis range based on actual usage
     y_buffer = 1
@@ -357,27 +432,33 @@ def benefit_details(universities, benefits_df_filtered, selected_benefit='Deduct
     """
     fig = go.Figure()
     
-    # Get data for the selected benefit
+    # Values are parsed once at load; only compute them here for other frames
+    if 'Comparison Value' not in benefits_df_filtered:
+        benefits_df_filtered = add_comparison_values(benefits_df_filtered)
+    
+    # Get data for the selected benefit, one row per university
+    benefit_rows = benefits_df_filtered[benefits_df_filtered['Benefit'] == selected_benefit]
+    benefit_rows = {
+        row['University']: row
+        for row in benefit_rows.drop_duplicates('University').to_dict('records')
+    }
     benefit_data = []
     value_type = None
     
     for uni in universities:
         # get uni data
-        uni_data = benefits_df_filtered[
-            (benefits_df_filtered['University'] == uni) & 
-            (benefits_df_filtered['Benefit'] == selected_benefit)
-        ]
+        row = benefit_rows.get(uni)
         
-        if not uni_data.empty:
+        if row is not None:
             # get coverage status and details
-            has_coverage = uni_data.iloc[0]['Coverage (Yes/No)'] == 'Yes'
-            details = uni_data.iloc[0]['Details'] if has_coverage else 'Not covered'
+            has_coverage = row['Coverage (Yes/No)'] == 'Yes'
+            details = row['Details'] if has_coverage else 'Not covered'
             
             if has_coverage:
                 # get the values to put in the bar chart
-                value, vtype = get_best_comparison_value(details, selected_benefit)
+                value, vtype = row['Comparison Value'], row['Comparison Type']
 
-                if value is not None:
+                if pd.notna(value):
                     benefit_data.append({
                         'University': uni, 
                         'Value': value,
@@ -623,9 +704,7 @@ def extract_numerical_values(details_text):
     values = []
     
     # First, find all dollar amounts with their full context
-    dollar_pattern = r'(?:([^$]{0,30})\$(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)([^$]{0,30}))'
-    
-    for match in re.finditer(dollar_pattern, details_text):
+    for match in DOLLAR_PATTERN.finditer(details_text):
         # splits into 3 sections and checks for context
         before_context = match.group(1).lower()
         value = float(match.group(2).replace(',', ''))
@@ -660,8 +739,7 @@ def extract_numerical_values(details_text):
         })
     
     # Find percentages
-    percent_pattern = r'(\d+)%(?!\s*(?:days?|months?|years?))'
-    for match in re.finditer(percent_pattern, details_text):
+    for match in PERCENT_PATTERN.finditer(details_text):
         value = float(match.group(1))
         values.append({
             'value': value,
@@ -672,8 +750,7 @@ def extract_numerical_values(details_text):
         })
     
     # Find visit/day limits
-    visit_pattern = r'(\d+)\s+(?:visits?|sessions?)\s+(?:per|/)'
-    for match in re.finditer(visit_pattern, details_text, re.IGNORECASE):
+    for match in VISIT_PATTERN.finditer(details_text):
         value = float(match.group(1))
         values.append({
             'value': value,
@@ -690,10 +767,20 @@ def get_best_comparison_value(details_text, benefit_name):
     """
     Get the best numerical value for comparison on the bar chart based on the benefit type
     """
+    best_value = best_comparison_entry(details_text, benefit_name)
+    if best_value is None:
+        return None, None
+    return best_value['value'], best_value['type']
+
+def best_comparison_entry(details_text, benefit_name):
+    """
+    The extract_numerical_values() entry get_best_comparison_value() picks,
+    or None if the text has no usable number
+    """
     values = extract_numerical_values(details_text)
     
     if not values:
-        return None, None
+        return None
     
     # For prescription drugs, we want the lowest cost (generic/tier 1)
     if 'Prescription' in benefit_name:
@@ -703,7 +790,7 @@ def get_best_comparison_value(details_text, benefit_name):
             # For prescriptions, lower is better, so take the minimum
             # But prioritize based on context first
             best_value = min(dollar_values, key=lambda x: (x['priority'], x['value']))
-            return best_value['value'], best_value['type']
+            return best_value
     
     # For benefits that are coverage amounts (higher is better)
     coverage_benefits = ['Vision', 'Dental', 'Hearing Aids', 'Eyeglasses']
@@ -722,7 +809,28 @@ def get_best_comparison_value(details_text, benefit_name):
         # For cost benefits or unknown types, use priority system
         best_value = values[0] 
     
-    return best_value['value'], best_value['type']
+    return best_value
+
+def add_comparison_values(benefits_df):
+    """
+    Parses the comparison value out of every covered benefit's details once,
+    so the details chart only has to look them up
+
+    Returns:
+        pd.DataFrame: copy of benefits_df with 'Comparison Value',
+                      'Comparison Type' and 'Comparison Priority' columns
+                      (NaN/None where there is no coverage or no number)
+    """
+    benefits_df = benefits_df.copy()
+    entries = [
+        best_comparison_entry(details, benefit) if coverage == 'Yes' else None
+        for details, benefit, coverage in zip(
+            benefits_df['Details'], benefits_df['Benefit'], benefits_df['Coverage (Yes/No)'])
+    ]
+    benefits_df['Comparison Value'] = [entry['value'] if entry else np.nan for entry in entries]
+    benefits_df['Comparison Type'] = [entry['type'] if entry else None for entry in entries]
+    benefits_df['Comparison Priority'] = [entry['priority'] if entry else np.nan for entry in entries]
+    return benefits_df
 
 if __name__ == "__main__":
-    div, callbacks = benefits()
+    div = benefits_layout()
@@ -0,0 +1,222 @@
+"""
+Prerenders every figure and popup layout the app can show, for serving with
+FIGURE_ARTIFACTS (see figure_artifacts.py):
+
+- the timeline for every topic group and slider range
+- the change tables for every (article, date), and the most recent
+  language for every article
+- the benefits unit chart, legend and details for every network and benefit
+- the Boston living wage chart, the peer dropdown options, and the peer comparisons in
+  livingwage_vs_stipend.prerendered_peer_sets() (other peer sets are built
+  live when chosen)
+- each hotspot's popup layout (the department chart's college checklist
+  is handled in the browser, so its one figure covers every subset)
+
+The output goes to artifacts/<version>/, where the version hashes the CSVs
+and the code below. A build whose version already exists is skipped, and
+only the newest --keep builds are kept.
+
+    python build_figures.py [--output artifacts/] [--jobs 4] [--force] [--keep 2]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import dash
+import plotly
+
+import benefits_summary
+import data_store
+import department_stipend_avgs
+import figure_artifacts
+import livingwage_vs_stipend
+import timeline_dash
+import utils
+
+# Everything the prerendered output depends on besides the CSVs
+SOURCES = [
+    "build_figures.py",
+    "benefits_summary.py",
+    "data_store.py",
+    "department_stipend_avgs.py",
+    "livingwage_vs_stipend.py",
+    "timeline_dash.py",
+    "utils.py",
+    "images/rightarrow_final.png",
+]
+
+
+def artifact_version():
+    """Hash of the data, the drawing code and the Plotly/Dash versions"""
+    parts = {
+        "data": {name: data_store.table_version(name) for name in data_store.DATASETS},
+        "sources": {path: utils.file_fingerprint(path) for path in SOURCES},
+        "plotly": plotly.__version__,
+        "dash": dash.__version__,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16], parts
+
+
+'''----- Builders -----'''
+
+# Each builder writes one part of the output under `root` and returns
+# {kind: (files written, bytes written)}
+
+def write_all(root, kind, items):
+    """Write (key, figure) pairs; returns {kind: (count, bytes)}"""
+    count = size = 0
+    for key, value in items:
+        size += figure_artifacts.write(root, kind, key, value)
+        count += 1
+    return {kind: (count, size)}
+
+
+def build_timeline_group(root, group):
+    """Every slider range of one topic group"""
+    last = len(timeline_dash.timeline_state()["times"]) - 1
+    return write_all(root, "timeline", (
+        ((group, start, end), timeline_dash.build_timeline(group, start, end))
+        for start in range(last + 1)
+        for end in range(start, last + 1)
+    ))
+
+
+def build_timeline_tables(root):
+    state = timeline_dash.timeline_state()
+    changes_index = state["changes_index"]
+    articles = sorted({article for article, _ in changes_index})
+    return {
+        **write_all(root, "changes", (
+            ((article, date), timeline_dash.time_changes_table(changes_index, article, date))
+            for article, date in changes_index
+        )),
+        **write_all(root, "final", (
+            ((article,), timeline_dash.final_changes_table(state["summaries_index"], article))
+            for article in articles
+        )),
+    }
+
+
+def build_benefits(root):
+    data = benefits_summary.benefits_data()
+    networks = ["All"] + sorted(set(data["networks"].values()))
+    benefits = data["benefits"]["Benefit"].unique().tolist()
+    return {
+        **write_all(root, "benefits-unit", (
+            ((network,), benefits_summary.network_unit_chart(network)) for network in networks
+        )),
+        **write_all(root, "benefits-legend", (
+            ((network,), benefits_summary.network_legend(network)) for network in networks
+        )),
+        **write_all(root, "benefits-details", (
+            ((network, benefit), benefits_summary.network_benefit_details(network, benefit))
+            for network in networks for benefit in benefits
+        )),
+    }
+
+
+def build_livingwage(root):
+    return write_all(root, "livingwage", [
+        (("boston",), livingwage_vs_stipend.boston_figure()),
+        (("peer-options",), {"options": livingwage_vs_stipend.peer_options()}),
+        *((("peers",) + peers, livingwage_vs_stipend.peer_figure(peers))
+          for peers in livingwage_vs_stipend.prerendered_peer_sets()),
+    ])
+
+
+def build_layouts(root):
+    return write_all(root, "layouts", [
+        (("timeline",), timeline_dash.timeline_layout()),
+        (("livingwage",), livingwage_vs_stipend.livingwage_layout()),
+        (("departments",), department_stipend_avgs.dept_stipend_layout()),
+        (("benefits",), benefits_summary.benefits_layout()),
+    ])
+
+
+def run_task(task):
+    """Run one builder (in a worker process)"""
+    builder, root, *args = task
+    return builder(root, *args)
+
+
+'''----- Build -----'''
+
+def prune(output_folder, keep):
+    """Delete all but the `keep` most recently built versions"""
+    builds = [
+        os.path.join(output_folder, name) for name in os.listdir(output_folder)
+        if os.path.exists(os.path.join(output_folder, name, figure_artifacts.MANIFEST_NAME))
+    ]
+    builds.sort(key=os.path.getmtime, reverse=True)
+    for path in builds[keep:]:
+        shutil.rmtree(path)
+
+
+def build(output_folder=figure_artifacts.ARTIFACT_FOLDER, jobs=None, force=False, keep=2):
+    """
+    Prerender everything into output_folder/<version>/ and point CURRENT at it
+
+    Args:
+        output_folder (str): where builds are kept
+        jobs (int): worker processes (default: one per CPU)
+        force (bool): rebuild even if this version was already built
+        keep (int): number of builds to keep, including this one
+
+    Returns:
+        str: folder of the build
+    """
+    # build from the data, never from an earlier build
+    os.environ.pop(figure_artifacts.ENV, None)
+    figure_artifacts.enabled.cache_clear()
+
+    version, inputs = artifact_version()
+    root = os.path.join(output_folder, version)
+    if os.path.exists(os.path.join(root, figure_artifacts.MANIFEST_NAME)) and not force:
+        print(f"{root} is up to date")
+    else:
+        start = time.perf_counter()
+        tmp_root = f"{root}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        tasks = [(build_timeline_group, tmp_root, group) for group in timeline_dash.timeline_state()["topics"]]
+        tasks += [(builder, tmp_root) for builder in
+                  (build_timeline_tables, build_benefits, build_livingwage, build_layouts)]
+
+        counts = {}
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for result in pool.map(run_task, tasks):
+                for kind, (count, size) in result.items():
+                    total = counts.setdefault(kind, [0, 0])
+                    total[0] += count
+                    total[1] += size
+
+        with open(os.path.join(tmp_root, figure_artifacts.MANIFEST_NAME), "w") as f:
+            json.dump({"version": version, "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "inputs": inputs, "artifacts": counts}, f, indent=2, sort_keys=True)
+        shutil.rmtree(root, ignore_errors=True)
+        os.replace(tmp_root, root)
+
+        for kind, (count, size) in sorted(counts.items()):
+            print(f"{kind:<18} {count:>6} files {size / 2**20:8.1f} MB")
+        print(f"built {root} in {time.perf_counter() - start:.0f}s")
+
+    # readers pick up the new build through CURRENT, which is swapped atomically
+    current = os.path.join(output_folder, figure_artifacts.CURRENT_NAME)
+    with open(current + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(current + ".tmp", current)
+    prune(output_folder, keep)
+    return root
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prerender every figure the app can show")
+    parser.add_argument("--output", default=figure_artifacts.ARTIFACT_FOLDER, help="folder for the builds")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if nothing changed")
+    parser.add_argument("--keep", type=int, default=2, help="number of builds to keep")
+    args = parser.parse_args()
+    build(args.output, args.jobs, args.force, args.keep)
@@ -0,0 +1,300 @@
+"""
+Latency and payload metrics for every server-side Dash callback.
+
+Nothing is recorded unless one of the settings below is set. When one is,
+instrument(app) adds a before_request and an after_request hook that
+record, for each /_dash-update-component request:
+
+- wall: the whole request as Flask sees it
+- build: time inside the callback function itself (figure building etc.),
+  for callbacks registered inside labels()
+- serialize: time spent encoding the response as JSON, measured by the
+  encoder json_encoding.install() sets up
+- bytes: size of the response body
+
+Whatever is left of wall is Dash's own dispatch and output checks. The
+request names the callback's outputs, which is how Dash keys its
+callbacks, so samples are labelled with the callback's name and the
+hotspot it belongs to, set with labels() while registering (see
+app.register_callbacks()). Dash's dispatch table is only read. The most
+recent WINDOW samples per callback give p50/p95/p99, and totals count
+every call.
+
+Metrics live in the process that handled the call: under gunicorn each
+worker keeps, and serves at /metrics, only its own.
+
+Settings:
+- CALLBACK_METRICS=1 serves GET /metrics in Prometheus text format. The
+  route is not registered otherwise; it has no authentication, so only
+  enable it where the port is not public.
+- CALLBACK_METRICS_LOG=1 logs one JSON line per call on the
+  "callback_metrics" logger.
+- CALLBACK_PROFILE=N runs every callback request under cProfile and keeps
+  the profiles of the N slowest calls in CALLBACK_PROFILE_DIR (default
+  profiles/). Each call gets a .prof file for snakeviz/pstats and a .txt
+  summary. It is meant for debugging only: profiling slows every call down.
+"""
+import contextlib
+import cProfile
+import heapq
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import flask
+import numpy as np
+
+import json_encoding
+
+WINDOW = 2048  # samples per callback kept for percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+# timings and sizes recorded per call, with their Prometheus names
+MEASURES = {
+    "wall": "dash_callback_wall_seconds",
+    "build": "dash_callback_build_seconds",
+    "serialize": "dash_callback_serialize_seconds",
+    "bytes": "dash_callback_response_bytes",
+}
+UPDATE_PATH = "/_dash-update-component"
+METRICS_ENV = "CALLBACK_METRICS"
+LOG_ENV = "CALLBACK_METRICS_LOG"
+PROFILE_ENV = "CALLBACK_PROFILE"
+PROFILE_DIR_ENV = "CALLBACK_PROFILE_DIR"
+
+logger = logging.getLogger("callback_metrics")
+
+
+class CallbackMetrics:
+    """
+    Thread-safe store of per-callback samples: a bounded window of recent
+    values for percentiles, plus running counts and sums
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, callback, hotspot, **values):
+        """
+        Add one call's measurements
+
+        Args:
+            callback (str): callback function name
+            hotspot (str): hotspot the callback belongs to ("app" for app.py's own)
+            **values: any of MEASURES (seconds, or bytes), None if unknown
+        """
+        key = (callback, hotspot)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    measure: {"recent": deque(maxlen=self.window), "count": 0, "sum": 0.0}
+                    for measure in MEASURES
+                }
+            for measure, value in values.items():
+                if value is None:
+                    continue
+                stats = series[measure]
+                stats["recent"].append(value)
+                stats["count"] += 1
+                stats["sum"] += value
+
+    def summary(self):
+        """
+        Percentiles, counts and sums per callback
+
+        Returns:
+            dict: {(callback, hotspot): {measure: {"count", "sum", "p50", "p95", "p99"}}}
+        """
+        with self._lock:
+            snapshot = {
+                key: {measure: (list(stats["recent"]), stats["count"], stats["sum"])
+                      for measure, stats in series.items()}
+                for key, series in self._series.items()
+            }
+        result = {}
+        for key, series in snapshot.items():
+            result[key] = {}
+            for measure, (recent, count, total) in series.items():
+                if not count:
+                    continue
+                quantiles = np.quantile(recent, QUANTILES)
+                result[key][measure] = {
+                    "count": count,
+                    "sum": total,
+                    **{f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, quantiles)},
+                }
+        return result
+
+    def prometheus(self):
+        """All series as Prometheus summaries (text exposition format)"""
+        lines = []
+        summary = self.summary()
+        for measure, metric in MEASURES.items():
+            lines.append(f"# TYPE {metric} summary")
+            for (callback, hotspot), series in sorted(summary.items()):
+                if measure not in series:
+                    continue
+                stats = series[measure]
+                labels = f'callback="{callback}",hotspot="{hotspot}"'
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {stats[f"p{round(q * 100)}"]:.6g}')
+                lines.append(f"{metric}_sum{{{labels}}} {stats['sum']:.6g}")
+                lines.append(f"{metric}_count{{{labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+metrics = CallbackMetrics()
+
+# hotspot of each callback registered inside labels(...), by its Dash key (its outputs)
+_hotspots = {}
+# whether instrument() turned metrics on, so labels() times callback functions
+_timing = threading.Event()
+
+
+def timed_build(func):
+    """Wrap a callback function so its own run time is recorded as build time"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if flask.has_request_context():
+                flask.g.callback_build = time.perf_counter() - start
+    return wrapper
+
+
+@contextlib.contextmanager
+def labels(app, hotspot):
+    """
+    Label every callback registered on `app` inside this block with a hotspot.
+    With metrics on, their functions are wrapped in timed_build() as they are
+    registered (only inside the block).
+    """
+    existing = set(app.callback_map)
+    if _timing.is_set():
+        register = app.callback
+
+        def callback(*args, **kwargs):
+            decorator = register(*args, **kwargs)
+            return lambda func: decorator(timed_build(func))
+        app.callback = callback
+    try:
+        yield
+    finally:
+        if _timing.is_set():
+            del app.callback  # back to Dash's own method
+        for key in set(app.callback_map) - existing:
+            _hotspots[key] = hotspot
+
+
+class SlowestProfiles:
+    """Keeps cProfile dumps of the N slowest callback calls on disk"""
+
+    def __init__(self, keep, folder):
+        self.keep = keep
+        self.folder = folder
+        self._slowest = []  # min-heap of (seconds, path)
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def offer(self, seconds, callback, profiler):
+        """Save this call's profile if it is one of the slowest so far"""
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            path = os.path.join(self.folder, f"{callback}-{seconds * 1000:.0f}ms-{time.time_ns()}")
+            heapq.heappush(self._slowest, (seconds, path))
+            evicted = heapq.heappop(self._slowest) if len(self._slowest) > self.keep else None
+
+        profiler.dump_stats(path + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        with open(path + ".txt", "w") as f:
+            f.write(f"{callback}: {seconds * 1000:.1f} ms\n\n{text.getvalue()}")
+        if evicted is not None:
+            for suffix in (".prof", ".txt"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(evicted[1] + suffix)
+
+
+def callback_name(app, output):
+    """The function behind the callback Dash keys by `output`, or the key itself"""
+    entry = app.callback_map.get(output)
+    if entry is None:
+        return output
+    return getattr(entry["callback"], "__name__", output)
+
+
+def instrument(app):
+    """
+    Time every callback request on `app` and, with CALLBACK_METRICS set,
+    serve the metrics at /metrics. Does nothing unless one of the settings
+    in the module docstring is set.
+    """
+    serve = bool(os.environ.get(METRICS_ENV))
+    log_calls = bool(os.environ.get(LOG_ENV))
+    profiles = None
+    if os.environ.get(PROFILE_ENV):
+        profiles = SlowestProfiles(int(os.environ[PROFILE_ENV]),
+                                   os.environ.get(PROFILE_DIR_ENV, "profiles/"))
+    if not (serve or log_calls or profiles):
+        return metrics
+    _timing.set()
+    if log_calls and not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+
+    @app.server.before_request
+    def start_timer():
+        if not flask.request.path.endswith(UPDATE_PATH):
+            return
+        body = flask.request.get_json(silent=True) or {}
+        flask.g.callback_output = body.get("output")
+        if profiles:
+            flask.g.callback_profiler = cProfile.Profile()
+            flask.g.callback_profiler.enable()
+        flask.g.callback_start = time.perf_counter()
+
+    @app.server.after_request
+    def record_call(response):
+        start = flask.g.pop("callback_start", None)
+        if start is None:
+            return response
+        wall = time.perf_counter() - start
+        profiler = flask.g.pop("callback_profiler", None)
+        if profiler:
+            profiler.disable()
+        output = flask.g.pop("callback_output", None)
+        callback, hotspot = callback_name(app, output), _hotspots.get(output, "app")
+        if profiler:
+            profiles.offer(wall, callback, profiler)
+
+        sample = {"wall": wall,
+                  "build": flask.g.pop("callback_build", None),
+                  "serialize": json_encoding.encode_seconds(),
+                  "bytes": None if response.is_streamed else response.calculate_content_length()}
+        metrics.record(callback, hotspot, **sample)
+        if log_calls:
+            logger.info(json.dumps({"event": "dash_callback", "callback": callback, "hotspot": hotspot,
+                                    "status": response.status_code, **sample}))
+        return response
+
+    if serve:
+        @app.server.route("/metrics")
+        def serve_metrics():
+            return flask.Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
@@ -0,0 +1,132 @@
+"""
+Shared, typed access to the CSVs in data/.
+
+The first read of a CSV parses it once and writes a typed copy to
+data/.cache/ as an uncompressed Arrow IPC (Feather v2) file. Repeated
+low-cardinality text columns are stored as categoricals (dictionary
+encoded). Later reads memory-map that file instead of re-parsing text and
+re-inferring dtypes.
+
+Each cached copy is named after the CSV's content fingerprint
+(utils.file_fingerprint, which re-hashes only when the CSV's size or mtime
+changes) and its column types below. Editing either one picks up a fresh
+copy on the next read, and older copies are removed.
+
+    stipends = data_store.read_table("boston_stipends")
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+import utils
+
+DATA_FOLDER = "data/"
+CACHE_FOLDER = os.path.join(DATA_FOLDER, ".cache")
+
+# Tables the visualizations read. "categories" are repeated labels that are only
+# compared, grouped or mapped, never rewritten in place, so they are safe to
+# store as categoricals. Group on them with observed=True: before pandas 3
+# the default lists every combination of categories, including empty ones.
+DATASETS = {
+    "boston_stipends": {
+        "csv": "boston_stipends.csv",
+        "categories": ["University", "Program Year"],
+    },
+    "cleaned_stipends": {
+        "csv": "cleaned_stipends.csv",
+        "categories": ["University", "Program Year"],
+    },
+    "contract_negotiations": {
+        "csv": "contract_negotiations.csv",
+        "categories": ["Party"],
+    },
+    "contract_recent_summaries": {
+        "csv": "contract_recent_summaries.csv",
+        "categories": [],
+    },
+    "health_insurance_comparison": {
+        "csv": "health_insurance_comparison.csv",
+        "categories": ["Coverage (Yes/No)"],
+    },
+}
+
+
+def csv_path(name):
+    """Path of a dataset's source CSV"""
+    return os.path.join(DATA_FOLDER, DATASETS[name]["csv"])
+
+
+def table_version(name):
+    """
+    Fingerprint of a dataset's CSV and its entry in DATASETS; changes whenever
+    the file is edited or its column types are changed here
+    """
+    spec = json.dumps(DATASETS[name], sort_keys=True).encode()
+    return f"{utils.file_fingerprint(csv_path(name))}-{hashlib.sha256(spec).hexdigest()[:8]}"
+
+
+def cache_path(name, version):
+    """Path of the typed columnar copy of one version of a dataset"""
+    return os.path.join(CACHE_FOLDER, f"{name}-{version}.arrow")
+
+
+def build_cache(name, version):
+    """
+    Parse a dataset's CSV once and write its typed columnar copy
+
+    Args:
+        name (str): key in DATASETS
+        version (str): CSV fingerprint the copy is named after
+
+    Returns:
+        str: path of the written file
+    """
+    spec = DATASETS[name]
+    df = pd.read_csv(csv_path(name))
+    for column in spec["categories"]:
+        df[column] = df[column].astype("category")
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    path = cache_path(name, version)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # uncompressed so that reads can memory-map the file
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    # rename is atomic, so concurrent readers never see a partial file
+    os.replace(tmp_path, path)
+
+    # drop copies of older versions of this CSV
+    prefix = f"{name}-"
+    for filename in os.listdir(CACHE_FOLDER):
+        if filename.startswith(prefix) and filename.endswith(".arrow") \
+                and filename != os.path.basename(path):
+            os.remove(os.path.join(CACHE_FOLDER, filename))
+    return path
+
+
+def read_arrow(name, columns=None):
+    """
+    A dataset as a memory-mapped Arrow table, (re)building the cached copy if
+    the CSV has changed since it was written
+    """
+    version = table_version(name)
+    path = cache_path(name, version)
+    if not os.path.exists(path):
+        path = build_cache(name, version)
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def read_table(name, columns=None):
+    """
+    A dataset as a DataFrame, read from its typed columnar cache
+
+    Args:
+        name (str): key in DATASETS, e.g. "boston_stipends"
+        columns (list[str]): only read these columns (all when not given)
+
+    Returns:
+        pd.DataFrame: a fresh frame that callers are free to modify
+    """
+    return read_arrow(name, columns).to_pandas()
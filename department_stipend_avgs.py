@@ -1,19 +1,41 @@
+import functools
 import pandas as pd
 import plotly.express as px
-from dash import html, dcc, Input, Output
+from dash import html, dcc, Input, Output, State
+import data_store
+import figure_artifacts
+import shared_cache
 import utils
 
-def department_stipend_avgs():
+@functools.lru_cache(maxsize=None)
+def dept_stipend_data():
     """
-    Creates Dash div and callbacks for the department stipend comparison line chart
-    with college filtering capability
+    Loads and averages Northeastern department stipends the first time the
+    chart needs them, then reuses the result
+
+    Returns:
+        pd.DataFrame: yearly averages per department, with college
     """
     # Load data
-    stipends = pd.read_csv("data/boston_stipends.csv")
-    
+    stipends = data_store.read_table(
+        "boston_stipends", columns=["University", "Department", "Overall Pay", "Academic Year"]
+    )
+    return dept_averages(stipends)
+
+def dept_averages(stipends:pd.DataFrame):
+    """
+    Yearly Northeastern averages for the departments with enough data
+
+    Args:
+        stipends (pd.DataFrame): stipend reports (University, Department,
+            Overall Pay, Academic Year)
+
+    Returns:
+        pd.DataFrame: yearly averages per department, with college
+    """
     # Filter for Northeastern University and standardize department names
     neu_mask = stipends["University"] == "Northeastern University"
-    stipends.loc[neu_mask, "Department"] = stipends[neu_mask]["Department"].apply(utils.dept_name)
+    stipends.loc[neu_mask, "Department"] = utils.normalize_departments(stipends.loc[neu_mask, "Department"])
     
     # Calculate department averages by academic year
     neu_stipends = (
@@ -69,8 +91,122 @@ def department_stipend_avgs():
         return f"{round(elem, -3)}"[:2]
     neu_avgs["Pay Rounded"] = neu_avgs["Overall Pay"].apply(rounded_stipend)
     
+    return neu_avgs
+
+@functools.lru_cache(maxsize=None)
+@shared_cache.shared("dept_stipend_figure")
+def dept_stipend_figure():
+    """
+    Builds the department stipend chart once, with every department.
+    Each trace's meta holds its college, so the college checklist can show
+    and hide traces in the browser without rebuilding the figure.
+
+    Returns:
+        dict: serialized figure
+    """
+    neu_avgs = dept_stipend_data()
+    
+    # Create visualization
+    neu_stipends_time = px.line(
+        neu_avgs,
+        x="Academic Year",
+        y="Overall Pay",
+        color="Department",
+        color_discrete_sequence=px.colors.qualitative.Pastel,
+        markers=True,
+        #height=500,
+        custom_data=["Department", "Pay Rounded", "College"]
+    )
+    
+    # Format y-axis for currency
+    neu_stipends_time.update_layout(
+        yaxis_tickprefix='$', 
+        yaxis_tickformat=',.0s',
+        xaxis_title="Academic Year",
+        yaxis_title="Overall Pay (Average)",
+        legend_title="Department",
+        hovermode='x unified'
+    ).update_traces(
+        hovertemplate="<b>%{customdata[0]}</b><br>" +
+                    "%{customdata[2]}<br>" +
+                    "Average Pay: $%{customdata[1]}k<extra></extra>"
+    ).update_xaxes(
+        tickmode='linear',
+        dtick=1
+    )
+
+    # Background and gridlines
+    neu_stipends_time.update_layout(
+        plot_bgcolor="rgba(0, 4, 255, 0.02)"
+    )
+    neu_stipends_time.update_xaxes(
+        gridcolor="rgba(0, 4, 255, 0.05)"
+    )
+
+    # Add reference lines
+    neu_stipends_time.add_shape(
+        type="line",
+        x0=2010, x1=2025, 
+        y0=63942, y1=63942,
+        line=dict(color="#A2A2A2", dash="dash")
+    )
+    
+    neu_stipends_time.add_shape(
+        type="line",
+        x0=2024, x1=2026,
+        y0=63942, y1=63942,
+        line=dict(color="#248f24", dash="dash")
+    ).add_annotation(
+        x=2020.5,
+        y=63942,
+        text="2025 Boston Living Wage: $63,942",
+        showarrow=False,
+        xanchor="left",
+        yanchor="bottom",
+        font=dict(color="#248f24")
+    )
+
+    neu_stipends_time.add_hline(
+        y=15650, 
+        line_dash="dash", 
+        annotation_text="Federal Poverty Line: $15,650", 
+        line=dict(color="#A2A2A2")
+    )
+    
+    # Tag each department's trace with its college for the checklist toggle
+    college_of = neu_avgs.drop_duplicates("Department").set_index("Department")["College"]
+    neu_stipends_time.for_each_trace(lambda trace: trace.update(meta=college_of[trace.name]))
+    
+    return neu_stipends_time.to_plotly_json()
+
+# Shows only the departments of the checked colleges by toggling trace
+# visibility in the browser; nothing is sent to the server. Hidden traces also
+# drop out of the legend and the axis autorange, like filtering the data did.
+TOGGLE_COLLEGES_JS = """
+function(selectedColleges, figure) {
+    if (!figure) {
+        return window.dash_clientside.no_update;
+    }
+    var selected = new Set(selectedColleges || []);
+    var data = figure.data.map(function (trace) {
+        return Object.assign({}, trace, {visible: selected.has(trace.meta)});
+    });
+    return Object.assign({}, figure, {data: data});
+}
+"""
+
+def dept_stipend_layout():
+    """
+    Builds the Dash layout for the department stipend chart.
+    Called by app.py the first time the hotspot is opened.
+
+    Returns:
+        html.Div: html code for the Dash layout
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("layouts", "departments")
     # Get unique colleges for filter options
-    unique_colleges = sorted(neu_avgs["College"].unique())
+    unique_colleges = sorted(dept_stipend_data()["College"].unique())
     
     # Create layout with filter
     layout = html.Div([
@@ -86,7 +222,8 @@ def department_stipend_avgs():
             )
         ], style={'marginBottom': '20px', 'padding': '10px', 'backgroundColor': '#f5f5f5', 'borderRadius': '5px'}),
         
-        dcc.Graph(id='stipend-time-chart'),
+        # all departments, filtered client-side by TOGGLE_COLLEGES_JS
+        dcc.Graph(id='stipend-time-chart', figure=dept_stipend_figure()),
         
         html.Div([
             "Data Source: Living Wage Calculator (MIT) and Stipend Data Collected from ",
@@ -95,90 +232,30 @@ def department_stipend_avgs():
         html.Div("Data is self-reported by graduate students across various departments and universities.")
     ])
     
+    return layout
+
+def department_stipend_avgs():
+    """
+    Creates Dash div and callbacks for the department stipend comparison line chart
+    with college filtering capability
+
+    Returns:
+        callable: builds the html.Div for the Dash layout on first use
+        callbacks: functions for interactivity
+    """
     # Define callback function (to be registered in main app)
     def register_callbacks(app):
-        @app.callback(
+        # clientside: toggling a college never makes a server round trip
+        app.clientside_callback(
+            TOGGLE_COLLEGES_JS,
             Output('stipend-time-chart', 'figure'),
-            Input('stipend-college-filter', 'value')
+            Input('stipend-college-filter', 'value'),
+            State('stipend-time-chart', 'figure'),
+            prevent_initial_call=True
         )
-        def update_stipend_chart(selected_colleges):
-            # Filter data based on selection
-            if selected_colleges:  # If any colleges are selected
-                filtered_data = neu_avgs[neu_avgs["College"].isin(selected_colleges)]
-            else:  # If no colleges are selected, show empty chart
-                filtered_data = neu_avgs[neu_avgs["College"].isin([])]
-            
-            # Create visualization
-            neu_stipends_time = px.line(
-                filtered_data,
-                x="Academic Year",
-                y="Overall Pay",
-                color="Department",
-                color_discrete_sequence=px.colors.qualitative.Pastel,
-                markers=True,
-                #height=500,
-                custom_data=["Department", "Pay Rounded", "College"]
-            )
-            
-            # Format y-axis for currency
-            neu_stipends_time.update_layout(
-                yaxis_tickprefix='$', 
-                yaxis_tickformat=',.0s',
-                xaxis_title="Academic Year",
-                yaxis_title="Overall Pay (Average)",
-                legend_title="Department",
-                hovermode='x unified'
-            ).update_traces(
-                hovertemplate="<b>%{customdata[0]}</b><br>" +
-                            "%{customdata[2]}<br>" +
-                            "Average Pay: $%{customdata[1]}k<extra></extra>"
-            ).update_xaxes(
-                tickmode='linear',
-                dtick=1
-            )
-
-            # Background and gridlines
-            neu_stipends_time.update_layout(
-                plot_bgcolor="rgba(0, 4, 255, 0.02)"
-            )
-            neu_stipends_time.update_xaxes(
-                gridcolor="rgba(0, 4, 255, 0.05)"
-            )
-
-            # Add reference lines
-            neu_stipends_time.add_shape(
-                type="line",
-                x0=2010, x1=2025, 
-                y0=63942, y1=63942,
-                line=dict(color="#A2A2A2", dash="dash")
-            )
-            
-            neu_stipends_time.add_shape(
-                type="line",
-                x0=2024, x1=2026,
-                y0=63942, y1=63942,
-                line=dict(color="#248f24", dash="dash")
-            ).add_annotation(
-                x=2020.5,
-                y=63942,
-                text="2025 Boston Living Wage: $63,942",
-                showarrow=False,
-                xanchor="left",
-                yanchor="bottom",
-            font=dict(color="#248f24")
-        )
-
-            neu_stipends_time.add_hline(
-                y=15650, 
-                line_dash="dash", 
-                annotation_text="Federal Poverty Line: $15,650", 
-                line=dict(color="#A2A2A2")
-            )
-            
-            return neu_stipends_time
     
     title = "Department Stipend Averages are Erratic Across Years"
     subtitle = "Some departments' stipends have increased, some decreased over time. Overall, stipends remain well below the living wage."
     
-    # Return layout and callback registration function as a list to match app.py expectations
-    return layout, [register_callbacks], title, subtitle
\ No newline at end of file
+    # Return layout builder and callback registration function as a list to match app.py expectations
+    return dept_stipend_layout, [register_callbacks], title, subtitle
@@ -0,0 +1,412 @@
+"""
+Exports the dashboard as a static site that needs no Python server: the
+contract pages with their hotspots, the popups, and every figure, which
+static_site/dashboard.js loads and switches between in the browser.
+
+The figures come from build_figures.py (run here if they are out of date):
+- each timeline group and slider range;
+- each change table;
+- each benefits network and benefit;
+- the Boston chart, and the prerendered peer comparisons. Without a server
+  no other peer set can be drawn, so the static page offers just those:
+  the Boston-area peers, or Northeastern against one of the most reported
+  universities.
+
+The page, its hotspots and the "Jump to" list are rendered from app.py's own
+layout, so the two stay in step.
+
+    python export_static.py [--output site/] [--jobs 4]
+    python -m http.server --directory site/
+"""
+import argparse
+import html as html_text
+import json
+import os
+import re
+import shutil
+
+import plotly.io.json as pio_json
+
+import app
+import benefits_summary
+import build_figures
+import department_stipend_avgs
+import figure_artifacts
+import livingwage_vs_stipend
+import timeline_dash
+
+OUTPUT_FOLDER = "site/"
+STATIC_FOLDER = "static_site/"
+PLOTLY_JS = os.path.join(os.path.dirname(pio_json.__file__), "..", "package_data", "plotly.min.js")
+
+# CSS properties React leaves without "px" when given a number
+UNITLESS = {"flex", "fontWeight", "lineHeight", "opacity", "order", "zIndex", "zoom"}
+# renamed attributes; props not listed here or below are written as they are
+ATTRIBUTES = {"className": "class", "htmlFor": "for", "srcSet": "srcset"}
+SKIPPED_PROPS = {"children", "style", "n_clicks", "n_clicks_timestamp", "disable_n_clicks",
+                 "loading_state", "key", "setProps"}
+VOID_ELEMENTS = {"area", "br", "col", "hr", "img", "input", "source", "wbr"}
+
+
+'''----- Rendering Dash components -----'''
+
+def css(style):
+    """A Dash style dict as an inline CSS string"""
+    rules = []
+    for name, value in style.items():
+        if isinstance(value, (dict, list)):
+            continue
+        if isinstance(value, (int, float)) and name not in UNITLESS:
+            value = f"{value}px"
+        rules.append(f"{re.sub(r'[A-Z]', lambda m: '-' + m.group().lower(), name)}: {value}")
+    return "; ".join(rules)
+
+
+def component_html(node, custom=None, rewrite=None, titles=None):
+    """
+    Static HTML for a Dash component tree made of html.* components
+
+    Args:
+        node: component, its serialized dict, a list of them, or text
+        custom (callable): returns the HTML for any other component (a dict),
+            or None if it can't be rendered
+        rewrite (callable): applied to every attribute value, e.g. to fix URLs
+        titles (dict): element id -> tooltip text (from dbc.Tooltip targets)
+
+    Returns:
+        str: HTML
+    """
+    if hasattr(node, "to_plotly_json"):
+        node = json.loads(pio_json.to_json_plotly(node))
+    if titles is None:
+        titles = {}
+        collect_tooltips(node, titles)
+
+    def render(node):
+        if node is None:
+            return ""
+        if isinstance(node, list):
+            return "".join(render(child) for child in node)
+        if not isinstance(node, dict):
+            return html_text.escape(str(node))
+
+        props = node.get("props", {})
+        if node.get("namespace") != "dash_html_components":
+            if node.get("type") == "Tooltip":
+                return ""  # shown as the target's title, see collect_tooltips
+            rendered = custom(node) if custom else None
+            if rendered is None:
+                raise ValueError(f"no static HTML for {node.get('namespace')}.{node.get('type')}")
+            return rendered
+
+        tag = node["type"].lower()
+        attributes = []
+        if isinstance(props.get("id"), str) and props["id"] in titles:
+            attributes.append(f'title="{html_text.escape(titles[props["id"]])}"')
+        for name, value in props.items():
+            if name in SKIPPED_PROPS or value is None or value is False or isinstance(value, (dict, list)):
+                continue
+            name = ATTRIBUTES.get(name, name)
+            if value is True:
+                attributes.append(name)
+                continue
+            value = str(value)
+            if rewrite:
+                value = rewrite(value)
+            attributes.append(f'{name}="{html_text.escape(value)}"')
+        if props.get("style"):
+            attributes.append(f'style="{html_text.escape(css(props["style"]))}"')
+        opening = f"<{tag}{''.join(' ' + attribute for attribute in attributes)}>"
+        if tag in VOID_ELEMENTS:
+            return opening
+        return f"{opening}{render(props.get('children'))}</{tag}>"
+
+    return render(node)
+
+
+def collect_tooltips(node, titles):
+    """Map each dbc.Tooltip's target id to its text"""
+    if isinstance(node, list):
+        for child in node:
+            collect_tooltips(child, titles)
+    elif isinstance(node, dict):
+        props = node.get("props", {})
+        if node.get("type") == "Tooltip" and isinstance(props.get("target"), str):
+            titles[props["target"]] = component_text(props.get("children"))
+        collect_tooltips(props.get("children"), titles)
+
+
+def component_text(node):
+    """The text inside a component tree"""
+    if node is None:
+        return ""
+    if isinstance(node, list):
+        return " ".join(component_text(child) for child in node)
+    if isinstance(node, dict):
+        return component_text(node.get("props", {}).get("children"))
+    return str(node)
+
+
+def options_html(values, selected=(), labels=None):
+    """<option>s for a <select>"""
+    return "".join(
+        f'<option value="{html_text.escape(str(value))}"{" selected" if value in selected else ""}>'
+        f"{html_text.escape(str(labels[i] if labels else value))}</option>"
+        for i, value in enumerate(values)
+    )
+
+
+def choices_html(name, values, checked, kind="radio", labels=None):
+    """Labelled radio buttons or checkboxes"""
+    return "".join(
+        f'<label><input type="{kind}" name="{name}" value="{html_text.escape(value)}"'
+        f'{" checked" if value in checked else ""}> {html_text.escape(labels[i] if labels else value)}</label>'
+        for i, value in enumerate(values)
+    )
+
+
+'''----- Visualizations -----'''
+
+# Each section copies its figures into figures/ and returns the popup body
+# and the data dashboard.js needs for it
+
+class Site:
+    """Output folder of the export and the build its figures come from"""
+
+    def __init__(self, output_folder, artifact_root):
+        self.output_folder = output_folder
+        self.artifact_root = artifact_root
+
+    def copy_artifact(self, kind, key, path):
+        """Copy a prerendered figure to figures/<path>"""
+        target = os.path.join(self.output_folder, "figures", path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(figure_artifacts.artifact_path(self.artifact_root, kind, key), target)
+
+    def load_artifact(self, kind, key):
+        with open(figure_artifacts.artifact_path(self.artifact_root, kind, key)) as f:
+            return json.load(f)
+
+    def write_figure(self, figure, path):
+        target = os.path.join(self.output_folder, "figures", path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w") as f:
+            f.write(pio_json.to_json_plotly(figure))
+
+
+def timeline_section(site):
+    state = timeline_dash.timeline_state()
+    groups, times = state["topics"], state["times"]
+    last = len(times) - 1
+    for index, group in enumerate(groups):
+        for start in range(last + 1):
+            for end in range(start, last + 1):
+                site.copy_artifact("timeline", (group, start, end), f"timeline/{index}/{start}-{end}.json")
+
+    changes, final = {}, {}
+    for number, (article, date) in enumerate(state["changes_index"]):
+        site.copy_artifact("changes", (article, date), f"changes/{number}.json")
+        changes.setdefault(article, {})[date] = number
+    for number, article in enumerate(sorted(changes)):
+        site.copy_artifact("final", (article,), f"final/{number}.json")
+        final[article] = number
+
+    prompt = component_html(timeline_dash.create_instruction_prompt())
+    data = {
+        "groups": groups,
+        "descriptions": timeline_dash.TOPIC_DESCRIPTIONS,
+        "dates": [time.date().strftime("%m/%d/%y") for time in times[:-1]] + ["Present"],
+        "changes": changes,
+        "final": final,
+        "prompt": prompt,
+    }
+    body = f"""
+<div class="controls">
+  <label for="timeline-group"><b>Select Topic Group:</b></label>
+  <select id="timeline-group">{options_html(groups, [timeline_dash.DEFAULT_GROUP])}</select>
+  <div id="topic-description" style="font-style: italic; color: #495057; margin-top: 10px"></div>
+</div>
+<div id="negotiation-timeline"></div>
+<div style="float: right; margin-right: 35px">
+  <img src="images/rightarrow_final.png" alt="Timeline arrow pointing right from January 25, 2024 to present">
+</div>
+<div class="range-slider">
+  <div id="timeline-range"></div>
+  <input type="range" id="timeline-start" min="0" max="{last}" step="1" value="0" aria-label="First date">
+  <input type="range" id="timeline-end" min="0" max="{last}" step="1" value="{last}" aria-label="Last date">
+</div>
+<div class="tables">
+  <div id="left-content-container">{prompt}</div>
+  <div id="right-content-container"></div>
+</div>"""
+    return body, data
+
+
+def benefits_section(site):
+    benefits_data = benefits_summary.benefits_data()
+    networks = ["All"] + sorted(set(benefits_data["networks"].values()))
+    benefits = benefits_data["benefits"]["Benefit"].unique().tolist()
+    legends = []
+    for index, network in enumerate(networks):
+        site.copy_artifact("benefits-unit", (network,), f"benefits/unit-{index}.json")
+        for number, benefit in enumerate(benefits):
+            site.copy_artifact("benefits-details", (network, benefit), f"benefits/details-{index}-{number}.json")
+        legends.append(component_html(site.load_artifact("benefits-legend", (network,))))
+
+    body = f"""
+<div class="controls">
+  <b style="margin-right: 15px">Filter by Network:</b>
+  {choices_html("benefits-network-filter", networks, ["All"])}
+</div>
+<div style="background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1)">
+  <div id="benefits-unit-chart" style="width: 68%; display: inline-block; vertical-align: top"></div>
+  <div style="width: 30%; display: inline-block; vertical-align: top">
+    <div id="benefits-details-chart"></div>
+    <div id="benefits-legend-container"></div>
+  </div>
+</div>"""
+    return body, {"networks": networks, "benefits": benefits, "legends": legends}
+
+
+DATA_SOURCE = """
+<div>Data Source: Living Wage Calculator (MIT) and Stipend Data Collected from
+  <a href="https://www.phdstipends.com">phdstipends.com</a></div>
+<div>Data is self-reported by graduate students across various departments and universities.</div>"""
+
+
+def livingwage_section(site):
+    site.copy_artifact("livingwage", ("boston",), "livingwage/boston.json")
+    reports = livingwage_vs_stipend.national_rollups()["reports"]
+    labels = []
+    for index, peers in enumerate(livingwage_vs_stipend.prerendered_peer_sets()):
+        site.copy_artifact("livingwage", ("peers",) + peers, f"livingwage/peers/{index}.json")
+        labels.append("Boston-area peers" if index == 0 else f"{peers[0]} ({reports[peers[0]]} reports)")
+    body = f"""
+<div class="controls">
+  {choices_html("livingwage-mode", ["boston", "national"], ["boston"], labels=[
+      "Boston-area universities", "Northeastern vs. chosen peers (national data)"])}
+  <input type="search" id="livingwage-peer-search" placeholder="Search for universities to compare..." disabled>
+  <select id="livingwage-peers" size="8" disabled>{options_html(
+      [str(index) for index in range(len(labels))], ["0"], labels=labels)}</select>
+</div>
+<div id="livingwage-chart"></div>
+{DATA_SOURCE}"""
+    return body, {}
+
+
+def departments_section(site):
+    site.write_figure(department_stipend_avgs.dept_stipend_figure(), "departments.json")
+    colleges = sorted(department_stipend_avgs.dept_stipend_data()["College"].unique())
+    body = f"""
+<div class="controls">
+  <b style="display: block; margin-bottom: 10px">Filter by College:</b>
+  {choices_html("stipend-college-filter", colleges, colleges, kind="checkbox")}
+</div>
+<div id="stipend-time-chart"></div>
+{DATA_SOURCE}"""
+    return body, {}
+
+
+# Popup layouts in app.content_mapping and their static versions
+SECTIONS = {
+    timeline_dash.timeline_layout: ("timeline", timeline_section),
+    benefits_summary.benefits_layout: ("benefits", benefits_section),
+    livingwage_vs_stipend.livingwage_layout: ("livingwage", livingwage_section),
+    department_stipend_avgs.dept_stipend_layout: ("departments", departments_section),
+}
+
+
+'''----- Page -----'''
+
+def modal_html(modal_id, title, body, size="xl"):
+    return f"""
+<div id="{modal_id}" class="modal" hidden>
+  <div class="modal-dialog modal-{size}">
+    <div class="modal-header"><div class="modal-title" id="{modal_id.replace('modal', 'title')}">{title}</div></div>
+    <div class="modal-body">{body}</div>
+    <div class="modal-footer"><button type="button" data-close="{modal_id}">Close</button></div>
+  </div>
+</div>"""
+
+
+def export(output_folder=OUTPUT_FOLDER, jobs=None):
+    """
+    Write the static site
+
+    Args:
+        output_folder (str): folder for the site (replaced if it exists)
+        jobs (int): worker processes for build_figures, if it has to run
+
+    Returns:
+        str: path of index.html
+    """
+    artifact_root = build_figures.build(jobs=jobs)
+    shutil.rmtree(output_folder, ignore_errors=True)
+    os.makedirs(output_folder)
+    site = Site(output_folder, artifact_root)
+
+    titles, bodies, data = [], [], {"hotspots": {}}
+    for hotspot_id in app.HOTSPOT_IDS:
+        name, section = SECTIONS[app.content_mapping[hotspot_id]["layout"]]
+        body, data[name] = section(site)
+        data["hotspots"][hotspot_id] = name
+        titles.append(f'<div data-hotspot="{hotspot_id}" hidden>{component_html(app.popup_title(hotspot_id))}</div>')
+        bodies.append(f'<div id="popup-body-{hotspot_id}" data-hotspot="{hotspot_id}" hidden>{body}</div>')
+
+    def modals(node):
+        props = node.get("props", {})
+        if props.get("id") == "popup-modal":
+            return modal_html("popup-modal", "".join(titles), f'<div id="popup-content">{"".join(bodies)}</div>')
+        if props.get("id") == "jump-modal":
+            jump_body = app.jump_modal_layout.children[1].children
+            return modal_html("jump-modal", "Jump to Visualization", component_html(jump_body), size="lg")
+        if node.get("namespace") == "dash_core_components":
+            return ""  # stores and the URL bar only matter to Dash
+        return None
+
+    # page images are served from pages/ instead of app.py's /pages/ route
+    page = component_html(app.app.layout, custom=modals,
+                          rewrite=lambda value: value.replace(app.PAGE_URL_PREFIX, "pages/"))
+
+    shutil.copytree(app.PDF_IMAGE_FOLDER, os.path.join(output_folder, "pages"),
+                    ignore=shutil.ignore_patterns("*.js", "*.json", "*.css"))
+    os.makedirs(os.path.join(output_folder, "images"))
+    shutil.copy(os.path.join("images", "rightarrow_final.png"), os.path.join(output_folder, "images"))
+    for filename in ("dashboard.js", "dashboard.css"):
+        shutil.copy(os.path.join(STATIC_FOLDER, filename), output_folder)
+    shutil.copy(os.path.join(app.PDF_IMAGE_FOLDER, "lazy_pages.js"), output_folder)
+    shutil.copy(PLOTLY_JS, output_folder)
+
+    # "</" can't appear inside a <script>, whatever the data holds
+    embedded = json.dumps(data).replace("</", "<\\/")
+    index = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html_text.escape(app.title)}</title>
+<link rel="stylesheet" href="dashboard.css">
+</head>
+<body>
+{page}
+<script id="dashboard-data" type="application/json">{embedded}</script>
+<script>var DASHBOARD_CLIENTSIDE = {{toggleColleges: {department_stipend_avgs.TOGGLE_COLLEGES_JS.strip()}}};</script>
+<script src="plotly.min.js"></script>
+<script src="lazy_pages.js"></script>
+<script src="dashboard.js"></script>
+</body>
+</html>
+"""
+    path = os.path.join(output_folder, "index.html")
+    with open(path, "w") as f:
+        f.write(index)
+    print(f"wrote {output_folder}, serve it with: python -m http.server --directory {output_folder}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the dashboard as a static site")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="folder for the site (replaced)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for build_figures.py")
+    args = parser.parse_args()
+    export(args.output, args.jobs)
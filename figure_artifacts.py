@@ -0,0 +1,129 @@
+"""
+Prerendered figures and layouts, written ahead of time by build_figures.py.
+
+With FIGURE_ARTIFACTS set, the visualizations read everything they show
+from these files instead of building it: no CSV is read and no pandas or
+Plotly work happens at boot or on a request. FIGURE_ARTIFACTS is either a
+folder that build_figures.py writes to (artifacts/, where CURRENT names the
+latest build) or one build's own folder.
+
+Each build lives in artifacts/<version>/, where the version is a hash of the
+data and of the code that draws it. Inside, one JSON file per figure is
+stored at <kind>/<key part>/.../<last key part>.json, e.g.
+timeline/Academic/0/25.json. Files are read on first use and kept in a
+bounded FigureCache, so memory stays flat however many figures were built.
+
+A build is only served while its manifest's version is
+build_figures.artifact_version(), i.e. while the data and the code still
+match it. Otherwise the app logs a warning and builds figures live, as if
+FIGURE_ARTIFACTS were unset, until build_figures.py is run again.
+
+    FIGURE_ARTIFACTS=artifacts/ python app.py
+"""
+import functools
+import json
+import logging
+import os
+from urllib.parse import quote
+
+import plotly.io.json as pio_json
+
+from figure_cache import FigureCache
+
+ARTIFACT_FOLDER = "artifacts/"
+CURRENT_NAME = "CURRENT"
+MANIFEST_NAME = "manifest.json"
+ENV = "FIGURE_ARTIFACTS"
+
+logger = logging.getLogger("figure_artifacts")
+
+# Artifacts read so far; a few timeline groups' worth of ranges plus everything else
+artifacts = FigureCache("artifacts", maxsize=2048)
+
+
+@functools.lru_cache(maxsize=1)
+def enabled():
+    """True when the app should serve prerendered figures only: FIGURE_ARTIFACTS is set and its build is current"""
+    if not os.environ.get(ENV):
+        return False
+    # imported here: build_figures imports the visualizations, which import this module
+    import build_figures
+
+    root = artifact_root()
+    built = build_version(root)
+    version, _ = build_figures.artifact_version()
+    if built != version:
+        logger.warning("%s was built for version %s, but the data and code are now %s; "
+                       "building figures live until python build_figures.py is run",
+                       root, built, version)
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def artifact_root():
+    """Folder of the build to serve, from FIGURE_ARTIFACTS"""
+    folder = os.environ.get(ENV)
+    if folder == "1":
+        folder = ARTIFACT_FOLDER
+    if os.path.exists(os.path.join(folder, MANIFEST_NAME)):
+        return folder
+    current = os.path.join(folder, CURRENT_NAME)
+    if not os.path.exists(current):
+        raise FileNotFoundError(f"no prerendered figures in {folder}, run python build_figures.py first")
+    with open(current) as f:
+        return os.path.join(folder, f.read().strip())
+
+
+def build_version(root):
+    """The version a build was made for, from its manifest"""
+    with open(os.path.join(root, MANIFEST_NAME)) as f:
+        return json.load(f)["version"]
+
+
+def artifact_path(root, kind, key):
+    """Where one artifact is stored; key parts become (escaped) path components"""
+    parts = [quote(str(part), safe=" ()") for part in key]
+    return os.path.join(root, kind, *parts[:-1], f"{parts[-1]}.json")
+
+
+def load(kind, *key):
+    """
+    A prerendered figure or layout
+
+    Args:
+        kind (str): what was rendered, e.g. "timeline" or "layouts"
+        *key: the inputs it was rendered for, e.g. group, start, end
+
+    Returns:
+        dict: the serialized figure or component tree (shared, do not modify)
+
+    Raises:
+        KeyError: if nothing was prerendered for these inputs
+    """
+    path = artifact_path(artifact_root(), kind, key)
+
+    def read():
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except OSError:
+            # missing, or a path the OS refuses (e.g. too long for many peers in one key)
+            raise KeyError(f"no prerendered {kind} for {key}") from None
+    return artifacts.get_or_build((kind,) + key, read)
+
+
+def write(root, kind, key, value):
+    """
+    Store one figure (go.Figure or dict) or Dash component under a build's folder,
+    serialized the way Dash would send it
+
+    Returns:
+        int: size of the written JSON in bytes
+    """
+    path = artifact_path(root, kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = pio_json.to_json_plotly(value)
+    with open(path, "w") as f:
+        f.write(data)
+    return len(data)
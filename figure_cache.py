@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+import shared_cache
+
+
+def serialized(figure):
+    """A go.Figure as a plain dict; dicts are returned as they are"""
+    return figure if isinstance(figure, dict) else figure.to_plotly_json()
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of serialized Plotly figures, keyed by the inputs a
+    figure depends on (e.g. a timeline's group and slider range).
+
+    Figures are stored as plain dicts (Figure.to_plotly_json()), which Dash
+    sends as-is, so a hit skips both building the figure and Plotly's
+    validation. Cached dicts are shared between requests and must not be
+    modified by callers.
+
+    With shared=True and SHARED_CACHE set, a local miss is looked up in (and
+    built figures are stored to) the cache all workers share, see
+    shared_cache.py.
+    """
+
+    def __init__(self, name, maxsize=256, shared=False):
+        self.name = name
+        self.maxsize = maxsize
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached figure for `key`, calling `build()` on a miss
+
+        Args:
+            key (hashable): everything the figure depends on
+            build (callable): returns a go.Figure (or an already serialized dict)
+
+        Returns:
+            dict: serialized figure
+        """
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # build outside the lock so slow figures don't block other keys;
+        # two requests racing on the same key just build it twice
+        if self.shared and shared_cache.enabled():
+            figure = shared_cache.get_or_build(self.name, key, lambda: serialized(build()))
+        else:
+            figure = serialized(build())
+
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._figures
+
+    def __len__(self):
+        return len(self._figures)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """Hit/miss counts and size, e.g. for logging"""
+        return {"name": self.name, "hits": self.hits, "misses": self.misses,
+                "size": len(self._figures), "maxsize": self.maxsize}
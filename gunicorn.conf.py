@@ -0,0 +1,25 @@
+"""
+gunicorn settings for wsgi.py, read automatically when gunicorn starts in
+this folder. Environment overrides: PORT, WEB_CONCURRENCY (workers) and
+GUNICORN_THREADS (threads per worker).
+
+    gunicorn wsgi:server
+"""
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:server"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+# import the app once in the master: workers fork with the modules (and
+# Dash's layout) already loaded, and start serving immediately. Nothing is
+# built at import, so no cache is lost at fork; the shared cache fills later.
+preload_app = True
+
+# figure builds can take a few seconds on a cold cache
+timeout = 120
+# recycle workers now and then; what they built stays in the shared cache
+max_requests = 2000
+max_requests_jitter = 200
@@ -0,0 +1,148 @@
+"""
+Compression and HTTP validators for everything the app serves besides the
+page images (which serve_page already caches): the index page,
+/_dash-layout, /_dash-dependencies, callback responses and Dash's scripts.
+
+install(app) adds an after_request hook that, for 200 responses of a
+COMPRESSIBLE type:
+
+- gives the response a strong ETag, a hash of its uncompressed body, so
+  the same layout or the same figure (e.g. one timeline group and range)
+  always carries the same tag
+- answers 304 Not Modified, with no body, when If-None-Match already names
+  that tag. Browsers revalidate the index, layout and dependencies, which
+  are marked Cache-Control: no-cache. dash-renderer never revalidates its
+  callback POSTs, but any client that remembers tags per request body can
+  (see benchmarks/load_test.py --revalidate)
+- compresses bodies of at least MIN_SIZE bytes with brotli (when the brotli
+  package is installed) or gzip, whichever the client accepts, preferring
+  brotli. Each encoding gets its own tag (<hash>-br, <hash>-gzip), as
+  different bytes need different strong validators.
+
+Compressed bodies are kept by tag in a bounded LRU, so the outputs every
+reader gets, such as the layout, a popup or a popular figure, are only
+compressed once.
+
+Dash's own compress=True needs flask-compress and sets no validators, so
+it is left off.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 1024  # bytes; smaller bodies are not worth the CPU or the headers
+COMPRESSIBLE = {"application/json", "text/html", "application/javascript", "text/javascript", "text/css"}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # fast enough per request, most of the gain of 11
+MAX_CACHED_BYTES = 64 * 2**20
+# responses the browser should revalidate rather than reuse blindly
+REVALIDATE_PATHS = ("/", "/_dash-layout", "/_dash-dependencies")
+
+
+def body_etag(body):
+    """Strong validator for an uncompressed body"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def accepted_encoding(request):
+    """The best encoding the client accepts: br, gzip, or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+class CompressedBodies:
+    """Thread-safe LRU of compressed bodies keyed by tag, bounded by total size"""
+
+    def __init__(self, max_bytes=MAX_CACHED_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, tag, body, encoding):
+        with self._lock:
+            if tag in self._bodies:
+                self._bodies.move_to_end(tag)
+                self.hits += 1
+                return self._bodies[tag]
+            self.misses += 1
+
+        compressed = compress(body, encoding)
+        with self._lock:
+            if tag not in self._bodies:
+                self._bodies[tag] = compressed
+                self.size += len(compressed)
+            while self.size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self.size -= len(evicted)
+        return compressed
+
+    def info(self):
+        """Hit/miss counts and size, e.g. for logging"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._bodies),
+                "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+compressed_bodies = CompressedBodies()
+
+
+def not_modified(response, tag):
+    """A bodiless 304 for `response`, keeping the headers that govern caching"""
+    unchanged = flask.Response(status=304)
+    unchanged.set_etag(tag)
+    for header in ("Cache-Control", "Vary"):
+        if header in response.headers:
+            unchanged.headers[header] = response.headers[header]
+    return unchanged
+
+
+def install(app):
+    """
+    Compress and validate the responses of `app`, see the module docstring.
+    Call after callback_metrics.instrument(app), so callback metrics record
+    the bytes actually sent.
+    """
+    @app.server.after_request
+    def compress_and_validate(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE or "Content-Encoding" in response.headers):
+            return response
+
+        request = flask.request
+        body = response.get_data()
+        tag = body_etag(body)
+        encoding = accepted_encoding(request) if len(body) >= MIN_SIZE else None
+        if encoding:
+            tag = f"{tag}-{encoding}"
+        if request.path in REVALIDATE_PATHS:
+            response.cache_control.no_cache = True
+        response.vary.add("Accept-Encoding")
+
+        if tag in request.if_none_match:
+            return not_modified(response, tag)
+
+        response.set_etag(tag)
+        if encoding:
+            response.set_data(compressed_bodies.get_or_compress(tag, body, encoding))
+            response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,273 @@
+"""
+Pluggable JSON encoding for everything Dash sends to the browser: callback
+responses, /_dash-layout and the page's config.
+
+Dash encodes all of it with plotly.io.json.to_json_plotly. install() swaps in
+an encoder set up from the environment:
+
+- JSON_ENGINE: "orjson" (the default when it is installed) or "json".
+  The orjson engine writes NumPy arrays natively and turns Dash components
+  and Plotly objects into dicts through orjson's `default` hook, so a
+  response that holds components is encoded in one pass. to_json_plotly
+  tries orjson, fails on the first component, then cleans the whole tree in
+  Python and encodes it again.
+- JSON_PRECISION=N: round floats to N significant digits. Base64 float64
+  arrays are stored as float32 when N <= 7, the digits float32 keeps.
+- JSON_TYPED_ARRAYS=1: send numeric lists inside figure traces as base64
+  typed arrays ({"dtype", "bdata"}), which plotly.js decodes natively.
+  Plotly already does this for NumPy arrays; this covers plain lists.
+
+The options only change how numbers are written, never which are sent.
+The installed encoder also adds up its run time per request (see
+encode_seconds()), which callback_metrics.py reports as serialize time.
+benchmarks/bench_serializers.py compares the time and size of each setting
+for every figure builder.
+
+    JSON_ENGINE=orjson JSON_PRECISION=6 python app.py
+"""
+import base64
+import functools
+import importlib
+import math
+import os
+import time
+
+import flask
+import numpy as np
+import plotly.io.json as pio_json
+from _plotly_utils.utils import PlotlyJSONEncoder, to_typed_array_spec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENGINE_ENV = "JSON_ENGINE"
+PRECISION_ENV = "JSON_PRECISION"
+TYPED_ARRAYS_ENV = "JSON_TYPED_ARRAYS"
+ENCODE_SECONDS = "json_encode_seconds"  # flask.g attribute, see timed()
+ENGINES = ("orjson", "json")
+
+FLOAT32_DIGITS = 7  # significant digits float32 keeps
+TYPED_ARRAY_MIN = 16  # shorter lists stay lists, the base64 wrapper costs more than it saves
+
+# Dash modules that import to_json by name, and so each need the new encoder
+DASH_MODULES = ("dash._utils", "dash.dash", "dash._callback")
+
+# Characters escaped the way to_json_plotly does, so the output is safe
+# inside <script> tags
+SAFE_SWAPS = (("<", "\\u003c"), (">", "\\u003e"), ("/", "\\u002f"),
+              ("\u2028", "\\u2028"), ("\u2029", "\\u2029"))
+
+_plotly_encoder = PlotlyJSONEncoder()
+
+
+def default_engine():
+    """orjson if it is installed, else the standard library"""
+    return "orjson" if orjson is not None else "json"
+
+
+def safe(text):
+    """Escape characters that would end a <script> block or a JS string"""
+    for unsafe, escaped in SAFE_SWAPS:
+        if unsafe in text:
+            text = text.replace(unsafe, escaped)
+    return text
+
+
+'''----- Precision and typed arrays -----'''
+
+def round_significant(values, digits):
+    """
+    Round a float array to `digits` significant digits
+
+    Dividing (or multiplying) the rounded mantissa by an exact power of ten
+    gives the closest double to the short decimal, so it prints short too.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values) & (values != 0)
+    if not finite.any():
+        return values
+    exponent = np.zeros(values.shape, dtype=int)
+    exponent[finite] = digits - 1 - np.floor(np.log10(np.abs(values[finite]))).astype(int)
+    scale = 10.0 ** np.abs(exponent)
+    return np.where(exponent >= 0, np.round(values * scale) / scale,
+                    np.round(values / scale) * scale)
+
+
+def round_float(value, digits):
+    """One float rounded to `digits` significant digits"""
+    if not math.isfinite(value) or value == 0:
+        return value
+    return float(f"{value:.{digits}g}")
+
+
+def typed_array(values, precision):
+    """A numeric array as a plotly.js typed array spec, float32 if precision allows"""
+    if values.dtype.kind == "f":
+        if precision is not None and precision <= FLOAT32_DIGITS:
+            values = values.astype(np.float32)
+        else:
+            values = values.astype(np.float64)
+    return to_typed_array_spec(values)
+
+
+def trim_typed_array(spec, precision):
+    """Store a base64 float64 array as float32 when precision allows"""
+    if spec.get("dtype") != "f8" or precision is None or precision > FLOAT32_DIGITS:
+        return spec
+    values = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.float64)
+    return {**spec, "dtype": "f4",
+            "bdata": base64.b64encode(values.astype(np.float32)).decode("ascii")}
+
+
+def numeric_array(value):
+    """`value` as an int or float array, or None if it is not a flat list of numbers"""
+    if not value or not isinstance(value[0], (int, float)) or isinstance(value[0], bool):
+        return None
+    try:
+        values = np.asarray(value)
+    except ValueError:  # ragged nested lists
+        return None
+    if values.ndim != 1 or values.dtype.kind not in "iuf":
+        return None
+    return values
+
+
+def prepare(value, precision=None, typed_arrays=False, in_trace=False):
+    """
+    A copy of `value` (figure, component, or plain data) with floats rounded
+    and trace arrays typed as configured. Shared inputs, such as cached
+    figures, are never modified.
+
+    Args:
+        value: anything Dash would encode
+        precision (int): significant digits kept in floats, or None for all
+        typed_arrays (bool): send numeric lists in traces as base64 typed arrays
+        in_trace (bool): whether `value` sits inside a figure's trace
+
+    Returns:
+        the prepared value, for any JSON engine
+    """
+    if hasattr(value, "to_plotly_json"):
+        value = value.to_plotly_json()
+
+    if isinstance(value, dict):
+        if "bdata" in value and "dtype" in value:
+            return trim_typed_array(value, precision)
+        if isinstance(value.get("data"), list) and "layout" in value:
+            # a figure: only its traces get typed arrays
+            return {
+                key: ([prepare(trace, precision, typed_arrays, True) for trace in item]
+                      if key == "data" else prepare(item, precision, typed_arrays, in_trace))
+                for key, item in value.items()
+            }
+        return {key: prepare(item, precision, typed_arrays, in_trace) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        values = numeric_array(value)
+        if values is None:
+            return [prepare(item, precision, typed_arrays, in_trace) for item in value]
+        if in_trace and typed_arrays and len(values) >= TYPED_ARRAY_MIN:
+            return typed_array(values, precision)
+        if precision is not None and values.dtype.kind == "f":
+            return round_significant(values, precision).tolist()
+        return value
+
+    if isinstance(value, np.ndarray) and value.dtype.kind in "iuf" and value.ndim == 1:
+        if in_trace and typed_arrays:
+            return typed_array(value, precision)
+        if precision is not None and value.dtype.kind == "f":
+            return round_significant(value, precision)
+        return value
+
+    if isinstance(value, float) and precision is not None:
+        return round_float(value, precision)
+    return value
+
+
+'''----- Engines -----'''
+
+def orjson_default(value):
+    """What orjson cannot write by itself: components, figures, pandas/NumPy odds and ends"""
+    if hasattr(value, "to_plotly_json"):
+        return value.to_plotly_json()
+    if isinstance(value, np.generic):
+        return value.item()
+    # raises TypeError for anything else, which Dash reports as a bad output
+    return _plotly_encoder.default(value)
+
+
+def encode_orjson(value):
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    return safe(orjson.dumps(value, default=orjson_default, option=options).decode("utf8"))
+
+
+def encode_json(value):
+    return pio_json.to_json_plotly(value, engine="json")
+
+
+def encoder(engine=None, precision=None, typed_arrays=False):
+    """
+    A function that encodes a value to JSON text, as Dash's to_json does
+
+    Args:
+        engine (str): one of ENGINES, default_engine() if None
+        precision (int): significant digits kept in floats, or None for all
+        typed_arrays (bool): send numeric lists in traces as base64 typed arrays
+
+    Returns:
+        function: value -> str
+    """
+    engine = engine or default_engine()
+    if engine not in ENGINES:
+        raise ValueError(f"unknown JSON engine {engine!r}, expected one of {ENGINES}")
+    if engine == "orjson" and orjson is None:
+        raise ValueError("the orjson engine needs orjson, pip install orjson")
+    encode = encode_orjson if engine == "orjson" else encode_json
+    if precision is None and not typed_arrays:
+        return encode
+
+    def encode_prepared(value):
+        return encode(prepare(value, precision, typed_arrays))
+    return encode_prepared
+
+
+def timed(encode):
+    """Wrap an encoder so its run time during a request is added up on flask.g"""
+    @functools.wraps(encode)
+    def wrapper(value):
+        if not flask.has_request_context():
+            return encode(value)
+        start = time.perf_counter()
+        try:
+            return encode(value)
+        finally:
+            setattr(flask.g, ENCODE_SECONDS,
+                    flask.g.get(ENCODE_SECONDS, 0.0) + time.perf_counter() - start)
+    return wrapper
+
+
+def encode_seconds():
+    """Seconds the installed encoder has spent in this request, or None if it never ran"""
+    return flask.g.get(ENCODE_SECONDS)
+
+
+def install(engine=None, precision=None, typed_arrays=None):
+    """
+    Make Dash encode everything with encoder(); arguments left as None are
+    read from JSON_ENGINE, JSON_PRECISION and JSON_TYPED_ARRAYS
+
+    Returns:
+        function: the installed encoder
+    """
+    engine = engine or os.environ.get(ENGINE_ENV) or None
+    if precision is None and os.environ.get(PRECISION_ENV):
+        precision = int(os.environ[PRECISION_ENV])
+    if typed_arrays is None:
+        typed_arrays = bool(os.environ.get(TYPED_ARRAYS_ENV))
+
+    encode = timed(encoder(engine, precision, typed_arrays))
+    for name in DASH_MODULES:
+        importlib.import_module(name).to_json = encode
+    return encode
@@ -1,52 +1,64 @@
+import functools
 import pandas as pd
 import plotly.express as px
-from dash import html, dcc
+from dash import html, dcc, Input, Output, State, no_update
+import data_store
+import figure_artifacts
+import shared_cache
+import utils
+from figure_cache import FigureCache
 
-def livingwage_vs_stipend():
-    """
-    Creates Dash div and callbacks for the living wage comparison line chart
-    Compares 6 Boston-area universities between 2013 and 2025
-    This is the function that gets imported into app.py
+NORTHEASTERN = "Northeastern University"
 
-    Returns:
-        html.Div: html code for the Dash layout
-        callbacks: functions for interactivity (not currently used)
-    """
+# Boston-area names as they appear in the national data (after utils.university_name)
+BOSTON_PEERS = [
+    "Boston University",
+    "Harvard University",
+    "Massachusetts Institute of Technology",
+    "Tufts University",
+    "University of Massachusetts - Boston",
+]
 
-    # read data
-    stipends = pd.read_csv("data/boston_stipends.csv")
-    
-    # Adding shorthand for tooltips
-    def uni_shorthand(elem):
-        unis = {"Boston University": "BU", "Harvard University":"Harvard",
-                "MIT":"MIT", "Northeastern University":"Northeastern",
-                "Tufts University":"Tufts", "UMass Boston":"UMass Boston"}
-        return unis[elem]
-    
-    # apply shorthand
-    stipends["Univ. Shorthand"] = stipends["University"].apply(uni_shorthand)
+# Short names for tooltips; anything else uses its abbreviation or full name
+UNI_SHORTHAND = {"Boston University": "BU", "Harvard University":"Harvard",
+                 "MIT":"MIT", "Massachusetts Institute of Technology": "MIT",
+                 "Northeastern University":"Northeastern",
+                 "Tufts University":"Tufts", "UMass Boston":"UMass Boston",
+                 "University of Massachusetts - Boston": "UMass Boston"}
 
-    # get avg each year
-    avg_by_year = stipends[["Academic Year", "University", "Univ. Shorthand", "Overall Pay"]
-                           ].groupby(["Academic Year", "University", "Univ. Shorthand"]
-                            ).mean().reset_index()
-    
-    # Colors: neu is red, all others are varying shades of desaturated colors
-    colors = {
-        "Northeastern University":'#C8102E',
-        "Boston University":  '#A3C9E2',
-        "Harvard University": '#D9C5A1',
-        "MIT":  '#A8D8AE',
-        "Tufts University":  '#C9B8DC',
-        "UMass Boston": '#E5B8B8'
-    }
+# Colors: neu is red, all others are varying shades of desaturated colors
+COLORS = {
+    "Northeastern University":'#C8102E',
+    "Boston University":  '#A3C9E2',
+    "Harvard University": '#D9C5A1',
+    "MIT":  '#A8D8AE',
+    "Tufts University":  '#C9B8DC',
+    "UMass Boston": '#E5B8B8'
+}
+PEER_COLORS = ['#A3C9E2', '#D9C5A1', '#A8D8AE', '#C9B8DC', '#E5B8B8'] + px.colors.qualitative.Pastel
+# Single-peer comparisons build_figures.py prerenders, for the most reported universities
+PRERENDERED_PEERS = 40
 
-    def rounded_stipend(elem):
-        return f"{round(elem, -3)}"[:2]
-    
-    # round to k
-    avg_by_year["Pay Rounded"] = avg_by_year["Overall Pay"].apply(rounded_stipend)
+def uni_shorthand(elem):
+    """Short university name for tooltips"""
+    return UNI_SHORTHAND.get(elem, elem)
+
+def rounded_stipend(elem):
+    return f"{round(elem, -3)}"[:2]
+
+def stipend_line_chart(avg_by_year, colors):
+    """
+    Average stipend per year for each university, against the Boston living
+    wage and the poverty line
+
+    Args:
+        avg_by_year (pd.DataFrame): Academic Year, University, Univ. Shorthand,
+            Overall Pay (average) and Pay Rounded
+        colors (dict): university -> line color
 
+    Returns:
+        go.Figure: line chart
+    """
     # make the line plot
     stipends_over_time = px.line(
         avg_by_year,
@@ -57,7 +69,7 @@ def livingwage_vs_stipend():
         markers=True,
         custom_data=["Univ. Shorthand", "Pay Rounded"]
     ).update_layout(
-        yaxis_tickprefix = '$', 
+        yaxis_tickprefix = '$',
         yaxis_tickformat = ',.0s',
         hovermode = 'x unified',  # Changed from 'x unified'
         xaxis_title="Academic Year"
@@ -67,7 +79,7 @@ def livingwage_vs_stipend():
         tickmode='linear',
         dtick=1
     ).update_traces(
-        hovertemplate= 
+        hovertemplate=
         "<b>%{customdata[0]}</b><br>" +
         "Average Pay: $%{customdata[1]}k<extra></extra>"
     )
@@ -75,11 +87,11 @@ def livingwage_vs_stipend():
     # add dotted lines for lower and upper boundaries
     stipends_over_time.add_shape(
         type="line",
-        x0=2010, x1=2025, 
+        x0=2010, x1=2025,
         y0=63942, y1=63942,
         line=dict(color="#A2A2A2", dash="dash")
     )
-    
+
     stipends_over_time.add_shape(
         type="line",
         x0=2024, x1=2026,  # Only from 2024 to 2025
@@ -109,9 +121,217 @@ def livingwage_vs_stipend():
             stipends_over_time.data = tuple([t for t in stipends_over_time.data if t != trace] + [trace])
             break
 
+    return stipends_over_time
+
+@functools.lru_cache(maxsize=1)
+@shared_cache.shared("boston_figure")
+def boston_figure():
+    """
+    The original comparison of the six Boston-area universities,
+    from the hand-picked boston_stipends subset
+
+    Returns:
+        dict: serialized figure
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("livingwage", "boston")
+    # read data
+    stipends = data_store.read_table("boston_stipends", columns=["University", "Overall Pay", "Academic Year"])
+    return stipend_line_chart(boston_averages(stipends), COLORS).to_plotly_json()
+
+def boston_averages(stipends:pd.DataFrame):
+    """
+    Average stipend per university and year for the Boston chart
+
+    Args:
+        stipends (pd.DataFrame): stipend reports (University, Overall Pay, Academic Year)
+
+    Returns:
+        pd.DataFrame: averages with tooltip shorthand and rounded pay
+    """
+    # apply shorthand
+    stipends["Univ. Shorthand"] = stipends["University"].apply(uni_shorthand)
+
+    # get avg each year
+    avg_by_year = stipends[["Academic Year", "University", "Univ. Shorthand", "Overall Pay"]
+                           ].groupby(["Academic Year", "University", "Univ. Shorthand"], observed=True
+                            ).mean().reset_index()
+
+    # round to k
+    avg_by_year["Pay Rounded"] = avg_by_year["Overall Pay"].apply(rounded_stipend)
+
+    return avg_by_year
+
+'''--------------------- National Comparison ---------------------'''
+
+def national_rollups():
+    """
+    Stipend sums and report counts per (University, Academic Year) across the
+    national data, rebuilt only when cleaned_stipends.csv changes
+    """
+    return load_national_rollups(data_store.table_version("cleaned_stipends"))
+
+@functools.lru_cache(maxsize=1)
+@shared_cache.shared("national_rollups")
+def load_national_rollups(version):
+    """
+    Aggregates one version of the national stipend data
+    (version is only the cache key, see national_rollups())
+    """
+    stipends = data_store.read_table(
+        "cleaned_stipends", columns=["University", "Overall Pay", "Academic Year"]
+    )
+    return rollup_stipends(stipends)
+
+def rollup_stipends(stipends:pd.DataFrame):
+    """
+    Stipend sums and report counts per (University, Academic Year).
+
+    University names are normalized once per distinct spelling rather than
+    per row, and the grouping runs on categorical codes, so the cost grows
+    with the number of reports only through one vectorized groupby.
+
+    Returns:
+        dict: "rollups" (University, Academic Year, Pay Sum, Reports),
+              "shorthand" (university -> tooltip name) and
+              "reports" (university -> total reports, most reported first)
+    """
+    stipends = stipends.dropna()
+
+    # normalize each distinct spelling once, then remap the category codes
+    raw_names = stipends["University"].astype("category")
+    normalized = [utils.university_name(raw_name) for raw_name in raw_names.cat.categories]
+    codes, names = pd.factorize(pd.Series([name for name, _ in normalized]))
+    shorthand = {name: UNI_SHORTHAND.get(name, abbreviation or name) for name, abbreviation in normalized}
+    stipends["University"] = pd.Categorical.from_codes(codes[raw_names.cat.codes.to_numpy()], categories=names)
+    stipends["Academic Year"] = stipends["Academic Year"].astype(int)
+
+    rollups = (
+        stipends.groupby(["University", "Academic Year"], observed=True)["Overall Pay"]
+        .agg(["sum", "count"])
+        .rename(columns={"sum": "Pay Sum", "count": "Reports"})
+        .reset_index()
+    )
+    rollups["University"] = rollups["University"].astype(str)
+
+    reports = rollups.groupby("University")["Reports"].sum().sort_values(ascending=False, kind="stable")
+    return {
+        "rollups": rollups,
+        "shorthand": shorthand,
+        "reports": reports.to_dict(),
+    }
+
+def peer_options():
+    """Dropdown options for every university in the national data, most reported first"""
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("livingwage", "peer-options")["options"]
+    reports = national_rollups()["reports"]
+    return [
+        {"label": f"{university} ({count} reports)", "value": university}
+        for university, count in reports.items()
+        if university != NORTHEASTERN
+    ]
+
+def default_peer_options():
+    """
+    Options for just the default peers, so the layout needs no national data;
+    the full list is sent the first time the national mode is picked
+    """
+    return [{"label": peer, "value": peer} for peer in BOSTON_PEERS]
+
+def peer_comparison_chart(peers):
+    """
+    Northeastern against a chosen set of peers, from the national rollups
+
+    Args:
+        peers (tuple[str]): canonical university names
+
+    Returns:
+        go.Figure: line chart
+    """
+    data = national_rollups()
+    rollups = data["rollups"]
+    selected = [NORTHEASTERN] + [peer for peer in peers if peer != NORTHEASTERN]
+
+    avg_by_year = rollups[rollups["University"].isin(selected)].copy()
+    avg_by_year["Overall Pay"] = avg_by_year["Pay Sum"] / avg_by_year["Reports"]
+    avg_by_year["Univ. Shorthand"] = avg_by_year["University"].map(data["shorthand"])
+    avg_by_year["Pay Rounded"] = avg_by_year["Overall Pay"].apply(rounded_stipend)
+    avg_by_year = avg_by_year.sort_values(["Academic Year", "University"])
+
+    colors = {NORTHEASTERN: COLORS[NORTHEASTERN]}
+    for i, peer in enumerate(selected[1:]):
+        colors[peer] = PEER_COLORS[i % len(PEER_COLORS)]
+    return stipend_line_chart(avg_by_year, colors)
+
+# Serialized peer comparisons, keyed by data version and the sorted peer set
+peer_figures = FigureCache("livingwage-peers", maxsize=128, shared=True)
+
+def peer_figure(peers):
+    """
+    Peer comparison for a set of universities, built once per data version.
+    With FIGURE_ARTIFACTS, the sets in prerendered_peer_sets() are read from
+    the build and any other set is built live.
+    """
+    peers = tuple(sorted(set(peers or [])))
+    if figure_artifacts.enabled():
+        try:
+            return figure_artifacts.load("livingwage", "peers", *peers)
+        except KeyError:
+            pass
+    return peer_figures.get_or_build(
+        (data_store.table_version("cleaned_stipends"), peers),
+        lambda: peer_comparison_chart(peers),
+    )
+
+def prerendered_peer_sets():
+    """
+    Peer sets whose comparisons build_figures.py prerenders: the default
+    Boston-area set, then Northeastern alone against each of the
+    PRERENDERED_PEERS most reported universities
+
+    Returns:
+        list[tuple[str]]: sorted peer sets, as peer_figure() keys them
+    """
+    reports = national_rollups()["reports"]
+    most_reported = [university for university in reports if university != NORTHEASTERN]
+    return [tuple(sorted(BOSTON_PEERS))] + [(university,) for university in most_reported[:PRERENDERED_PEERS]]
+
+def livingwage_layout():
+    """
+    Builds the Dash layout for the living wage comparison line chart.
+    Called by app.py the first time the hotspot is opened.
+
+    Returns:
+        html.Div: html code for the Dash layout
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("layouts", "livingwage")
     # create layout
     layout = html.Div([
-        dcc.Graph(figure=stipends_over_time),
+        html.Div([
+            dcc.RadioItems(
+                id="livingwage-mode",
+                options=[
+                    {"label": " Boston-area universities", "value": "boston"},
+                    {"label": " Northeastern vs. chosen peers (national data)", "value": "national"},
+                ],
+                value="boston",
+                inline=True,
+                labelStyle={'marginRight': '20px', 'cursor': 'pointer'},
+            ),
+            dcc.Dropdown(
+                id="livingwage-peers",
+                options=default_peer_options(),
+                value=BOSTON_PEERS,
+                multi=True,
+                searchable=True,
+                placeholder="Search for universities to compare...",
+                disabled=True,
+                style={'marginTop': '10px'},
+            ),
+        ], style={'marginBottom': '20px', 'padding': '10px', 'backgroundColor': '#f5f5f5', 'borderRadius': '5px'}),
+        dcc.Graph(id="livingwage-chart", figure=boston_figure()),
         html.Div(
             ["Data Source: Living Wage Calculator (MIT) and Stipend Data Collected from ",
             html.A("phdstipends.com", href="https://www.phdstipends.com"),
@@ -122,8 +342,45 @@ def livingwage_vs_stipend():
 
     ])
 
+    return layout
+
+def livingwage_vs_stipend():
+    """
+    Creates Dash div and callbacks for the living wage comparison line chart
+    Compares 6 Boston-area universities between 2013 and 2025, or Northeastern
+    against any peers from the national data
+    This is the function that gets imported into app.py
+
+    Returns:
+        callable: builds the html.Div for the Dash layout on first use
+        callbacks: functions for interactivity
+    """
+    def peer_callback(app):
+        @app.callback(
+            Output("livingwage-chart", "figure"),
+            Output("livingwage-peers", "disabled"),
+            Input("livingwage-mode", "value"),
+            Input("livingwage-peers", "value"),
+            prevent_initial_call=True
+        )
+        def update_livingwage_chart(mode, peers):
+            if mode == "national":
+                return peer_figure(peers), False
+            return boston_figure(), True
+
+        @app.callback(
+            Output("livingwage-peers", "options"),
+            Input("livingwage-mode", "value"),
+            State("livingwage-peers", "options"),
+            prevent_initial_call=True
+        )
+        def fill_peer_options(mode, options):
+            # only once: later switches keep the full list already sent
+            if mode != "national" or len(options) > len(BOSTON_PEERS):
+                return no_update
+            return peer_options()
 
     title = "Average Graduate Student Stipends have Increased but Remain Far Below a Living Wage"
     subtitle = "Comparison of Average Stipends at Six Boston-Area Universities to the 2025 Living Wage and Poverty Line in Boston"
 
-    return layout , [], title, subtitle
+    return livingwage_layout, [peer_callback], title, subtitle
@@ -0,0 +1,247 @@
+"""
+Splits the contract PDF into page images (~33) in the assets folder.
+
+Pages are rendered in a process pool and each one is written to disk as soon
+as it is ready, so peak memory is about one page per worker. Every output is
+keyed on the PDF's content hash plus the DPI in assets/pages.json, and pages
+whose key is unchanged are skipped on re-runs (an interrupted run also picks
+up where it stopped).
+
+Each page also gets a resolution ladder in assets/variants/ (thumbnail, screen
+and retina widths) as AVIF/WebP with PNG fallbacks, which app.py offers to the
+browser through srcset.
+
+Requires poppler, see requirements.txt.
+
+    python rasterize_pages.py [--pdf data/Final-package-offer.pdf] [--dpi 200] [--workers N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image, features
+
+PDF_PATH = "data/Final-package-offer.pdf"
+OUTPUT_FOLDER = "assets/"
+MANIFEST_NAME = "pages.json"
+DPI = 200
+VARIANT_FOLDER = "variants"
+
+# Resolution ladder as fractions of the rendered page (1700px wide at 200 dpi).
+# Integer fractions keep every variant at exactly the page's aspect ratio, so
+# the percentage-based hotspots (utils.px_to_percent) line up at every size.
+VARIANT_SCALES = {"thumb": 4, "screen": 2, "retina": 1}
+
+# Modern formats first; PNG is the fallback for browsers that support neither
+VARIANT_FORMATS = {
+    "avif": {"format": "AVIF", "quality": 55},
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "png": {"format": "PNG", "optimize": True},
+}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """sha256 of a file, read in chunks so large PDFs are never fully in memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def page_filename(page_number):
+    """File name for a 1-indexed page, matching what app.py lists from assets/"""
+    return f"page_{page_number}.png"
+
+
+def variant_formats():
+    """Formats this Pillow build can write (AVIF needs libavif)"""
+    return [fmt for fmt in VARIANT_FORMATS if fmt == "png" or features.check(fmt)]
+
+
+def variant_filename(page_number, width, fmt):
+    """Path of a page variant, relative to the output folder"""
+    return f"{VARIANT_FOLDER}/page_{page_number}-{width}w.{fmt}"
+
+
+def expected_variants(page_number, size, formats):
+    """
+    The variant files a page should have, keyed by format and width
+
+    Args:
+        page_number (int): 1-indexed page
+        size (tuple[int, int]): width and height of the full page render
+        formats (list[str]): formats to write
+
+    Returns:
+        dict: {format: {width: relative path}}. The full-size PNG is the page
+              itself rather than a copy.
+    """
+    width = size[0]
+    variants = {}
+    for fmt in formats:
+        variants[fmt] = {}
+        for divisor in sorted(VARIANT_SCALES.values(), reverse=True):
+            variant_width = width // divisor
+            if fmt == "png" and divisor == 1:
+                variants[fmt][str(variant_width)] = page_filename(page_number)
+            else:
+                variants[fmt][str(variant_width)] = variant_filename(page_number, variant_width, fmt)
+    return variants
+
+
+def make_variants(page_path, page_number, output_folder, formats):
+    """
+    Write the resolution ladder for one rendered page
+
+    Returns:
+        tuple[list[int], dict]: full page size and the variants written
+    """
+    os.makedirs(os.path.join(output_folder, VARIANT_FOLDER), exist_ok=True)
+    with Image.open(page_path) as page:
+        page = page.convert("RGB")
+        size = page.size
+        variants = expected_variants(page_number, size, formats)
+        for fmt, by_width in variants.items():
+            for width, rel_path in by_width.items():
+                out_path = os.path.join(output_folder, rel_path)
+                if os.path.abspath(out_path) == os.path.abspath(page_path):
+                    continue
+                width = int(width)
+                height = round(size[1] * width / size[0])
+                resized = page if width == size[0] else page.resize((width, height), Image.LANCZOS)
+                save_args = dict(VARIANT_FORMATS[fmt])
+                tmp_path = out_path + ".tmp"
+                resized.save(tmp_path, save_args.pop("format"), **save_args)
+                os.replace(tmp_path, out_path)
+    return list(size), variants
+
+
+def page_is_current(entry, key, page_number, output_folder, formats):
+    """True if a manifest entry matches the key and all of its files exist"""
+    if not isinstance(entry, dict) or entry.get("key") != key or "size" not in entry:
+        return False
+    if entry.get("variants") != expected_variants(page_number, entry["size"], formats):
+        return False
+    paths = [page_filename(page_number)] + [
+        path for by_width in entry["variants"].values() for path in by_width.values()
+    ]
+    return all(os.path.exists(os.path.join(output_folder, path)) for path in paths)
+
+
+def load_manifest(output_folder):
+    """Read the page manifest, or an empty one if there is none yet"""
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"pages": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(output_folder, manifest):
+    """Write the manifest atomically so a killed run never leaves it half-written"""
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def render_page(pdf_path, page_number, dpi, output_folder, formats):
+    """
+    Render a single page straight to disk (pdftoppm writes the PNG), then
+    build its variants. Only this one page is ever held in memory.
+
+    Returns:
+        tuple[int, str, dict]: page number, path of the written image and its
+                               manifest entry (size and variants)
+    """
+    out_path = os.path.join(output_folder, page_filename(page_number))
+    with tempfile.TemporaryDirectory(dir=output_folder) as tmp_dir:
+        rendered = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_number,
+            last_page=page_number,
+            output_folder=tmp_dir,
+            output_file="page",
+            single_file=True,
+            fmt="png",
+            paths_only=True,
+        )
+        # rename is atomic, so app.py never sees a partially written page
+        os.replace(rendered[0], out_path)
+    size, variants = make_variants(out_path, page_number, output_folder, formats)
+    return page_number, out_path, {"size": size, "variants": variants}
+
+
+def rasterize(pdf_path=PDF_PATH, output_folder=OUTPUT_FOLDER, dpi=DPI, workers=None):
+    """
+    Render every page of the PDF whose output is missing or out of date
+
+    Args:
+        pdf_path (str): contract PDF
+        output_folder (str): where page images and the manifest go
+        dpi (int): render resolution
+        workers (int): process pool size, defaults to the number of CPUs
+
+    Returns:
+        list[str]: paths of the pages rendered on this run
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    key = f"{file_hash(pdf_path)}-{dpi}"
+    manifest = load_manifest(output_folder)
+    pages = manifest.setdefault("pages", {})
+
+    formats = variant_formats()
+
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+    todo = [
+        number for number in range(1, page_count + 1)
+        if not page_is_current(pages.get(page_filename(number)), key, number, output_folder, formats)
+    ]
+
+    # drop pages left over from a longer version of the contract
+    for name in list(pages):
+        number = int(name[len("page_"):-len(".png")])
+        if number > page_count:
+            entry = pages.pop(name)
+            stale = [name]
+            if isinstance(entry, dict):
+                stale += [path for by_width in entry.get("variants", {}).values()
+                          for path in by_width.values()]
+            for path in stale:
+                if os.path.exists(os.path.join(output_folder, path)):
+                    os.remove(os.path.join(output_folder, path))
+
+    print(f"{page_count} pages, {page_count - len(todo)} up to date, rendering {len(todo)}")
+    rendered = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(render_page, pdf_path, number, dpi, output_folder, formats)
+            for number in todo
+        ]
+        for future in as_completed(futures):
+            number, path, entry = future.result()
+            print(f"saved page {number}")
+            pages[page_filename(number)] = {"key": key, **entry}
+            save_manifest(output_folder, manifest)
+            rendered.append(path)
+
+    save_manifest(output_folder, manifest)
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the contract PDF into page images")
+    parser.add_argument("--pdf", default=PDF_PATH, help="contract PDF to render")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="folder for page images")
+    parser.add_argument("--dpi", type=int, default=DPI, help="render resolution")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    rasterize(args.pdf, args.output, args.dpi, args.workers)
@@ -0,0 +1,119 @@
+"""
+A figure and data cache shared by every worker process on the host, for
+running the app under a preforking server (see wsgi.py).
+
+Each worker has its own in-memory caches (FigureCache, lru_cache), and a new
+worker starts with them empty. Without sharing, every worker prepares the
+data and builds each figure and layout itself. With SHARED_CACHE set, a
+worker that misses locally looks in a SQLite database first and stores what
+it builds there, so the work is paid once per host, and it survives worker
+restarts too. Two workers that miss the same key at once both build it;
+either copy is correct.
+
+What is shared:
+- FigureCache(..., shared=True): the timeline, change table, benefits and
+  peer figures
+- functions wrapped in @shared(namespace): prepared data such as
+  timeline_state(), and the popup layouts
+
+Values are pickled. The database is local and only ever written by this
+app. It lives in <folder>/<version>.sqlite, where the version is
+build_figures.artifact_version(), so changing a CSV or the chart code starts
+a fresh database and the old ones are deleted. SHARED_CACHE is "1" for
+data/.cache/shared/, or another folder.
+
+    SHARED_CACHE=1 gunicorn -c gunicorn.conf.py wsgi:server
+"""
+import functools
+import glob
+import os
+import pickle
+import sqlite3
+import threading
+
+ENV = "SHARED_CACHE"
+CACHE_FOLDER = "data/.cache/shared/"
+BUSY_TIMEOUT = 30  # seconds a writer waits for another worker's transaction
+
+_local = threading.local()
+
+
+def enabled():
+    """True when caches should be shared through the database"""
+    return bool(os.environ.get(ENV))
+
+
+@functools.lru_cache(maxsize=1)
+def database_path():
+    """This data and code version's database; older versions' are deleted"""
+    # imported here: build_figures imports the visualizations, which import this module
+    import build_figures
+
+    folder = os.environ.get(ENV)
+    if folder == "1":
+        folder = CACHE_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    version, _ = build_figures.artifact_version()
+    path = os.path.join(folder, f"{version}.sqlite")
+    for old in glob.glob(os.path.join(folder, "*.sqlite*")):
+        if not os.path.basename(old).startswith(version):
+            try:
+                os.remove(old)
+            except OSError:  # another worker got there first
+                pass
+    return path
+
+
+def connection():
+    """This thread's connection, opened after any fork so workers never share one"""
+    if getattr(_local, "pid", None) != os.getpid():
+        db = sqlite3.connect(database_path(), timeout=BUSY_TIMEOUT, isolation_level=None)
+        # WAL lets every worker read while one writes
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS entries "
+                   "(namespace TEXT, key TEXT, value BLOB, PRIMARY KEY (namespace, key))")
+        _local.db, _local.pid = db, os.getpid()
+    return _local.db
+
+
+def get_or_build(namespace, key, build):
+    """
+    The shared value for (namespace, key), calling `build()` on a miss
+
+    Args:
+        namespace (str): what is cached, e.g. a FigureCache's name
+        key (hashable): everything the value depends on; its repr is the database key
+        build (callable): returns the value, which must pickle
+
+    Returns:
+        the value, unpickled (a fresh copy per call)
+    """
+    db = connection()
+    row = db.execute("SELECT value FROM entries WHERE namespace = ? AND key = ?",
+                     (namespace, repr(key))).fetchone()
+    if row is not None:
+        return pickle.loads(row[0])
+    value = build()
+    db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+               (namespace, repr(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+    return value
+
+
+def shared(namespace):
+    """
+    Share a function's results across workers when SHARED_CACHE is set.
+    Goes under functools.lru_cache, which still answers repeat calls in-process:
+
+        @functools.lru_cache(maxsize=None)
+        @shared_cache.shared("timeline_state")
+        def timeline_state(): ...
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            if not enabled():
+                return func(*args)
+            return get_or_build(namespace, args, lambda: func(*args))
+        return wrapper
+    return decorate
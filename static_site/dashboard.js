@@ -0,0 +1,276 @@
+// The static dashboard written by export_static.py. It runs the Dash app's
+// callbacks in the browser, over figures prerendered by build_figures.py:
+// the popup modal, update_timeline/update_content (timeline),
+// update_by_network/update_details (benefits), update_livingwage_chart and
+// the college toggle. Figures are fetched from figures/ as they are needed.
+(function () {
+    var DATA = JSON.parse(document.getElementById("dashboard-data").textContent);
+    var PLOT_CONFIG = {responsive: true};
+    var BENEFITS_CONFIG = {responsive: true, displayModeBar: false};
+
+    function byId(id) {
+        return document.getElementById(id);
+    }
+
+    function fetchFigure(path) {
+        return fetch("figures/" + path).then(function (response) {
+            if (!response.ok) {
+                throw new Error(path + ": " + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    // `events` ({name: handler}) are attached once the element's first plot
+    // has finished: Plotly only gives a div .on() when it first draws it
+    function plot(element, figure, config, events) {
+        return Plotly.react(element, figure.data, figure.layout, config || PLOT_CONFIG).then(function () {
+            if (events && !element.dashboardEvents) {
+                element.dashboardEvents = true;
+                Object.keys(events).forEach(function (name) {
+                    element.on(name, events[name]);
+                });
+            }
+        });
+    }
+
+    // Only the newest of several overlapping requests for one chart is drawn
+    function latest() {
+        var current = 0;
+        return function (promise, draw) {
+            var request = ++current;
+            promise.then(function (result) {
+                if (request === current) {
+                    draw(result);
+                }
+            });
+        };
+    }
+
+    function checkedValue(name) {
+        var input = document.querySelector("input[name='" + name + "']:checked");
+        return input ? input.value : null;
+    }
+
+    /* ----- Timeline ----- */
+
+    function initTimeline() {
+        var timeline = DATA.timeline;
+        var group = byId("timeline-group");
+        var start = byId("timeline-start");
+        var end = byId("timeline-end");
+        var graph = byId("negotiation-timeline");
+        var left = byId("left-content-container");
+        var right = byId("right-content-container");
+        var drawTimeline = latest();
+        var drawTables = latest();
+
+        function showPrompt() {
+            left.innerHTML = timeline.prompt;
+            right.innerHTML = "";
+        }
+
+        function showChanges(event) {
+            var customdata = event.points[0].customdata || [];
+            var changes = (timeline.changes[customdata[0]] || {})[customdata[1]];
+            if (changes === undefined) {
+                showPrompt();
+                return;
+            }
+            var tables = Promise.all([
+                fetchFigure("changes/" + changes + ".json"),
+                fetchFigure("final/" + timeline.final[customdata[0]] + ".json")
+            ]);
+            drawTables(tables, function (figures) {
+                left.innerHTML = "<div></div>";
+                right.innerHTML = "<div></div>";
+                plot(left.firstChild, figures[0]);
+                plot(right.firstChild, figures[1]);
+            });
+        }
+
+        function update(changed) {
+            // keep start <= end by moving whichever handle was not dragged
+            if (+start.value > +end.value) {
+                if (changed === start) {
+                    end.value = start.value;
+                } else {
+                    start.value = end.value;
+                }
+            }
+            byId("timeline-range").textContent =
+                timeline.dates[+start.value] + " – " + timeline.dates[+end.value];
+            byId("topic-description").textContent = timeline.descriptions[group.value] || "";
+            var path = "timeline/" + timeline.groups.indexOf(group.value) + "/" + start.value + "-" + end.value + ".json";
+            drawTimeline(fetchFigure(path), function (figure) {
+                plot(graph, figure, PLOT_CONFIG, {plotly_click: showChanges});
+            });
+        }
+
+        [group, start, end].forEach(function (input) {
+            input.addEventListener("change", function () {
+                update(input);
+            });
+        });
+        update(null);
+    }
+
+    /* ----- Benefits ----- */
+
+    function initBenefits() {
+        var benefits = DATA.benefits;
+        var unitChart = byId("benefits-unit-chart");
+        var detailsChart = byId("benefits-details-chart");
+        var selectedBenefit = "Deductible";
+        var drawUnit = latest();
+        var drawDetails = latest();
+
+        function detailsPath(network) {
+            return "benefits/details-" + network + "-" + benefits.benefits.indexOf(selectedBenefit) + ".json";
+        }
+
+        function selectBenefit(event) {
+            selectedBenefit = event.points[0].customdata[0];
+            var network = benefits.networks.indexOf(checkedValue("benefits-network-filter"));
+            drawDetails(fetchFigure(detailsPath(network)), function (figure) {
+                plot(detailsChart, figure, BENEFITS_CONFIG);
+            });
+        }
+
+        function updateNetwork() {
+            var network = benefits.networks.indexOf(checkedValue("benefits-network-filter"));
+            drawUnit(fetchFigure("benefits/unit-" + network + ".json"), function (figure) {
+                plot(unitChart, figure, BENEFITS_CONFIG, {plotly_click: selectBenefit});
+            });
+            drawDetails(fetchFigure(detailsPath(network)), function (figure) {
+                plot(detailsChart, figure, BENEFITS_CONFIG);
+            });
+            byId("benefits-legend-container").innerHTML = benefits.legends[network];
+        }
+
+        document.querySelectorAll("input[name='benefits-network-filter']").forEach(function (input) {
+            input.addEventListener("change", updateNetwork);
+        });
+        updateNetwork();
+    }
+
+    /* ----- Living wage ----- */
+
+    function initLivingwage() {
+        var chart = byId("livingwage-chart");
+        var peers = byId("livingwage-peers");
+        var search = byId("livingwage-peer-search");
+        var draw = latest();
+
+        function update() {
+            var national = checkedValue("livingwage-mode") === "national";
+            peers.disabled = !national;
+            search.disabled = !national;
+            if (!national) {
+                draw(fetchFigure("livingwage/boston.json"), function (figure) {
+                    plot(chart, figure);
+                });
+                return;
+            }
+            // one of the comparisons export_static.py copied, see livingwage_section()
+            draw(fetchFigure("livingwage/peers/" + peers.value + ".json"), function (figure) {
+                plot(chart, figure);
+            });
+        }
+
+        document.querySelectorAll("input[name='livingwage-mode']").forEach(function (input) {
+            input.addEventListener("change", update);
+        });
+        peers.addEventListener("change", update);
+        search.addEventListener("input", function () {
+            var text = search.value.toLowerCase();
+            Array.prototype.forEach.call(peers.options, function (option) {
+                option.hidden = !option.selected && option.text.toLowerCase().indexOf(text) === -1;
+            });
+        });
+        update();
+    }
+
+    /* ----- Departments ----- */
+
+    function initDepartments() {
+        var chart = byId("stipend-time-chart");
+        var boxes = document.querySelectorAll("input[name='stipend-college-filter']");
+        var figure = null;
+
+        function update() {
+            var selected = Array.prototype.filter.call(boxes, function (box) {
+                return box.checked;
+            }).map(function (box) {
+                return box.value;
+            });
+            var toggled = DASHBOARD_CLIENTSIDE.toggleColleges(selected, figure);
+            plot(chart, toggled);
+        }
+
+        boxes.forEach(function (box) {
+            box.addEventListener("change", update);
+        });
+        fetchFigure("departments.json").then(function (result) {
+            figure = result;
+            update();
+        });
+    }
+
+    /* ----- Modals ----- */
+
+    var INIT = {
+        timeline: initTimeline,
+        benefits: initBenefits,
+        livingwage: initLivingwage,
+        departments: initDepartments
+    };
+    var initialized = {};
+
+    function showOnly(selector, id) {
+        document.querySelectorAll(selector).forEach(function (element) {
+            element.hidden = element.getAttribute("data-hotspot") !== id;
+        });
+    }
+
+    function openPopup(id) {
+        showOnly("#popup-title > [data-hotspot]", id);
+        showOnly("#popup-content > [data-hotspot]", id);
+        byId("popup-modal").hidden = false;
+        if (!initialized[id]) {
+            initialized[id] = true;
+            INIT[DATA.hotspots[id]]();
+        } else {
+            // charts drawn while hidden need their size again
+            byId("popup-body-" + id).querySelectorAll(".js-plotly-plot").forEach(function (graph) {
+                Plotly.Plots.resize(graph);
+            });
+        }
+    }
+
+    function closeModal(id) {
+        byId(id).hidden = true;
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        Object.keys(DATA.hotspots).forEach(function (id) {
+            byId(id).addEventListener("click", function () {
+                openPopup(id);
+            });
+        });
+        byId("jump-button").addEventListener("click", function () {
+            byId("jump-modal").hidden = !byId("jump-modal").hidden;
+        });
+        document.querySelectorAll("[data-close]").forEach(function (button) {
+            button.addEventListener("click", function () {
+                closeModal(button.getAttribute("data-close"));
+            });
+        });
+        // "Go to Page" links are plain #hotspot anchors; they just close the list
+        document.querySelectorAll("#jump-modal a[href^='#']").forEach(function (link) {
+            link.addEventListener("click", function () {
+                closeModal("jump-modal");
+            });
+        });
+    });
+})();
@@ -0,0 +1,333 @@
+"""
+Cleans the phdstipends export (data/cleaned_stipends.csv) into a partitioned
+Parquet dataset, and optionally writes the Boston-area subset that the
+living wage and department charts read (data/boston_stipends.csv).
+
+This replaces notebooks/data_processing_stipends.ipynb:
+
+- The CSV is streamed in chunks, so the export never has to fit in memory.
+- University and department names go through lookup tables
+  (data/stipends/_lookups.json). Each distinct spelling is normalized once,
+  with utils.university_name or utils.dept_name, and the result is reused
+  for every later row, chunk and run.
+- Output goes to data/stipends/, one directory per academic year
+  (academic_year=2024/...), with rows sorted by university. Readers can then
+  skip whole years by directory, and skip universities using each file's
+  row-group statistics.
+- Runs are incremental. The byte offset reached and a hash of everything
+  before it are recorded in data/stipends/_etl_state.json. When a fresh
+  export only appends rows to the old one, just the new rows are parsed and
+  written, as a new file in each affected year. Any other change to the
+  export rebuilds the dataset from scratch.
+
+    python stipend_etl.py [--input data/cleaned_stipends.csv] [--output data/stipends/]
+                          [--chunksize 100000] [--full] [--boston-csv data/boston_stipends.csv]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import utils
+
+INPUT_CSV = "data/cleaned_stipends.csv"
+OUTPUT_FOLDER = "data/stipends/"
+STATE_NAME = "_etl_state.json"
+LOOKUPS_NAME = "_lookups.json"
+STAGING_PREFIX = "_staging-"  # chunks being written, see write_chunk()
+CHUNKSIZE = 100_000
+PARTITION_COLUMN = "academic_year"
+
+# Canonical names (after utils.university_name) of the Boston-area schools,
+# and the display names the Boston charts use for them
+BOSTON_UNIVERSITIES = {
+    "Harvard University": "Harvard University",
+    "Northeastern University": "Northeastern University",
+    "Massachusetts Institute of Technology": "MIT",
+    "Tufts University": "Tufts University",
+    "Boston University": "Boston University",
+    "University of Massachusetts - Boston": "UMass Boston",
+}
+
+
+def prefix_hash(path, length, chunk_size=1 << 20):
+    """sha256 of the first `length` bytes of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def load_state(output_folder):
+    """Progress of earlier runs, or None if there is no usable output yet"""
+    path = os.path.join(output_folder, STATE_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(output_folder, name, data):
+    """Write a JSON file atomically, so a killed run never leaves it half-written"""
+    path = os.path.join(output_folder, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_lookups(output_folder):
+    """University and department lookup tables from earlier runs"""
+    path = os.path.join(output_folder, LOOKUPS_NAME)
+    if not os.path.exists(path):
+        return {"universities": {}, "departments": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def resume_offset(input_csv, state):
+    """
+    Where to start reading the export: past the rows an earlier run already
+    wrote if the export has only grown since, otherwise 0 (rebuild)
+    """
+    if state is None or state.get("input") != os.path.abspath(input_csv):
+        return 0
+    offset = state["offset"]
+    if os.path.getsize(input_csv) < offset:
+        return 0
+    if prefix_hash(input_csv, offset) != state["prefix_sha256"]:
+        return 0
+    return offset
+
+
+def lookup(values, table, normalize):
+    """
+    Map a column through a lookup table, adding any spellings it hasn't seen
+
+    Args:
+        values (pd.Series): raw names
+        table (dict): raw name -> normalized name, grows across chunks
+        normalize (callable): normalizes one raw name
+
+    Returns:
+        pd.Series: normalized names (missing values stay missing)
+    """
+    for raw in values.dropna().unique():
+        if raw not in table:
+            table[raw] = normalize(raw)
+    return values.map(table)
+
+
+def clean_chunk(chunk, universities, departments):
+    """
+    Normalize one chunk of the export
+
+    Args:
+        chunk (pd.DataFrame): rows as read from the export
+        universities (dict): lookup table for university names
+        departments (dict): lookup table for department names
+
+    Returns:
+        pd.DataFrame: chunk with canonical University and Department (the
+                      originals kept as Raw University / Raw Department) and
+                      the academic_year partition column
+    """
+    chunk = chunk.dropna(subset=["Academic Year"])
+    chunk.insert(0, "Raw University", chunk["University"])
+    chunk["University"] = lookup(chunk["University"], universities, lambda raw: utils.university_name(raw)[0])
+    chunk.insert(2, "Raw Department", chunk["Department"])
+    chunk["Department"] = lookup(chunk["Department"], departments, utils.dept_name)
+    chunk[PARTITION_COLUMN] = chunk["Academic Year"].astype(int)
+    return chunk
+
+
+def read_export(input_csv, offset, chunksize):
+    """
+    Stream the export in chunks, starting at a byte offset
+    (0, or the end of a line that an earlier run stopped at)
+    """
+    columns = pd.read_csv(input_csv, nrows=0).columns
+    f = open(input_csv, "rb")
+    if offset == 0:
+        reader = pd.read_csv(f, chunksize=chunksize)
+    else:
+        f.seek(offset)
+        reader = pd.read_csv(f, header=None, names=columns, chunksize=chunksize)
+    with f:
+        yield from reader
+
+
+def data_files(output_folder):
+    """Every Parquet file in the dataset, as paths relative to its root"""
+    files = []
+    for folder, _, filenames in os.walk(output_folder):
+        files += [
+            os.path.relpath(os.path.join(folder, filename), output_folder)
+            for filename in filenames
+            if filename.endswith(".parquet")
+        ]
+    return files
+
+
+def remove_files(output_folder, keep_runs):
+    """
+    Delete data files not written by one of `keep_runs` (all of them for an
+    empty list), e.g. the partial output of a killed run
+    """
+    for name in os.listdir(output_folder):
+        if name.startswith(STAGING_PREFIX):
+            shutil.rmtree(os.path.join(output_folder, name))
+    for path in data_files(output_folder):
+        run_id = os.path.basename(path).split("-")[1]
+        if run_id not in keep_runs:
+            os.remove(os.path.join(output_folder, path))
+
+
+def write_chunk(output_folder, chunk, run_id, chunk_number):
+    """
+    Add one cleaned chunk to the dataset, one new file per academic year,
+    sorted by university so row-group statistics can skip universities
+
+    The chunk is written to an empty staging folder, then each file is
+    linked into place, so a file name that already exists raises
+    FileExistsError instead of replacing earlier rows. (write_dataset's own
+    "error" behavior refuses any non-empty folder, which every incremental
+    run writes to.)
+    """
+    table = pa.Table.from_pandas(
+        chunk.sort_values([PARTITION_COLUMN, "University"], kind="stable"),
+        preserve_index=False,
+    )
+    # the "_" prefix hides the staging folder from dataset readers
+    staging = os.path.join(output_folder, f"{STAGING_PREFIX}{run_id}-{chunk_number}")
+    ds.write_dataset(
+        table,
+        staging,
+        format="parquet",
+        partitioning=[PARTITION_COLUMN],
+        partitioning_flavor="hive",
+        basename_template=f"part-{run_id}-{chunk_number}-{{i}}.parquet",
+        existing_data_behavior="error",
+    )
+    for path in data_files(staging):
+        target = os.path.join(output_folder, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.link(os.path.join(staging, path), target)
+    shutil.rmtree(staging)
+
+
+def run_etl(input_csv=INPUT_CSV, output_folder=OUTPUT_FOLDER, chunksize=CHUNKSIZE, full=False):
+    """
+    Bring the partitioned dataset up to date with the export
+
+    Args:
+        input_csv (str): phdstipends export
+        output_folder (str): root of the partitioned dataset
+        chunksize (int): rows parsed at a time
+        full (bool): rebuild from scratch even if the export only grew
+
+    Returns:
+        int: number of rows written on this run
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    state = load_state(output_folder)
+    offset = 0 if full else resume_offset(input_csv, state)
+    if offset == 0:
+        state = None
+        for name in (STATE_NAME, LOOKUPS_NAME):
+            if os.path.exists(os.path.join(output_folder, name)):
+                os.remove(os.path.join(output_folder, name))
+    # drop everything (rebuild) or just files from runs that never finished
+    remove_files(output_folder, [run["id"] for run in (state or {}).get("runs", [])])
+
+    end = os.path.getsize(input_csv)
+    if offset == end:
+        print(f"{input_csv} unchanged since the last run, nothing to do")
+        return 0
+    print(f"reading {input_csv} from byte {offset} of {end}")
+
+    lookups = load_lookups(output_folder)
+    universities, departments = lookups["universities"], lookups["departments"]
+    # unique per run, so no run can ever name a file like an earlier one
+    run_id = uuid.uuid4().hex
+    rows = 0
+    for chunk_number, chunk in enumerate(read_export(input_csv, offset, chunksize)):
+        cleaned = clean_chunk(chunk, universities, departments)
+        if len(cleaned):
+            write_chunk(output_folder, cleaned, run_id, chunk_number)
+            rows += len(cleaned)
+
+    # the state is written last: a run killed before this point is redone
+    save_json(output_folder, LOOKUPS_NAME, lookups)
+    runs = (state or {}).get("runs", []) + [{"id": run_id, "offset": offset, "end": end, "rows": rows}]
+    save_json(output_folder, STATE_NAME, {
+        "input": os.path.abspath(input_csv),
+        "offset": end,
+        "prefix_sha256": prefix_hash(input_csv, end),
+        "runs": runs,
+    })
+    print(f"wrote {rows} rows ({len(universities)} university and "
+          f"{len(departments)} department spellings in the lookup tables)")
+    return rows
+
+
+def read_stipends(output_folder=OUTPUT_FOLDER, universities=None, columns=None):
+    """
+    Read the partitioned dataset, optionally only some universities
+
+    Args:
+        output_folder (str): root of the partitioned dataset
+        universities (list[str]): canonical names to keep (all when not given)
+        columns (list[str]): columns to read (all when not given)
+
+    Returns:
+        pd.DataFrame: matching rows
+    """
+    dataset = ds.dataset(
+        [os.path.join(output_folder, path) for path in data_files(output_folder)],
+        format="parquet", partitioning=ds.partitioning(flavor="hive"),
+        partition_base_dir=output_folder,
+    )
+    row_filter = None if universities is None else ds.field("University").isin(universities)
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+
+
+def write_boston_csv(path, output_folder=OUTPUT_FOLDER):
+    """
+    Write the Boston-area subset in the layout data/boston_stipends.csv has
+    always had (display names, raw departments), without an index column
+    """
+    boston = read_stipends(output_folder, universities=list(BOSTON_UNIVERSITIES))
+    boston = boston.sort_values(["Academic Year", "University"], kind="stable")
+    boston["University"] = boston["University"].map(BOSTON_UNIVERSITIES)
+    boston["Department"] = boston["Raw Department"]
+    boston["Academic Year"] = boston[PARTITION_COLUMN]
+    boston = boston.drop(columns=["Raw University", "Raw Department", PARTITION_COLUMN])
+    boston.to_csv(path, index=False)
+    print(f"wrote {len(boston)} Boston-area rows to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the phdstipends export into a partitioned dataset")
+    parser.add_argument("--input", default=INPUT_CSV, help="phdstipends export (CSV)")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="folder for the partitioned dataset")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="rows parsed at a time")
+    parser.add_argument("--full", action="store_true", help="rebuild even if the export only grew")
+    parser.add_argument("--boston-csv", default=None,
+                        help="also write the Boston-area subset here (e.g. data/boston_stipends.csv)")
+    args = parser.parse_args()
+    run_etl(args.input, args.output, args.chunksize, args.full)
+    if args.boston_csv:
+        write_boston_csv(args.boston_csv, args.output)
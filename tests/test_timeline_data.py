@@ -0,0 +1,125 @@
+"""
+The vectorized timeline_data() against the original row-by-row computation
+of End Date, Change Count, Change Value and Color.
+
+    python -m pytest tests/
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from timeline_dash import FINAL_DATE, timeline_data  # noqa: E402
+
+NEGOTIATIONS_CSV = os.path.join(os.path.dirname(__file__), "..", "data", "contract_negotiations.csv")
+COMPUTED = ["End Date", "Change Count", "Change Value", "Color"]
+
+
+def legacy_timeline_data(negotiations):
+    """
+    The row-wise End Date / Change Count / Change Value / Color computation
+    that timeline_data() used before it was vectorized, for comparison
+    """
+    negotiations = timeline_data(negotiations.copy())
+    negotiations = negotiations.drop(columns=COMPUTED)
+
+    def next_end(df, article, start):
+        temp_times = df[df["Article"] == article]["Start Date"].unique()
+        later = [x for x in temp_times if x > start]
+        try:
+            return sorted(later, key=lambda t: t - start)[0]
+        except IndexError:
+            return pd.to_datetime("2025-05-30")
+
+    negotiations["End Date"] = negotiations.apply(
+        lambda x: next_end(negotiations, x["Article"], x["Start Date"]), axis=1
+    )
+
+    change_count = negotiations.groupby(["Article", "Start Date"])["Party"]\
+        .count().reset_index().rename(columns={"Party": "Count"})
+    change_count["Start Date"] = change_count["Start Date"].dt.strftime("%Y-%m-%d")
+    change_count = change_count.set_index(["Article", "Start Date"]).to_dict()["Count"]
+    negotiations["Change Count"] = negotiations.apply(
+        lambda x: change_count[(x["Article"], x["Start Date"].strftime("%Y-%m-%d"))], axis=1
+    )
+    change_values = negotiations[["Article", "Change Count"]].groupby("Article").max().to_dict()["Change Count"]
+    negotiations["Change Value"] = negotiations.apply(
+        lambda x: (float(x["Change Count"] / change_values[x["Article"]]) - 0.2) / (0.85 - 0.2), axis=1
+    )
+
+    def color_change(party, value):
+        if party == "Union":
+            return -1 * value
+        if party == "University":
+            return value
+        return 0
+
+    negotiations["Color"] = negotiations.apply(lambda x: color_change(x["Party"], x["Change Value"]), axis=1)
+    return negotiations
+
+
+def negotiations_frame(rows):
+    """Raw negotiation rows as (Article, Date, Party)"""
+    return pd.DataFrame(
+        [{"Article": article, "Topic": "", "Date": date, "Party": party,
+          "Changes from Previous Version": ""} for article, date, party in rows]
+    )
+
+
+def assert_matches_legacy(raw):
+    new = timeline_data(raw.copy())
+    old = legacy_timeline_data(raw)
+    pd.testing.assert_frame_equal(new, old[new.columns], check_exact=True)
+    return new
+
+
+def test_contract_negotiations_match_legacy():
+    assert_matches_legacy(pd.read_csv(NEGOTIATIONS_CSV))
+
+
+def test_single_change_per_article():
+    raw = negotiations_frame([
+        ("Housing", "3/1/2024", "Union"),
+        ("Travel", "4/1/2024", "University"),
+        ("Training", "5/1/2024", "TA"),
+    ])
+    new = assert_matches_legacy(raw).set_index("Article")
+    # each article's only change runs to the end, at its busiest-date value
+    assert (new["End Date"] == FINAL_DATE).all()
+    assert (new["Change Count"] == 1).all()
+    value = (1 - 0.2) / (0.85 - 0.2)
+    assert new["Color"].to_dict() == {"Housing": -value, "Travel": value, "Training": 0}
+
+
+def test_last_date_fills_to_final_date():
+    raw = negotiations_frame([
+        ("Housing", "3/1/2024", "Union"),
+        ("Housing", "3/1/2024", "Union"),
+        ("Housing", "5/1/2024", "University"),
+        ("Housing", "1/15/2024", "Union"),
+        ("Travel", "4/1/2024", "Union"),
+        ("Travel", "6/1/2024", "University"),
+    ])
+    new = assert_matches_legacy(raw)
+    ends = new.groupby(["Article", "Start Date"])["End Date"].first()
+    assert ends[("Housing", pd.Timestamp("2024-01-15"))] == pd.Timestamp("2024-03-01")
+    assert ends[("Housing", pd.Timestamp("2024-03-01"))] == pd.Timestamp("2024-05-01")
+    assert ends[("Housing", pd.Timestamp("2024-05-01"))] == FINAL_DATE
+    assert ends[("Travel", pd.Timestamp("2024-06-01"))] == FINAL_DATE
+    # both rows of the busiest date count it, and share its end
+    busiest = new[new["Start Date"] == pd.Timestamp("2024-03-01")]
+    assert busiest["Change Count"].tolist() == [2, 2]
+
+
+def test_unknown_article_raises():
+    # the original looked every article up in the topic groups and raised
+    # KeyError; a missing group must not turn into a NaN Group silently
+    raw = negotiations_frame([
+        ("Housing", "3/1/2024", "Union"),
+        ("Not An Article", "4/1/2024", "University"),
+    ])
+    with pytest.raises(KeyError, match="Not An Article"):
+        timeline_data(raw)
@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 import textwrap
 import plotly.express as px
@@ -7,36 +8,39 @@ import plotly.graph_objs as go
 import dash_bootstrap_components as dbc
 from PIL import Image
 import re
+from figure_cache import FigureCache
+import data_store
+import figure_artifacts
+import shared_cache
 
 '''--------------------- Data Processing ---------------------'''
-def timeline_data():
+FINAL_DATE = pd.to_datetime("2025-05-30")
+
+def timeline_data(negotiations:pd.DataFrame = None):
     """
     Imports and formats data
+
+    Args:
+        negotiations (pd.DataFrame): raw contract change rows; read from
+            data/contract_negotiations.csv when not given
     """
-    negotiations = pd.read_csv("data/contract_negotiations.csv")
+    if negotiations is None:
+        negotiations = data_store.read_table("contract_negotiations")
     negotiations["Start Date"] = pd.to_datetime(negotiations["Date"])
     
     # Sort negotiations by article and date to ensure proper ordering
     negotiations = negotiations.sort_values(["Article", "Start Date"], ascending=True)
     
-    # Add "end" date for each timeline segment
-    def next_end(df:pd.DataFrame, article:str, start:pd.Timestamp):
-        """
-        Find the next change to the same article. 
-        If no further changes, extend to final date
-        """
-        temp_times = df[df["Article"] == article]["Start Date"].unique()
-        # all the times later than current time
-        later = [x for x in temp_times if x > start]
-        try:
-            return sorted(later, key=lambda t: t - start)[0]
-        except IndexError:
-            return pd.to_datetime("2025-05-30")
-
-    negotiations["End Date"] = negotiations.apply(
-        lambda x: next_end(negotiations, x["Article"], x["Start Date"]), 
-        axis=1
-    )
+    # Add "end" date for each timeline segment: the next change to the same
+    # article, or the final date if there are no further changes.
+    # Worked out once per unique (Article, Start Date) by shifting within each
+    # article, then looked up for every row
+    starts = negotiations[["Article", "Start Date"]].drop_duplicates()\
+        .sort_values(["Article", "Start Date"])
+    starts["End Date"] = starts.groupby("Article")["Start Date"].shift(-1).fillna(FINAL_DATE)
+    row_keys = pd.MultiIndex.from_frame(negotiations[["Article", "Start Date"]])
+    negotiations["End Date"] = starts.set_index(["Article", "Start Date"])["End Date"]\
+        .reindex(row_keys).to_numpy()
     
     # Group topics into 5-6
     #topics = negotiations["Article"].unique().tolist()
@@ -95,55 +99,29 @@ def timeline_data():
         'Professional and Academic Freedom':"Academic"
     }
 
-    def category(article:str):
-        """
-        Quickly sorting articles into groups of 5-6
-        Can/should be changed later to thematic groups
-        """
-        #return f"Article Group {int(np.floor(topics.index(article)/6)) + 1}"
-        return topics[article]
-    
-    negotiations["Group"] = negotiations["Article"].apply(category)
+    # every article needs a group; an unknown one is an error, not a missing group
+    unknown = set(negotiations["Article"]) - topics.keys()
+    if unknown:
+        raise KeyError(f"articles without a topic group: {sorted(unknown)}")
+    negotiations["Group"] = negotiations["Article"].map(topics)
     
     
     wrapped_articles = {article:"<br>".join(textwrap.wrap(article, width=20)) for article in negotiations["Article"].unique()}
-    negotiations["Article-wrap"] = negotiations['Article'].apply(
-        lambda x: wrapped_articles[x]
-    )
+    negotiations["Article-wrap"] = negotiations['Article'].map(wrapped_articles)
     
     # Count number of changes per article per date
-    change_count = negotiations.groupby(["Article", "Start Date"])["Party"]\
-        .count().reset_index().rename(columns={"Party":"Count"})
-    
-    change_count["Start Date"] = change_count['Start Date'].dt.strftime('%Y-%m-%d')
-    change_count = change_count.set_index(['Article', 'Start Date']).to_dict()['Count']
-    
-    def changes(counts:pd.DataFrame, article:str, start:pd.Timestamp):
-        """
-        Looking up the number of changes per article per date
-        """
-        return counts[(article, start.strftime('%Y-%m-%d'))]
-    
-    negotiations["Change Count"] = negotiations.apply(lambda x: changes(change_count, x["Article"], x["Start Date"]), axis=1)
-    change_values = negotiations[["Article", "Change Count"]].groupby("Article").max().to_dict()['Change Count']
-    
-    negotiations["Change Value"] = negotiations.apply(
-        lambda x: (float(x["Change Count"]/change_values[x["Article"]]) - 0.2)/(0.85 - 0.2), axis=1
-    )
-    
-    def color_change(party, value):
-        if party == "Union":
-            return -1 * value
-            #return px.colors.sample_colorscale('Reds', value)[0]
-        if party == "University":
-            return value
-            # return px.colors.sample_colorscale('Teal', value)[0]
-        else:
-            return 0
-            #return px.colors.sample_colorscale('Greens', value)[0]
-    
-    negotiations["Color"] = negotiations.apply(
-        lambda x: color_change(x["Party"], x["Change Value"]), axis=1
+    per_date = negotiations.groupby(["Article", "Start Date"])
+    negotiations["Change Count"] = per_date["Party"].transform("count")
+    
+    # Scale by the article's busiest date
+    change_values = negotiations.groupby("Article")["Change Count"].transform("max")
+    negotiations["Change Value"] = (negotiations["Change Count"] / change_values - 0.2) / (0.85 - 0.2)
+    
+    # Union proposals are negative, University positive, tentative agreements 0
+    negotiations["Color"] = np.select(
+        [negotiations["Party"] == "Union", negotiations["Party"] == "University"],
+        [-1 * negotiations["Change Value"], negotiations["Change Value"]],
+        default=0
     )
     
     # Wrap text of changes for tooltips
@@ -161,8 +139,41 @@ def timeline_data():
 
 '''--------------------- Timeline Figure ---------------------'''
 
+def timeline_rangebreaks(negotiations:pd.DataFrame):
+    """
+    x-axis breaks that hide every day without a change, so the timeline is
+    consistently spaced. Depends only on the full data, so it is computed once
+    rather than on every figure update.
+
+    Runs of consecutive missing days are merged into one [first, last + 1 day)
+    interval each. Plotly hides exactly the same span as it would for one
+    1-day `values` break per missing day, but the figure carries a couple of
+    dozen breaks instead of hundreds of dates for Plotly.js to check on every pan.
+
+    Args:
+        negotiations (pd.DataFrame): contract change data
+
+    Returns:
+        list[dict]: plotly rangebreaks, one `bounds` interval per gap
+    """
+    present_dates = pd.DatetimeIndex(
+        pd.concat([negotiations['Start Date'], negotiations["End Date"]]).unique()
+    )
+    all_days = pd.date_range(present_dates.min(), present_dates.max(), freq='D')
+    missing_dates = all_days[~all_days.isin(present_dates)]
+    
+    # consecutive missing days share the same (date - position) offset
+    run_ids = missing_dates - pd.to_timedelta(np.arange(len(missing_dates)), unit='D')
+    gaps = pd.Series(missing_dates).groupby(run_ids).agg(["min", "max"])
+    
+    return [
+        dict(bounds=[first.strftime("%Y-%m-%d"), (last + pd.Timedelta(days=1)).strftime("%Y-%m-%d")])
+        for first, last in gaps.itertuples(index=False)
+    ]
+
 def negotiation_timeline(negotiations:pd.DataFrame, times:list[pd.Timestamp], 
-                         range_:list[pd.Timestamp], grouping_:str = "Employment (Requirements)"):
+                         range_:list[pd.Timestamp], grouping_:str = "Employment (Requirements)",
+                         rangebreaks:list[dict] = None):
     """
     Creates the timeline figure for contract negotiations
 
@@ -171,6 +182,7 @@ def negotiation_timeline(negotiations:pd.DataFrame, times:list[pd.Timestamp],
         times (list[pd.Timestamp]): list of all dates in contract data
         range_ (list[pd.Timestamp]): min and max dates to use
         grouping_ (str): category of articles
+        rangebreaks (list[dict]): precomputed timeline_rangebreaks(negotiations)
 
     Returns:
         go.Figure: modified Gantt plot
@@ -213,10 +225,9 @@ def negotiation_timeline(negotiations:pd.DataFrame, times:list[pd.Timestamp],
     # )
     
     # Adjusting x-axis to be consistently spaced
-    present_dates=set(negotiations['Start Date']).union(set(negotiations["End Date"]))
-    missing_dates = [d for d in pd.date_range(min(present_dates), \
-                    max(present_dates), freq='D') if d not in present_dates]
-    timeline.update_xaxes(rangebreaks = [dict(values=missing_dates)])
+    if rangebreaks is None:
+        rangebreaks = timeline_rangebreaks(negotiations)
+    timeline.update_xaxes(rangebreaks = rangebreaks)
 
     # Renaming the x-axis to Mon DD, YY format, with the final "date" as "Present"
     # also updating margins to give it some more space
@@ -260,24 +271,53 @@ def negotiation_timeline(negotiations:pd.DataFrame, times:list[pd.Timestamp],
 
 '''--------------------- Changes Table Figure ---------------------'''
 
-def time_changes_table(negotiations:pd.DataFrame, article:str, date:str):
+def build_changes_index(negotiations:pd.DataFrame):
     """
-    Creates a table with the text of all the changes to the article on a given date
+    Pre-slices the changes for every (article, date) so a click on the
+    timeline is a dictionary lookup instead of a scan of the whole frame
 
     Args:
         negotiations (pd.DataFrame): contract change data
+
+    Returns:
+        dict: (article, date string) -> topics, changes, parties involved and
+              the share of the table width given to the topic column
+    """
+    index = {}
+    columns = ["Topic", "Changes from Previous Version", "Party"]
+    for (article, date), subset in negotiations.groupby(["Article", "Date"], sort=False)[columns]:
+        # calculate max topic length for the left-hand column to be thin
+        max_topic_length = subset["Topic"].str.len().max()
+        max_changes_length = subset["Changes from Previous Version"].str.len().max()
+        index[(article, date)] = {
+            "topics": subset["Topic"].tolist(),
+            "changes": subset["Changes from Previous Version"].tolist(),
+            "parties": subset["Party"].unique().tolist(),
+            "topic_proportion": max(0.2, min(0.3, max_topic_length / (max_topic_length + max_changes_length))),
+        }
+    return index
+
+def time_changes_table(changes_index:dict, article:str, date:str):
+    """
+    Creates a table with the text of all the changes to the article on a given date
+
+    Args:
+        changes_index (dict): build_changes_index() of the contract change data
         article (str): specific article
         date (str): date of change, string form instead of Timestamp for ease of use
 
     Returns:
         go.Figure: table chart with specific topic and the change made
+
+    Raises:
+        KeyError: if the article has no changes on that date
     """
     # Choosing a subset of the data based on article/date
-    subset = negotiations[(negotiations["Article"] == article) & (negotiations["Date"] == date)].copy()
+    subset = changes_index[(article, date)]
     
     # selecting party for color, keeping consistent with established color theme
     # but lightening it a little so that the text shows up and is readable
-    party = subset["Party"].unique().tolist()
+    party = subset["parties"]
     if len(party) > 1 or party[0] == 'Tentative Agreement':
         head_color = 'mediumaquamarine',
         header_title = f"<b>Changes (Tentative Agreement, {date})</b>"
@@ -288,10 +328,7 @@ def time_changes_table(negotiations:pd.DataFrame, article:str, date:str):
         head_color='lightsteelblue',
         header_title= f"<b>Changes (proposed by University, {date})</b>"
     
-    # calculate max topic length for the left-hand column to be thin
-    max_topic_length = subset["Topic"].str.len().max()
-    max_changes_length = subset["Changes from Previous Version"].str.len().max()
-    topic_proportion = max(0.2, min(0.3, max_topic_length / (max_topic_length + max_changes_length)))
+    topic_proportion = subset["topic_proportion"]
     changes_proportion = 1 - topic_proportion
 
     # table
@@ -299,8 +336,8 @@ def time_changes_table(negotiations:pd.DataFrame, article:str, date:str):
         header=dict(values=["<b>Topic</b>", header_title], fill_color=head_color, align='left'),
         cells=dict(
             values=[
-                subset["Topic"], 
-                subset["Changes from Previous Version"],
+                subset["topics"], 
+                subset["changes"],
                 
             ], 
             align='left',
@@ -321,91 +358,87 @@ def time_changes_table(negotiations:pd.DataFrame, article:str, date:str):
     
     return fig
 
-def final_changes_table(negotiations:pd.DataFrame, article:str):
+def build_summaries_index(summaries:pd.DataFrame = None):
+    """
+    Parses the most recent summaries once, keyed by article, so the final
+    changes table never touches the disk or the regexes on a click
+
+    Args:
+        summaries (pd.DataFrame): recent summaries; read from
+            data/contract_recent_summaries.csv when not given
+
+    Returns:
+        dict: article -> header color/title, topics and cleaned summaries
+    """
+    if summaries is None:
+        summaries = data_store.read_table("contract_recent_summaries")
+    
+    index = {}
+    for article, article_summaries in summaries.groupby("Article", sort=False):
+        # Parse party and date from the first summary to determine color
+        # (assuming all topics in an article have the same party/date for the most recent change)
+        first_summary = article_summaries["Summary"].values[0]
+        
+        if first_summary.startswith("Tentative Agreement:"):
+            head_color = 'mediumaquamarine'
+            header_title = "<b>Most Recent Language</b>"
+        elif first_summary.startswith("Union ("):
+            head_color = 'lightcoral'
+            date_match = re.search(r'\((\d{2}-\d{2}-\d{2})', first_summary)
+            date_str = f", {date_match.group(1)}" if date_match else ""
+            header_title = f"<b>Most Recent Language (Union{date_str})</b>"
+        elif first_summary.startswith("University ("):
+            head_color = 'lightsteelblue'
+            date_match = re.search(r'\((\d{2}-\d{2}-\d{2})', first_summary)
+            date_str = f", {date_match.group(1)}" if date_match else ""
+            header_title = f"<b>Most Recent Language (University{date_str})</b>"
+        else: # Default if format doesn't match
+            head_color = 'lightgray'
+            header_title = "<b>Most Recent Language</b>"
+        
+        # Clean the summary text (remove the party/date prefix) for all summaries
+        clean_summaries = article_summaries["Summary"].str.replace(
+            r'^(Tentative Agreement|Union \([^)]+\)|University \([^)]+\)):\s*', '', regex=True
+        ).tolist()
+        
+        index[article] = {
+            "head_color": head_color,
+            "header_title": header_title,
+            "topics": article_summaries["Topic"].tolist(),
+            "summaries": clean_summaries,
+        }
+    return index
+
+def final_changes_table(summaries_index:dict, article:str):
     """
     Creates a table with the most recent summaries for all topics within an article
 
     Args:
-        negotiations (pd.DataFrame): contract change data (for compatibility)
+        summaries_index (dict): build_summaries_index() of the recent summaries
         article (str): specific article
 
     Returns:
         go.Figure: table chart with most recent summaries for all topics in the article
     """
-    # Load the recent summaries CSV
-    summaries = pd.read_csv("data/contract_recent_summaries.csv")
-    
+    # Get all topics for this article
+    article_summaries = summaries_index.get(article)
     
-    # Filter to get all topics for this article
-    article_summaries = summaries[summaries["Article"] == article]
-    
-    if article_summaries.empty:
+    if article_summaries is None:
         # If no summaries found, return empty figure
         return go.Figure()
     
-    # Parse party and date from the first summary to determine color
-    # (assuming all topics in an article have the same party/date for the most recent change)
-    first_summary = article_summaries["Summary"].values[0]
-    
-    if first_summary.startswith("Tentative Agreement:"):
-        head_color = 'mediumaquamarine'
-        header_title = "<b>Most Recent Language</b>"
-    elif first_summary.startswith("Union ("):
-        head_color = 'lightcoral'
-        date_match = re.search(r'\((\d{2}-\d{2}-\d{2})', first_summary)
-        date_str = f", {date_match.group(1)}" if date_match else ""
-        header_title = f"<b>Most Recent Language (Union{date_str})</b>"
-    elif first_summary.startswith("University ("):
-        head_color = 'lightsteelblue'
-        date_match = re.search(r'\((\d{2}-\d{2}-\d{2})', first_summary)
-        date_str = f", {date_match.group(1)}" if date_match else ""
-        header_title = f"<b>Most Recent Language (University{date_str})</b>"
-    else: # Default if format doesn't match
-        head_color = 'lightgray'
-        header_title = "<b>Most Recent Language</b>"
-    
-    
-    # Old code for header formatting
-    # last date of negotiations
-    # last_date = negotiations[negotiations["Article"] == article]['Start Date'].max()
-    # if last_date == pd.to_datetime('2025-05-30'):
-    #     ld_formatted = "Present"
-    # else:
-    #     ld_formatted = last_date.date().strftime("%m/%d/%Y")
-    #final_changes:pd.DataFrame = negotiations.loc[(negotiations["Article"] == article) & (negotiations["Start Date"] == last_date)]
-    # selecting party for color, keeping consistent with established color theme
-    # but lightening it a little so that the text shows up and is readable
-    # party = final_changes["Party"].unique().tolist()
-    # if len(party) > 1 or party[0] == 'Tentative Agreement':
-    #     head_color = 'mediumaquamarine',
-    #     header_title = f"<b>Most Recent (Tentative Agreement, {ld_formatted})</b>"
-    # elif party[0] == 'Union':
-    #     head_color = 'lightcoral',
-    #     header_title = f"<b>Most Recent (Union, {ld_formatted})</b>"
-    # else:
-    #     head_color='lightsteelblue',
-    #     header_title= f"<b>Most Recent (University, {ld_formatted})</b>"
-    
-        
-    
-    # Clean the summary text (remove the party/date prefix) for all summaries
-    clean_summaries = []
-    for summary in article_summaries["Summary"]:
-        clean_summary = re.sub(r'^(Tentative Agreement|Union \([^)]+\)|University \([^)]+\)):\s*', '', summary)
-        clean_summaries.append(clean_summary)
-    
     # Create table with two columns: Topic and Summary
 
     fig = go.Figure(data=go.Table(
         header=dict(
-            values=["<b>Topic</b>", header_title], 
-            fill_color=head_color, 
+            values=["<b>Topic</b>", article_summaries["header_title"]], 
+            fill_color=article_summaries["head_color"], 
             align='left'
         ),
         cells=dict(
             values=[
-                article_summaries["Topic"].tolist(),  # Topics column
-                clean_summaries  # Cleaned summaries column
+                article_summaries["topics"],  # Topics column
+                article_summaries["summaries"]  # Cleaned summaries column
             ], 
             align='left',
         ),
@@ -457,47 +490,129 @@ def create_instruction_prompt():
     ], style={'height': '100%'})
 
 '''--------------------- Dash Components ---------------------'''
-def timeline_negotiations():
+# Topic group descriptions
+TOPIC_DESCRIPTIONS = {
+    
+    'Union (General)': 'The organization of the union and recognition by the university',
+    'Union (Legal)': 'How the contract is created between both parties and enforced',
+
+    'Employment (Requirements)': 'What a graduate student worker is required to do as an employee of the university',
+    'Employment (Rights)': 'What a graduate student worker gets as part of their working environment',
+    'Employment (Protections)': "How graduate student workers' rights are protected, both physically and legally",
+    
+    # "Academic": 'Tuition and intellectual property/academic freedom',
+    "Academic": 'Tuition, intellectual property, and academic freedom',
+
+    "Benefits": 'The benefits for being a unionized graduate student worker'
+}
+
+DEFAULT_GROUP = "Employment (Requirements)"
+
+def summarize_topic(topic):
+    return TOPIC_DESCRIPTIONS.get(topic, "")
+
+@functools.lru_cache(maxsize=None)
+@shared_cache.shared("timeline_state")
+def timeline_state():
     """
-    Creates Dash div and callbacks for the timeline-related charts
-    This is the function that gets imported into app.py
+    Loads and formats the negotiation data the first time it is needed
+    (opening the timeline or its first callback), then reuses it
 
     Returns:
-        html.Div: html code for the Dash layout
-        callbacks: functions for interactivity
+        dict: negotiations frame, list of all dates (TIMES), topic groups,
+              x-axis rangebreaks and the lookup indexes for the change tables
     """
     negotiations = timeline_data()
     
     # List of all dates
     TIMES = sorted(negotiations["Start Date"].unique())
-    TIMES.append(pd.to_datetime("2025-05-30"))
+    TIMES.append(FINAL_DATE)
     
     TOPICS = sorted(negotiations["Group"].unique())
     
-    # Topic group descriptions
-    TOPIC_DESCRIPTIONS = {
-        
-        'Union (General)': 'The organization of the union and recognition by the university',
-        'Union (Legal)': 'How the contract is created between both parties and enforced',
+    return {"negotiations": negotiations, "times": TIMES, "topics": TOPICS,
+            "rangebreaks": timeline_rangebreaks(negotiations),
+            "changes_index": build_changes_index(negotiations),
+            "summaries_index": build_summaries_index()}
 
-        'Employment (Requirements)': 'What a graduate student worker is required to do as an employee of the university',
-        'Employment (Rights)': 'What a graduate student worker gets as part of their working environment',
-        'Employment (Protections)': "How graduate student workers' rights are protected, both physically and legally",
-        
-        # "Academic": 'Tuition and intellectual property/academic freedom',
-        "Academic": 'Tuition, intellectual property, and academic freedom',
+# Serialized timeline figures keyed by (group, first slider index, last slider index).
+# 7 groups x ~350 slider ranges, so this holds every range for a few groups at once
+timeline_figures = FigureCache("timeline", maxsize=1024, shared=True)
 
-        "Benefits": 'The benefits for being a unionized graduate student worker'
-    }
-    
-    def summarize_topic(topic):
-        return TOPIC_DESCRIPTIONS.get(topic, "")
-    
+def timeline_figure(group:str, start:int, end:int):
+    """
+    Timeline figure for a topic group between two slider positions,
+    built on first request and then served from timeline_figures
+
+    Args:
+        group (str): category of articles
+        start (int): index into TIMES of the first date shown
+        end (int): index into TIMES of the last date shown
+
+    Returns:
+        dict: serialized figure
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("timeline", group, start, end)
+    return timeline_figures.get_or_build((group, start, end), lambda: build_timeline(group, start, end))
+
+def build_timeline(group:str, start:int, end:int):
+    """Builds the timeline figure for a topic group between two slider positions"""
+    state = timeline_state()
+    TIMES = state["times"]
+    return negotiation_timeline(state["negotiations"], TIMES, [TIMES[start], TIMES[end]],
+                                group, state["rangebreaks"])
+
+# Serialized change tables keyed by (article, date) and article; a few hundred at most
+table_figures = FigureCache("timeline-tables", maxsize=512, shared=True)
+
+def changes_figure(article:str, date:str):
+    """
+    Table of the changes to an article on one date, built on first request
+
+    Raises:
+        KeyError: if the article has no changes on that date
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("changes", article, date)
+    return table_figures.get_or_build(
+        ("changes", article, date),
+        lambda: time_changes_table(timeline_state()["changes_index"], article, date))
+
+def final_figure(article:str):
+    """Table of the most recent language for an article, built on first request"""
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("final", article)
+    return table_figures.get_or_build(
+        ("final", article),
+        lambda: final_changes_table(timeline_state()["summaries_index"], article))
+
+def warm_timeline_cache(group:str = DEFAULT_GROUP):
+    """
+    Builds the timeline for every slider range of a group ahead of time,
+    so slider moves on it never wait for a figure build
+    """
+    last = len(timeline_state()["times"]) - 1
+    for start in range(last + 1):
+        for end in range(start, last + 1):
+            timeline_figure(group, start, end)
+
+def timeline_layout():
+    """
+    Builds the Dash layout for the timeline-related charts.
+    Called by app.py the first time the timeline hotspot is opened.
+
+    Returns:
+        html.Div: html code for the Dash layout
+    """
+    if figure_artifacts.enabled():
+        return figure_artifacts.load("layouts", "timeline")
+    state = timeline_state()
+    negotiations = state["negotiations"]
+    TIMES = state["times"]
     
     # Default timeline is all dates, with a selected group
-    timeline = negotiation_timeline(negotiations, TIMES, 
-                                    [negotiations["Start Date"].min(), 
-                                    negotiations["End Date"].max()], "Employment (Requirements)")
+    timeline = timeline_figure(DEFAULT_GROUP, 0, len(TIMES) - 1)
     
     # Create instruction prompt instead of default tables
     instruction_prompt = create_instruction_prompt()
@@ -510,7 +625,7 @@ def timeline_negotiations():
                     html.Label("Select Topic Group:", style={'fontWeight': 'bold', 'marginBottom': '5px'}),
                     dcc.Dropdown(
                         options=sorted(negotiations["Group"].unique().tolist()),
-                        value="Employment (Requirements)", 
+                        value=DEFAULT_GROUP, 
                         id='timeline-group'
                     )
                 ], width=5),
@@ -519,7 +634,7 @@ def timeline_negotiations():
                         html.I(className="fas fa-info-circle", 
                                style={'color': '#007bff', 'marginRight': '8px', 'fontSize': '16px'}),
                         html.Span(
-                            summarize_topic("Employment (Requirements)"),
+                            summarize_topic(DEFAULT_GROUP),
                             id='topic-description',
                             style={
                                 'fontSize': '14px', 
@@ -591,6 +706,21 @@ def timeline_negotiations():
         ])
     ])
     
+    return layout
+
+def timeline_negotiations():
+    """
+    Creates Dash div and callbacks for the timeline-related charts
+    This is the function that gets imported into app.py
+
+    Nothing is read or built here: the layout is returned as a function that
+    app.py calls when the hotspot is first clicked, and the callbacks load the
+    data through timeline_state() on their first call.
+
+    Returns:
+        callable: builds the html.Div for the Dash layout
+        callbacks: functions for interactivity
+    """
     # UPDATED CALLBACK: Now also updates the description
     def tl_slidergroup_callback(app):
         @app.callback(
@@ -602,8 +732,7 @@ def timeline_negotiations():
         )
         def update_timeline(dates, group):
             return (
-                negotiation_timeline(negotiations, TIMES, 
-                                   [TIMES[dates[0]], TIMES[dates[1]]], group), 
+                timeline_figure(group, dates[0], dates[1]), 
                 summarize_topic(group)
             )
     
@@ -624,8 +753,8 @@ def timeline_negotiations():
                 article = clickData["points"][0]['customdata'][0]
                 date = clickData["points"][0]['customdata'][1]
                 
-                table_fig = time_changes_table(negotiations, article, date)
-                final_fig = final_changes_table(negotiations, article)
+                table_fig = changes_figure(article, date)
+                final_fig = final_figure(article)
                 
                 left_content = dcc.Graph(figure=table_fig, id='changes-table')
                 right_content = dcc.Graph(figure=final_fig, id='final-changes')
@@ -638,4 +767,4 @@ def timeline_negotiations():
     title = "How have contract negotiations progressed over time?"
     subtitle = "Use the dropdown to filter by topic group. Click on a bar in the timeline to see the specific changes made to that article on that date. \"No change\" indicates a section where one party accepted a change the other party drafted in a previous iteration."
     
-    return layout, [tl_slidergroup_callback, tl_content_callback], title, subtitle
\ No newline at end of file
+    return timeline_layout, [tl_slidergroup_callback, tl_content_callback], title, subtitle
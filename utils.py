@@ -1,3 +1,9 @@
+import difflib
+import functools
+import hashlib
+import os
+import re
+import numpy as np
 import pandas as pd
 
 def px_to_percent(hotspot_px, img_width, img_height):
@@ -11,47 +17,184 @@ def px_to_percent(hotspot_px, img_width, img_height):
     }
 
 
-def dept_name(elem):
-    """Standardize department names for consistency."""
-    dept_mappings = {
-        "computer science": [
-            "computer science", 
-            "khoury college of computer sciences", 
-            "khoury", 
-            "computer", 
-            "phd in computer science"
-        ],
-        "economics": ["economics", "econ"],
-        "english": ["english", "english phd"],
-        "marine and environmental sciences": [
-            "marine and environmental science", 
-            "marine and environmental sciences"
-        ],
-        "sociology and anthropology": [
-            "sociology and anthropology", 
-            "sociology"
-        ],
-        "mechanical and industrial engineering": [
-            "mechanical and industrial engineering", 
-            "mechanical engineering",
-            "industrial engineering", 
-            "college of engineering"
-        ],
-        "psychology": [
-            "psychology",
-            "counseling psychology",
-            "applied psychology"
-        ]
-    }
-    
-    elem_lower = elem.lower() if isinstance(elem, str) else elem
-    
-    for standard_name, variations in dept_mappings.items():
-        if elem_lower in variations:
-            return standard_name
+_fingerprints = {}
+
+def file_fingerprint(path):
+    """
+    Short content hash of a data file, used to version caches built from it.
+    The file is only re-hashed when its size or modification time changes.
+    """
+    stat = os.stat(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cached = _fingerprints.get(path)
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
     
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    fingerprint = digest.hexdigest()[:16]
+    _fingerprints[path] = (stat_key, fingerprint)
+    return fingerprint
+
+
+# trailing abbreviation, e.g. "Northeastern University (NU)"
+ABBREVIATION_PATTERN = re.compile(r"\s*\(([^()]*)\)\s*$")
+
+UNIVERSITY_ALIASES = {"MIT": "Massachusetts Institute of Technology"}
+
+def university_name(raw_name):
+    """
+    Canonical university name from a self-reported one, so that e.g.
+    "Northeastern University (NU)" and "Northeastern University " are the same school
+
+    Returns:
+        tuple[str, str]: canonical name and its abbreviation (None if it had none)
+    """
+    name = raw_name.strip()
+    match = ABBREVIATION_PATTERN.search(name)
+    abbreviation = None
+    if match:
+        name = name[:match.start()]
+        abbreviation = match.group(1).strip() or None
+    return UNIVERSITY_ALIASES.get(name, name), abbreviation
+
+
+# standard department name -> the variations that mean it (all lower case)
+DEPT_MAPPINGS = {
+    "computer science": [
+        "computer science", 
+        "khoury college of computer sciences", 
+        "khoury", 
+        "computer", 
+        "phd in computer science"
+    ],
+    "economics": ["economics", "econ"],
+    "english": ["english", "english phd"],
+    "marine and environmental sciences": [
+        "marine and environmental science", 
+        "marine and environmental sciences"
+    ],
+    "sociology and anthropology": [
+        "sociology and anthropology", 
+        "sociology"
+    ],
+    "mechanical and industrial engineering": [
+        "mechanical and industrial engineering", 
+        "mechanical engineering",
+        "industrial engineering", 
+        "college of engineering"
+    ],
+    "psychology": [
+        "psychology",
+        "counseling psychology",
+        "applied psychology"
+    ]
+}
+
+# variation -> standard name, so an exact lookup is one dict access
+DEPT_LOOKUP = {
+    variation: standard_name
+    for standard_name, variations in DEPT_MAPPINGS.items()
+    for variation in variations
+}
+
+# Fuzzy matching: a variation only counts as a typo of a name if their
+# difflib similarity ratio is at least FUZZY_CUTOFF and at most FUZZY_MAX_EDITS
+# characters differ. The edit limit stops long names that merely share most
+# of their words ("earth and environmental science") from matching.
+FUZZY_CUTOFF = 0.85
+FUZZY_MAX_EDITS = 4
+
+def trigrams(text):
+    """Character trigrams of a name, padded so short names still have some"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# trigram -> variations containing it, the candidate index for fuzzy matching
+DEPT_TRIGRAMS = {}
+for _variation in DEPT_LOOKUP:
+    for _trigram in trigrams(_variation):
+        DEPT_TRIGRAMS.setdefault(_trigram, set()).add(_variation)
+
+@functools.lru_cache(maxsize=65536)
+def fuzzy_dept_name(name, cutoff=FUZZY_CUTOFF):
+    """
+    Standard department name for a misspelled variation, or None
+
+    Only variations that share at least a third of the name's trigrams are
+    compared with difflib, so the cost doesn't grow with every known name.
+
+    Args:
+        name (str): lower case, whitespace-normalized department name
+        cutoff (float): minimum similarity ratio
+
+    Returns:
+        str: standard name of the closest variation, or None if none is close
+    """
+    name_trigrams = trigrams(name)
+    shared = {}
+    for trigram in name_trigrams:
+        for variation in DEPT_TRIGRAMS.get(trigram, ()):
+            shared[variation] = shared.get(variation, 0) + 1
+
+    best_name, best_ratio = None, cutoff
+    for variation, count in shared.items():
+        if count * 3 < len(name_trigrams):
+            continue
+        matcher = difflib.SequenceMatcher(None, name, variation)
+        matched = sum(block.size for block in matcher.get_matching_blocks())
+        if len(name) + len(variation) - 2 * matched > FUZZY_MAX_EDITS:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= best_ratio:
+            best_name, best_ratio = DEPT_LOOKUP[variation], ratio
+    return best_name
+
+def dept_name(elem, fuzzy=False):
+    """
+    Standardize department names for consistency.
+
+    Args:
+        elem (str): department name as reported (non-strings are returned as is)
+        fuzzy (bool): also match misspellings of the known variations
+
+    Returns:
+        str: the standard name, or elem unchanged if it isn't a known variation
+    """
+    if not isinstance(elem, str):
+        return elem
+    elem_lower = elem.lower()
+    if elem_lower in DEPT_LOOKUP:
+        return DEPT_LOOKUP[elem_lower]
+    if fuzzy:
+        match = fuzzy_dept_name(" ".join(elem_lower.split()))
+        if match is not None:
+            return match
     return elem
 
+def normalize_departments(departments, fuzzy=False):
+    """
+    dept_name for a whole column. Each distinct name is normalized once and
+    the result is mapped back through the categorical codes, so the cost
+    depends on the number of distinct names rather than rows.
+
+    Args:
+        departments (pd.Series): department names (any dtype, incl. categorical)
+        fuzzy (bool): also match misspellings of the known variations
+
+    Returns:
+        pd.Series: standardized names with the same index
+    """
+    categorical = departments.astype("category")
+    # the trailing None is picked by code -1 (missing), which is put back below
+    standard = np.array([dept_name(name, fuzzy) for name in categorical.cat.categories] + [None], dtype=object)
+    codes = categorical.cat.codes.to_numpy()
+    result = pd.Series(standard[codes], index=departments.index, name=departments.name)
+    # missing names stay missing, like dept_name(nan)
+    return result.where(codes != -1, departments)
+
 benefit_icons = {
     # Financial/Cost Benefits
     'Deductible': '💰',
@@ -0,0 +1,17 @@
+"""
+Production entry point: the Flask server behind app.py, for a WSGI server.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+Workers share built figures, layouts and prepared data through
+shared_cache.py, which is on by default here (set SHARED_CACHE to another
+folder to move it). app.py's own app.run() is the single-process
+development server.
+"""
+import os
+
+os.environ.setdefault("SHARED_CACHE", "1")
+
+from app import app  # noqa: E402
+
+server = app.server